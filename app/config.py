@@ -3,6 +3,7 @@ QuizSense AI - Configuration Settings
 """
 
 import os
+from typing import List
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -21,18 +22,65 @@ class Settings:
     AZURE_OPENAI_KEY: str = os.getenv("AZURE_OPENAI_KEY", "")
     AZURE_OPENAI_ENDPOINT: str = os.getenv("AZURE_OPENAI_ENDPOINT", "")
     AZURE_OPENAI_DEPLOYMENT: str = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4")
+    AZURE_OPENAI_API_VERSION: str = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
+    AZURE_OPENAI_MAX_CONCURRENCY: int = int(os.getenv("AZURE_OPENAI_MAX_CONCURRENCY", "8"))  # in-flight calls
+    AZURE_OPENAI_TIMEOUT_SECONDS: float = float(os.getenv("AZURE_OPENAI_TIMEOUT_SECONDS", "30"))
+    
+    # LLM Resilience
+    LLM_DEADLINE_SECONDS: float = float(os.getenv("LLM_DEADLINE_SECONDS", "10"))  # then fall back to the bank
+    LLM_HEDGE_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "3"))  # until p95 is known; 0 = no hedging
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_RESET_SECONDS: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    
+    # LLM Quota Scheduling (the deployment's per-minute quotas; 0 = don't schedule)
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    LLM_MAX_QUEUE_DELAY_SECONDS: float = float(os.getenv("LLM_MAX_QUEUE_DELAY_SECONDS", "2"))  # then shed to the bank
+    
+    # LLM Telemetry (USD per 1K tokens for cost estimates; rollup flushed every N seconds, 0 = off)
+    LLM_PROMPT_COST_PER_1K_TOKENS: float = float(os.getenv("LLM_PROMPT_COST_PER_1K_TOKENS", "0.0025"))
+    LLM_COMPLETION_COST_PER_1K_TOKENS: float = float(os.getenv("LLM_COMPLETION_COST_PER_1K_TOKENS", "0.01"))
+    LLM_TELEMETRY_FLUSH_SECONDS: float = float(os.getenv("LLM_TELEMETRY_FLUSH_SECONDS", "60"))
+    
+    # Generation Cache (LLM question sets; a TTL of 0 turns it off)
+    GENERATION_CACHE_TTL_SECONDS: float = float(os.getenv("GENERATION_CACHE_TTL_SECONDS", "86400"))
+    GENERATION_CACHE_MEMORY_ENTRIES: int = int(os.getenv("GENERATION_CACHE_MEMORY_ENTRIES", "256"))
+    GENERATION_CACHE_MAX_ENTRIES: int = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "10000"))
+    # Serve cached sets minus the items a user has seen (False: regenerate instead)
+    GENERATION_CACHE_SERVE_SEEN_FILTERED: bool = os.getenv("GENERATION_CACHE_SERVE_SEEN_FILTERED", "True").lower() == "true"
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./quizsense.db")
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "default-secret-key")
+    ADMIN_EMAILS: List[str] = [
+        e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()
+    ]
     
     # Quiz Settings
     DEFAULT_QUESTIONS_PER_QUIZ: int = 5
     MAX_QUESTIONS_PER_QUIZ: int = 20
     MIN_QUESTIONS_PER_QUIZ: int = 3
     
+    # Adaptive Quizzes: stop once the ability estimate's standard error (logits) reaches this
+    CAT_TARGET_STANDARD_ERROR: float = float(os.getenv("CAT_TARGET_STANDARD_ERROR", "0.5"))
+    
+    # Question Bank
+    BANK_WATCH_INTERVAL_SECONDS: float = float(os.getenv("BANK_WATCH_INTERVAL_SECONDS", "0"))  # 0 = off
+    
+    # Bank Growth: off-peak generation for topic/difficulty cells running out of unseen questions
+    BANK_GROWTH_INTERVAL_SECONDS: float = float(os.getenv("BANK_GROWTH_INTERVAL_SECONDS", "0"))  # 0 = off
+    BANK_GROWTH_WINDOW: str = os.getenv("BANK_GROWTH_WINDOW", "1-5")  # local hours, end exclusive
+    BANK_GROWTH_PROVIDER: str = os.getenv("BANK_GROWTH_PROVIDER", "azure_openai")
+    BANK_GROWTH_TARGET_UNSEEN: int = int(os.getenv("BANK_GROWTH_TARGET_UNSEEN", "30"))
+    BANK_GROWTH_DEMAND_DAYS: int = int(os.getenv("BANK_GROWTH_DEMAND_DAYS", "14"))
+    BANK_GROWTH_MAX_ITEMS: int = int(os.getenv("BANK_GROWTH_MAX_ITEMS", "200"))  # per pass
+    BANK_GROWTH_BATCH_SIZE: int = int(os.getenv("BANK_GROWTH_BATCH_SIZE", "10"))  # questions per call
+    
+    # Prompt Templates (seconds between checks of prompts/*.md)
+    PROMPTS_WATCH_INTERVAL_SECONDS: float = float(os.getenv("PROMPTS_WATCH_INTERVAL_SECONDS", "0"))  # 0 = off
+    
     # Analysis Settings
     WEAK_TOPIC_THRESHOLD: float = 0.6  # Below 60% = weak
     STRONG_TOPIC_THRESHOLD: float = 0.8  # Above 80% = strong
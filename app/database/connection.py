@@ -30,6 +30,14 @@ async def close_database():
         _database = None
 
 
+async def _ensure_column(db: aiosqlite.Connection, table: str, column: str, definition: str):
+    """Add a column to an existing table (CREATE TABLE IF NOT EXISTS won't)"""
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        columns = [row[1] for row in await cursor.fetchall()]
+    if column not in columns:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
 async def init_database():
     print("📦 Initializing database...")
     db = await get_database()
@@ -59,9 +67,13 @@ async def init_database():
             created_at TEXT NOT NULL,
             is_completed INTEGER DEFAULT 0,
             score INTEGER,
+            bank_version INTEGER,
+            max_questions INTEGER,
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     """)
+    await _ensure_column(db, "quizzes", "bank_version", "INTEGER")
+    await _ensure_column(db, "quizzes", "max_questions", "INTEGER")
     await db.execute("""
         CREATE TABLE IF NOT EXISTS quiz_attempts (
             id TEXT PRIMARY KEY,
@@ -106,6 +118,81 @@ async def init_database():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS seen_items (
+            user_id TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            bits BLOB NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, topic),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS item_stats (
+            item_id TEXT PRIMARY KEY,
+            attempts INTEGER DEFAULT 0,
+            corrects INTEGER DEFAULT 0,
+            picks_a INTEGER DEFAULT 0,
+            picks_b INTEGER DEFAULT 0,
+            picks_c INTEGER DEFAULT 0,
+            picks_d INTEGER DEFAULT 0,
+            picks_none INTEGER DEFAULT 0,
+            total_time_seconds INTEGER DEFAULT 0,
+            mean_time_seconds REAL DEFAULT 0,
+            last_updated TEXT
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS item_responses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            correct INTEGER NOT NULL,
+            answered_at TEXT NOT NULL
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS item_params (
+            item_id TEXT PRIMARY KEY,
+            difficulty REAL NOT NULL,
+            discrimination REAL NOT NULL DEFAULT 1.0,
+            n_responses INTEGER NOT NULL DEFAULT 0,
+            model TEXT NOT NULL,
+            fitted_at TEXT NOT NULL
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS user_ability (
+            user_id TEXT PRIMARY KEY,
+            theta REAL NOT NULL,
+            n_responses INTEGER NOT NULL DEFAULT 0,
+            fitted_at TEXT NOT NULL
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS llm_usage_daily (
+            day TEXT NOT NULL,
+            endpoint TEXT NOT NULL,
+            user_id TEXT NOT NULL DEFAULT '',
+            deployment TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            calls INTEGER DEFAULT 0,
+            cache_hits INTEGER DEFAULT 0,
+            coalesced INTEGER DEFAULT 0,
+            errors INTEGER DEFAULT 0,
+            upstream_calls INTEGER DEFAULT 0,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            cost_usd REAL DEFAULT 0,
+            queue_wait_ms INTEGER DEFAULT 0,
+            first_token_calls INTEGER DEFAULT 0,
+            first_token_ms INTEGER DEFAULT 0,
+            latency_ms INTEGER DEFAULT 0,
+            max_latency_ms INTEGER DEFAULT 0,
+            PRIMARY KEY (day, endpoint, user_id, deployment, topic)
+        )
+    """)
     await db.execute("CREATE INDEX IF NOT EXISTS idx_quizzes_user ON quizzes (user_id)")
     await db.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user ON quiz_attempts (user_id)")
     await db.execute("CREATE INDEX IF NOT EXISTS idx_attempts_date ON quiz_attempts (completed_at)")
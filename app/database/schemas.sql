@@ -33,6 +33,8 @@ CREATE TABLE IF NOT EXISTS quizzes (
     created_at TEXT NOT NULL,
     is_completed INTEGER DEFAULT 0,
     score INTEGER,
+    bank_version INTEGER,  -- question bank snapshot the quiz was drawn from
+    max_questions INTEGER,  -- set for adaptive quizzes, which grow one question at a time
     FOREIGN KEY (user_id) REFERENCES users (id)
 );
 
@@ -83,6 +85,89 @@ CREATE TABLE IF NOT EXISTS weekly_reports (
     FOREIGN KEY (user_id) REFERENCES users (id)
 );
 
+-- Seen Items Table
+-- Bloom filter of question content hashes each user has been shown, per topic
+-- (1 KB, plus segments of 2, 4, 8... KB as it fills; see seen_set.py)
+CREATE TABLE IF NOT EXISTS seen_items (
+    user_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    bits BLOB NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, topic),
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+-- Item Stats Table
+-- Running per-question outcomes, keyed by question content hash
+CREATE TABLE IF NOT EXISTS item_stats (
+    item_id TEXT PRIMARY KEY,
+    attempts INTEGER DEFAULT 0,
+    corrects INTEGER DEFAULT 0,
+    picks_a INTEGER DEFAULT 0,
+    picks_b INTEGER DEFAULT 0,
+    picks_c INTEGER DEFAULT 0,
+    picks_d INTEGER DEFAULT 0,
+    picks_none INTEGER DEFAULT 0,  -- skipped or not one of A-D
+    total_time_seconds INTEGER DEFAULT 0,  -- answered attempts only
+    mean_time_seconds REAL DEFAULT 0,  -- total_time_seconds / (attempts - picks_none)
+    last_updated TEXT
+);
+
+-- Item Responses Table
+-- Append-only log of graded answers (user x item), input to IRT calibration
+CREATE TABLE IF NOT EXISTS item_responses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    answered_at TEXT NOT NULL
+);
+
+-- Item Params Table
+-- Calibrated IRT difficulty (b) and discrimination (a) per question
+CREATE TABLE IF NOT EXISTS item_params (
+    item_id TEXT PRIMARY KEY,
+    difficulty REAL NOT NULL,
+    discrimination REAL NOT NULL DEFAULT 1.0,
+    n_responses INTEGER NOT NULL DEFAULT 0,
+    model TEXT NOT NULL,
+    fitted_at TEXT NOT NULL
+);
+
+-- User Ability Table
+-- Calibrated IRT ability (theta) per user; warm start for the next fit
+CREATE TABLE IF NOT EXISTS user_ability (
+    user_id TEXT PRIMARY KEY,
+    theta REAL NOT NULL,
+    n_responses INTEGER NOT NULL DEFAULT 0,
+    fitted_at TEXT NOT NULL
+);
+
+-- LLM Usage Daily Table
+-- Provider calls rolled up per day, endpoint, user, deployment and topic
+-- (user_id is '' for background calls); averages are sums / counts
+CREATE TABLE IF NOT EXISTS llm_usage_daily (
+    day TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT '',
+    deployment TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    calls INTEGER DEFAULT 0,
+    cache_hits INTEGER DEFAULT 0,
+    coalesced INTEGER DEFAULT 0,
+    errors INTEGER DEFAULT 0,
+    upstream_calls INTEGER DEFAULT 0,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    cost_usd REAL DEFAULT 0,
+    queue_wait_ms INTEGER DEFAULT 0,
+    first_token_calls INTEGER DEFAULT 0,
+    first_token_ms INTEGER DEFAULT 0,
+    latency_ms INTEGER DEFAULT 0,
+    max_latency_ms INTEGER DEFAULT 0,
+    PRIMARY KEY (day, endpoint, user_id, deployment, topic)
+);
+
 -- =============================================
 -- Indexes for better performance
 -- =============================================
@@ -0,0 +1,3 @@
+"""
+QuizSense AI - Batch Jobs Package
+"""
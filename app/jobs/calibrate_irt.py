@@ -0,0 +1,347 @@
+"""
+QuizSense AI - IRT Difficulty Calibration Job
+Fits a Rasch (1PL) or 2PL model to every graded response and writes the
+calibrated difficulty / discrimination back per item.
+
+Run with: python -m app.jobs.calibrate_irt [--model 2pl] [--backfill]
+"""
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.database.connection import DATABASE_PATH
+from app.services.question_bank import content_hash
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+DEFAULT_MAX_EPOCHS = 50
+DEFAULT_TOLERANCE = 1e-3
+
+# Damped Newton steps and weak Gaussian priors keep the joint fit stable
+# for users/items with few (or all-correct) responses
+MAX_STEP = 1.0
+PRIOR_VAR_THETA = 1.0
+PRIOR_VAR_B = 4.0
+PRIOR_VAR_A = 0.25
+MIN_DISCRIMINATION = 0.2
+MAX_DISCRIMINATION = 4.0
+
+
+# ============================================
+# Response Log
+# ============================================
+
+def backfill_responses(conn: sqlite3.Connection) -> int:
+    """
+    Populate item_responses from quiz attempts graded before the log existed.
+
+    Only attempts completed before the earliest logged response are read,
+    so running this again never double-counts. Questions stored before
+    quizzes recorded item IDs get theirs from the content hash.
+    """
+
+    row = conn.execute("SELECT MIN(answered_at) FROM item_responses").fetchone()
+    cutoff = row[0] or "9999"
+
+    cursor = conn.execute(
+        """
+        SELECT a.user_id, a.answers, a.completed_at, q.questions
+        FROM quiz_attempts a
+        JOIN quizzes q ON q.id = a.quiz_id
+        WHERE a.completed_at < ?
+        """,
+        (cutoff,)
+    )
+
+    count = 0
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            break
+        batch = []
+        for user_id, answers, completed_at, questions in rows:
+            selected = {a["q_id"]: a.get("selected_option", "") for a in json.loads(answers)}
+            for q in json.loads(questions):
+                item_id = q.get("item_id")
+                if not item_id:
+                    if not q.get("question") or not q.get("options"):
+                        continue
+                    item_id = content_hash(q["question"], q["options"])
+                correct = selected.get(q["q_id"], "").upper() == q["correct_answer"].upper()
+                batch.append((user_id, item_id, int(correct), completed_at))
+        conn.executemany(
+            "INSERT INTO item_responses (user_id, item_id, correct, answered_at) VALUES (?, ?, ?, ?)",
+            batch
+        )
+        count += len(batch)
+
+    conn.commit()
+    return count
+
+
+def _encode_responses(
+    conn: sqlite3.Connection,
+    workdir: Path,
+    chunk_size: int
+) -> Tuple[Dict[str, int], Dict[str, int], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Stream the response log into a sparse user x item triplet (COO) form.
+
+    IDs are mapped to dense integer indices and the triplets are written to
+    memory-mapped .npy files, so only one chunk of rows is ever in RAM.
+    """
+
+    n = conn.execute("SELECT COUNT(*) FROM item_responses").fetchone()[0]
+    users: Dict[str, int] = {}
+    items: Dict[str, int] = {}
+
+    u = np.lib.format.open_memmap(workdir / "users.npy", mode="w+", dtype=np.int32, shape=(n,))
+    i = np.lib.format.open_memmap(workdir / "items.npy", mode="w+", dtype=np.int32, shape=(n,))
+    y = np.lib.format.open_memmap(workdir / "correct.npy", mode="w+", dtype=np.int8, shape=(n,))
+
+    cursor = conn.execute("SELECT user_id, item_id, correct FROM item_responses ORDER BY id")
+    pos = 0
+    while pos < n:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        m = min(len(rows), n - pos)
+        rows = rows[:m]
+        u[pos:pos + m] = [users.setdefault(r[0], len(users)) for r in rows]
+        i[pos:pos + m] = [items.setdefault(r[1], len(items)) for r in rows]
+        y[pos:pos + m] = [r[2] for r in rows]
+        pos += m
+
+    return users, items, u[:pos], i[:pos], y[:pos]
+
+
+# ============================================
+# Model Fit
+# ============================================
+
+def _accumulate(
+    u: np.ndarray,
+    i: np.ndarray,
+    y: np.ndarray,
+    theta: np.ndarray,
+    b: np.ndarray,
+    a: np.ndarray,
+    chunk_size: int,
+    for_items: bool,
+    two_pl: bool
+) -> Tuple[np.ndarray, ...]:
+    """One chunked pass: gradient and diagonal Fisher information per user, or per item"""
+
+    n = len(b) if for_items else len(theta)
+    g = np.zeros(n)
+    h = np.zeros(n)
+    g_a = np.zeros(n)
+    h_a = np.zeros(n)
+
+    for start in range(0, len(y), chunk_size):
+        uu = u[start:start + chunk_size]
+        ii = i[start:start + chunk_size]
+        yy = y[start:start + chunk_size].astype(np.float64)
+
+        diff = theta[uu] - b[ii]
+        aa = a[ii]
+        p = 1.0 / (1.0 + np.exp(-aa * diff))
+        r = yy - p
+        w = p * (1.0 - p)
+
+        if not for_items:
+            g += np.bincount(uu, weights=aa * r, minlength=n)
+            h += np.bincount(uu, weights=aa * aa * w, minlength=n)
+            continue
+
+        g -= np.bincount(ii, weights=aa * r, minlength=n)
+        h += np.bincount(ii, weights=aa * aa * w, minlength=n)
+        if two_pl:
+            g_a += np.bincount(ii, weights=diff * r, minlength=n)
+            h_a += np.bincount(ii, weights=diff * diff * w, minlength=n)
+
+    return g, h, g_a, h_a
+
+
+def _newton_step(g: np.ndarray, h: np.ndarray, value: np.ndarray, center: float, prior_var: float) -> np.ndarray:
+    return np.clip((g - (value - center) / prior_var) / (h + 1 / prior_var), -MAX_STEP, MAX_STEP)
+
+
+def fit_irt(
+    u: np.ndarray,
+    i: np.ndarray,
+    y: np.ndarray,
+    theta: np.ndarray,
+    b: np.ndarray,
+    a: np.ndarray,
+    model: str = "rasch",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_epochs: int = DEFAULT_MAX_EPOCHS,
+    tolerance: float = DEFAULT_TOLERANCE
+) -> Dict:
+    """
+    Joint maximum a-posteriori fit of abilities and item parameters.
+
+    Each epoch alternates two chunked passes over the responses: one that
+    updates every ability given the items, then one that updates every
+    item given the abilities. Gradients and diagonal Fisher information are
+    accumulated with np.bincount and applied as damped Newton steps.
+    theta, b and a are updated in place, so passing a previous fit
+    warm-starts the job.
+    """
+
+    two_pl = model == "2pl"
+    max_change = float("inf")
+    epochs = 0
+
+    for epochs in range(1, max_epochs + 1):
+        g, h, _, _ = _accumulate(u, i, y, theta, b, a, chunk_size, False, two_pl)
+        step_theta = _newton_step(g, h, theta, 0.0, PRIOR_VAR_THETA)
+        theta += step_theta
+
+        g, h, g_a, h_a = _accumulate(u, i, y, theta, b, a, chunk_size, True, two_pl)
+        step_b = _newton_step(g, h, b, 0.0, PRIOR_VAR_B)
+        b += step_b
+        max_change = max(np.abs(step_theta).max(initial=0), np.abs(step_b).max(initial=0))
+
+        if two_pl:
+            new_a = np.clip(a + _newton_step(g_a, h_a, a, 1.0, PRIOR_VAR_A), MIN_DISCRIMINATION, MAX_DISCRIMINATION)
+            max_change = max(max_change, np.abs(new_a - a).max(initial=0))
+            a[:] = new_a
+
+        if max_change < tolerance:
+            break
+
+    return {"epochs": epochs, "converged": bool(max_change < tolerance), "max_change": float(max_change)}
+
+
+# ============================================
+# Job
+# ============================================
+
+def calibrate(
+    db_path: Path = DATABASE_PATH,
+    model: str = "rasch",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_epochs: int = DEFAULT_MAX_EPOCHS,
+    tolerance: float = DEFAULT_TOLERANCE,
+    backfill: bool = False
+) -> Dict:
+    """Run one calibration over the whole response log and write the results back"""
+
+    started = time.perf_counter()
+    tracemalloc.start()
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        backfilled = backfill_responses(conn) if backfill else 0
+
+        with tempfile.TemporaryDirectory() as tmp:
+            users, items, u, i, y = _encode_responses(conn, Path(tmp), chunk_size)
+            if len(y) == 0:
+                return {"model": model, "responses": 0, "message": "No graded responses to calibrate"}
+
+            # Warm start from the previous fit
+            theta = np.zeros(len(users))
+            b = np.zeros(len(items))
+            a = np.ones(len(items))
+            for user_id, value in conn.execute("SELECT user_id, theta FROM user_ability"):
+                if user_id in users:
+                    theta[users[user_id]] = value
+            warm_items = 0
+            for item_id, difficulty, discrimination in conn.execute(
+                "SELECT item_id, difficulty, discrimination FROM item_params"
+            ):
+                if item_id in items:
+                    b[items[item_id]] = difficulty
+                    a[items[item_id]] = discrimination if model == "2pl" else 1.0
+                    warm_items += 1
+
+            fit = fit_irt(u, i, y, theta, b, a, model, chunk_size, max_epochs, tolerance)
+
+            user_counts = np.bincount(u, minlength=len(users))
+            item_counts = np.bincount(i, minlength=len(items))
+            del u, i, y
+
+        fitted_at = datetime.utcnow().isoformat()
+        conn.executemany(
+            """
+            INSERT INTO item_params (item_id, difficulty, discrimination, n_responses, model, fitted_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (item_id) DO UPDATE SET
+                difficulty = excluded.difficulty,
+                discrimination = excluded.discrimination,
+                n_responses = excluded.n_responses,
+                model = excluded.model,
+                fitted_at = excluded.fitted_at
+            """,
+            (
+                (item_id, float(b[k]), float(a[k]), int(item_counts[k]), model, fitted_at)
+                for item_id, k in items.items()
+            )
+        )
+        conn.executemany(
+            """
+            INSERT INTO user_ability (user_id, theta, n_responses, fitted_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                theta = excluded.theta,
+                n_responses = excluded.n_responses,
+                fitted_at = excluded.fitted_at
+            """,
+            (
+                (user_id, float(theta[k]), int(user_counts[k]), fitted_at)
+                for user_id, k in users.items()
+            )
+        )
+        conn.commit()
+    finally:
+        conn.close()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "model": model,
+        "responses": int(user_counts.sum()),
+        "backfilled": backfilled,
+        "users": len(users),
+        "items": len(items),
+        "warm_started_items": warm_items,
+        **fit,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "peak_memory_mb": round(peak / 2**20, 1)
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Calibrate item difficulty from graded responses (IRT)")
+    parser.add_argument("--db", type=Path, default=DATABASE_PATH, help="Path to quizsense.db")
+    parser.add_argument("--model", choices=["rasch", "2pl"], default="rasch")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Responses per vectorized chunk")
+    parser.add_argument("--max-epochs", type=int, default=DEFAULT_MAX_EPOCHS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--backfill", action="store_true", help="Import attempts graded before the response log existed")
+    args = parser.parse_args(argv)
+
+    print(f"📐 Calibrating {args.model} model from {args.db}...")
+    report = calibrate(
+        db_path=args.db,
+        model=args.model,
+        chunk_size=args.chunk_size,
+        max_epochs=args.max_epochs,
+        tolerance=args.tolerance,
+        backfill=args.backfill
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+QuizSense AI - Near-Duplicate Report
+Lists clusters of near-identical questions across the whole question bank.
+
+Run with: python -m app.jobs.duplicate_report [--threshold 0.7] [--json]
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.services.near_duplicates import DUPLICATE_THRESHOLD, duplicate_clusters
+from app.services.question_bank import BANK_DB_PATH, BANK_SEED_PATH, ensure_compiled
+
+
+def build_report(
+    seed_path: Path = BANK_SEED_PATH,
+    db_path: Path = BANK_DB_PATH,
+    threshold: float = DUPLICATE_THRESHOLD
+) -> Dict:
+    """Cluster every bank item by MinHash similarity (signatures are read from the compiled bank)"""
+
+    ensure_compiled(seed_path, db_path)
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        details: Dict[str, List[Dict]] = {}
+        signatures = []
+        for item_id, topic, difficulty, question, signature in conn.execute(
+            "SELECT item_id, topic, difficulty, question, minhash FROM items ORDER BY seq"
+        ):
+            details.setdefault(item_id, []).append(
+                {"item_id": item_id, "topic": topic, "difficulty": difficulty, "question": question}
+            )
+            signatures.append((item_id, signature))
+    finally:
+        conn.close()
+
+    clusters = duplicate_clusters(signatures, threshold)
+    # Identical items filed under several topics are duplicates too
+    clustered = {item_id for cluster in clusters for item_id in cluster}
+    clusters += [[item_id] for item_id, rows in details.items() if len(rows) > 1 and item_id not in clustered]
+
+    return {
+        "items": len(signatures),
+        "threshold": threshold,
+        "clusters": [
+            [row for item_id in cluster for row in details[item_id]]
+            for cluster in clusters
+        ],
+        "wall_seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="List near-duplicate question clusters in the bank")
+    parser.add_argument("--seed", type=Path, default=BANK_SEED_PATH, help="Path to the JSONL seed")
+    parser.add_argument("--db", type=Path, default=BANK_DB_PATH, help="Path to the compiled bank")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD, help="Estimated Jaccard similarity")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = build_report(seed_path=args.seed, db_path=args.db, threshold=args.threshold)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"🔍 {len(report['clusters'])} duplicate clusters among {report['items']} items "
+          f"(threshold {report['threshold']}, {report['wall_seconds']}s)")
+    for i, cluster in enumerate(report["clusters"], 1):
+        print(f"\nCluster {i}:")
+        for row in cluster:
+            print(f"  [{row['topic']} / {row['difficulty']}] {row['question']}  ({row['item_id']})")
+
+
+if __name__ == "__main__":
+    main()
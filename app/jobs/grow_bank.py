@@ -0,0 +1,70 @@
+"""
+QuizSense AI - Bank Growth Job
+Generates questions for topic/difficulty cells that are running out of
+unseen questions and imports them into the question bank.
+
+Run with: python -m app.jobs.grow_bank [--dry-run] [--endpoint http://127.0.0.1:8001]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+from app.database.connection import DATABASE_PATH
+from app.services.bank_growth import grow_cells, growth_lock_path, plan_growth
+from app.services.file_lock import lock_for
+from app.services.llm_provider import AzureOpenAIProvider
+from app.services.question_bank import BANK_DB_PATH, BANK_SEED_PATH
+
+
+async def run(args) -> dict:
+    plan = plan_growth(args.db, args.seed, args.app_db, args.target, args.days)
+    report = {"planned_cells": len(plan), "plan": [{k: v for k, v in cell.items() if k != "examples"} for cell in plan]}
+    if args.dry_run:
+        return report
+
+    provider = AzureOpenAIProvider.from_settings()
+    if args.endpoint:
+        # e.g. a local simulator; it doesn't check the key
+        provider.endpoint = args.endpoint.rstrip("/")
+        provider.api_key = provider.api_key or "local"
+    try:
+        report.update(await grow_cells(provider, plan, args.db, args.seed, args.max_items, args.batch_size))
+    finally:
+        await provider.aclose()
+    return report
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Pre-generate questions for thin question bank cells")
+    parser.add_argument("--seed", type=Path, default=BANK_SEED_PATH, help="Path to the JSONL seed")
+    parser.add_argument("--db", type=Path, default=BANK_DB_PATH, help="Path to the compiled bank")
+    parser.add_argument("--app-db", type=Path, default=DATABASE_PATH, help="Path to quizsense.db (demand and seen-sets)")
+    parser.add_argument("--target", type=int, default=settings.BANK_GROWTH_TARGET_UNSEEN, help="Unseen questions each cell should keep")
+    parser.add_argument("--days", type=int, default=settings.BANK_GROWTH_DEMAND_DAYS, help="Demand window")
+    parser.add_argument("--max-items", type=int, default=settings.BANK_GROWTH_MAX_ITEMS)
+    parser.add_argument("--batch-size", type=int, default=settings.BANK_GROWTH_BATCH_SIZE, help="Questions per call")
+    parser.add_argument("--endpoint", help="Override AZURE_OPENAI_ENDPOINT (e.g. a local simulator)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without generating anything")
+    args = parser.parse_args(argv)
+
+    runner = lock_for(growth_lock_path(args.db))
+    if not args.dry_run and not runner.acquire(blocking=False):
+        print("❌ Another process (e.g. a server with BANK_GROWTH_INTERVAL_SECONDS set) is growing this bank")
+        sys.exit(1)
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if runner.held:
+            runner.release()
+    print(json.dumps(report, indent=2))
+    if report.get("imported"):
+        print("ℹ️ A running server serves the new questions after POST /quiz/bank/reload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+QuizSense AI - Bulk Question Import Job
+Loads questions from an NDJSON or CSV file into the question bank.
+
+Run with: python -m app.jobs.import_questions questions.ndjson [--format csv] [--workers 8]
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Optional
+
+from app.services.bank_import import import_questions
+from app.services.question_bank import BANK_DB_PATH, BANK_SEED_PATH
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Import questions into the question bank")
+    parser.add_argument("source", type=Path, help="NDJSON or CSV file")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to the file extension")
+    parser.add_argument("--seed", type=Path, default=BANK_SEED_PATH, help="Path to the JSONL seed")
+    parser.add_argument("--db", type=Path, default=BANK_DB_PATH, help="Path to the compiled bank")
+    parser.add_argument("--workers", type=int, help="Validation processes (0 = inline; default: CPU count)")
+    parser.add_argument("--allow-new-topics", action="store_true", help="Accept topics not on any learning path")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.source.suffix.lower() == ".csv" else "ndjson")
+    report = import_questions(
+        source=args.source,
+        fmt=fmt,
+        seed_path=args.seed,
+        db_path=args.db,
+        workers=args.workers,
+        allow_new_topics=args.allow_new_topics
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
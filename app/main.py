@@ -2,12 +2,18 @@
 QuizSense AI - Main Application Entry Point
 """
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.routes import auth, quiz, reports
 from app.database.connection import init_database
+from app.services.ai_agent import quiz_agent
+from app.services.bank_growth import watch_growth
+from app.services.llm_telemetry import llm_telemetry
+from app.services.prompt_registry import prompt_registry
 
 # ============================================
 # Create FastAPI Application
@@ -70,8 +76,53 @@ async def startup_event():
     # Initialize database
     await init_database()
     
+    # Compile the prompt templates (a broken one stops startup here)
+    prompt_registry.load()
+    print(f"📝 Prompt templates compiled: {len(prompt_registry.stats()['templates'])}")
+    if settings.PROMPTS_WATCH_INTERVAL_SECONDS > 0:
+        app.state.prompts_watcher = asyncio.create_task(
+            prompt_registry.watch(settings.PROMPTS_WATCH_INTERVAL_SECONDS)
+        )
+    
+    # Hot-reload the question bank when its seed file changes
+    if settings.BANK_WATCH_INTERVAL_SECONDS > 0:
+        app.state.bank_watcher = asyncio.create_task(
+            quiz_agent.watch_bank(settings.BANK_WATCH_INTERVAL_SECONDS)
+        )
+    
+    # Roll LLM call telemetry up into llm_usage_daily
+    if settings.LLM_TELEMETRY_FLUSH_SECONDS > 0:
+        app.state.telemetry_flusher = asyncio.create_task(
+            llm_telemetry.watch(settings.LLM_TELEMETRY_FLUSH_SECONDS)
+        )
+    
+    # Top up thin topic/difficulty cells off-peak
+    if settings.BANK_GROWTH_INTERVAL_SECONDS > 0 and settings.BANK_GROWTH_PROVIDER in quiz_agent.providers:
+        app.state.bank_growth = asyncio.create_task(
+            watch_growth(
+                quiz_agent,
+                settings.BANK_GROWTH_PROVIDER,
+                settings.BANK_GROWTH_INTERVAL_SECONDS,
+                settings.BANK_GROWTH_WINDOW,
+                target_unseen=settings.BANK_GROWTH_TARGET_UNSEEN,
+                demand_days=settings.BANK_GROWTH_DEMAND_DAYS,
+                max_items=settings.BANK_GROWTH_MAX_ITEMS,
+                batch_size=settings.BANK_GROWTH_BATCH_SIZE
+            )
+        )
+    
     print("✅ Server started successfully!\n")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write out pending LLM telemetry and close pooled connections to generation providers"""
+    try:
+        await llm_telemetry.flush()
+    except Exception as e:
+        print(f"Error flushing LLM telemetry: {e}")
+    await quiz_agent.aclose()
+
 # ============================================
 # Health Check Endpoints
 # ============================================
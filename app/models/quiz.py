@@ -71,6 +71,7 @@ class QuizRequest(BaseModel):
     topic: str = Field(..., description="Topic to quiz on")
     difficulty: Difficulty = Field(default=Difficulty.MEDIUM, description="Quiz difficulty")
     num_questions: int = Field(default=5, ge=3, le=20, description="Number of questions")
+    provider: str = Field(default="bank", description="Question source: bank, or a configured LLM provider")
     
     class Config:
         json_schema_extra = {
@@ -78,7 +79,8 @@ class QuizRequest(BaseModel):
                 "subject": "Python Programming",
                 "topic": "Functions",
                 "difficulty": "medium",
-                "num_questions": 5
+                "num_questions": 5,
+                "provider": "bank"
             }
         }
 
@@ -106,6 +106,16 @@ async def get_current_user(
     }
 
 
+async def get_admin_user(current_user: dict = Depends(get_current_user)) -> dict:
+    """Get current user and require them to be listed in ADMIN_EMAILS"""
+    if current_user["email"].lower() not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+
 # ============================================
 # ROUTES
 # ============================================
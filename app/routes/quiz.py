@@ -3,38 +3,109 @@ QuizSense AI - Quiz Routes
 Manual & AI-driven quiz generation with 24-hour limit
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
+import json
+import os
 import secrets
+import tempfile
+import time
 
 from app.models.quiz import (
     QuizRequest,
     QuizResponse,
-    QuizQuestion,
     AnswerSubmission,
     QuizResult,
     QuestionResult,
+    SingleAnswer,
     Difficulty
 )
-from app.routes.auth import get_current_user
-from app.services.ai_agent import QuizAgent
+from app.config import settings
+from app.routes.auth import get_current_user, get_admin_user
+from app.services.adaptive import DIFFICULTY_PRIORS
+from app.services.bank_import import import_questions
+from app.services.ai_agent import quiz_agent
+from app.services.prompt_registry import prompt_registry
+from app.services.question_bank import encode_public_fragment
 from app.services.quiz_service import QuizService
 from app.services.analysis_service import AnalysisService
 from app.services.learning_agent import learning_agent
+from app.services.llm_telemetry import llm_telemetry, set_llm_caller
 from app.database.connection import get_database
 
 router = APIRouter()
 
-quiz_agent = QuizAgent()
 quiz_service = QuizService()
 analysis_service = AnalysisService()
 
 
 class AutoQuizRequest(BaseModel):
     domain: str
-    num_questions: int = 5
+    num_questions: int = Field(default=5, ge=1, le=20)
+    mixed: bool = False  # draw across the domain's topics, weighted by weakness
+    adaptive: bool = False  # serve one question at a time via /quiz/adaptive/next
+    provider: str = "bank"  # question source for single-topic quizzes
+
+
+class AdaptiveAnswerRequest(BaseModel):
+    quiz_id: str
+    answers: List[SingleAnswer]
+
+
+def build_quiz_response(
+    quiz_id: str,
+    subject: str,
+    topic: str,
+    difficulty: Difficulty,
+    quiz_data: dict,
+    time_limit_minutes: int,
+    created_at: datetime
+) -> Response:
+    """
+    Serialize a QuizResponse by splicing per-question JSON fragments.
+    
+    Bank items come with answer-stripped fragments cached per bank version,
+    so only the envelope and the q_ids are encoded per request and no
+    QuizQuestion models are built. Questions without a cached fragment
+    (e.g. LLM output) are encoded on the spot.
+    """
+    
+    questions = quiz_data["questions"]
+    fragments = quiz_data.get("public_fragments") or [encode_public_fragment(q) for q in questions]
+    
+    head = json.dumps(
+        {"quiz_id": quiz_id, "subject": subject, "topic": topic, "difficulty": difficulty.value},
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    tail = json.dumps(
+        {
+            "total_questions": len(questions),
+            "time_limit_minutes": time_limit_minutes,
+            "created_at": created_at.isoformat()
+        },
+        separators=(",", ":")
+    )
+    body = b"".join([
+        head[:-1].encode("utf-8"),
+        b',"questions":[',
+        b",".join(
+            b'{"q_id":' + json.dumps(q["q_id"]).encode("utf-8") + fragment
+            for q, fragment in zip(questions, fragments)
+        ),
+        b"],",
+        tail[1:].encode("utf-8")
+    ])
+    return Response(content=body, media_type="application/json")
+
+
+def sse_event(event: str, data: bytes) -> bytes:
+    """One server-sent event; data must be single-line JSON"""
+    return b"event: " + event.encode("ascii") + b"\ndata: " + data + b"\n\n"
 
 
 async def check_daily_limit(user_id: str) -> bool:
@@ -97,10 +168,15 @@ async def generate_auto_quiz(
     AI-driven quiz:
     - User chooses only DOMAIN (e.g., Python Programming)
     - Agent decides topic + difficulty based on history
+    - mixed=true: questions drawn across the domain, weighted towards weak topics
+    - adaptive=true: starts with one question; each next one comes from /quiz/adaptive/next
+    - provider: question source for single-topic quizzes; falls back to the bank
+      within LLM_DEADLINE_SECONDS
     - 1 quiz per day limit
     """
     
     user_id = current_user["user_id"]
+    set_llm_caller("/quiz/auto", user_id)
     
     # 24-hour limit
     has_taken = await check_daily_limit(user_id)
@@ -137,31 +213,72 @@ async def generate_auto_quiz(
             }
     
     # Let LearningAgent decide topic & difficulty
-    plan = learning_agent.generate_personalized_quiz(
-        domain=request.domain,
-        user_performance=user_perf,
-        topic_performance=topic_perf,
-        num_questions=request.num_questions
-    )
+    if request.mixed and not request.adaptive:
+        plan = learning_agent.plan_mixed_quiz(
+            user_id=user_id,
+            domain=request.domain,
+            user_performance=user_perf,
+            topic_performance=topic_perf,
+            num_questions=request.num_questions
+        )
+    else:
+        plan = learning_agent.generate_personalized_quiz(
+            domain=request.domain,
+            user_performance=user_perf,
+            topic_performance=topic_perf,
+            num_questions=request.num_questions
+        )
     
     chosen_topic = plan["topic"]
     difficulty_str = plan["difficulty"]
     
-    # Avoid repeating same questions for that topic
-    previous_questions = await quiz_service.get_previous_questions(
-        user_id=user_id,
-        topic=chosen_topic,
-        limit=50
-    )
-    
-    # Generate quiz questions using QuizAgent
+    # Generate quiz questions using QuizAgent, avoiding questions already seen
     try:
-        quiz_data = await quiz_agent.generate_quiz(
-            subject=request.domain,
-            topic=chosen_topic,
-            difficulty=difficulty_str,
-            num_questions=plan["num_questions"],
-            previous_questions=previous_questions
+        if request.adaptive:
+            # Start from the calibrated ability if there is one, else the level's difficulty
+            ability = await quiz_service.get_user_ability(user_id)
+            previous_questions = await quiz_service.get_seen_set(
+                user_id=user_id,
+                topic=chosen_topic
+            )
+            quiz_data = await quiz_agent.next_adaptive_question(
+                topic=chosen_topic,
+                load_params=quiz_service.get_item_params,
+                prior_ability=ability if ability is not None else DIFFICULTY_PRIORS.get(difficulty_str, 0.0),
+                answered=[],
+                served=set(),
+                max_questions=plan["num_questions"],
+                min_questions=settings.MIN_QUESTIONS_PER_QUIZ,
+                target_standard_error=settings.CAT_TARGET_STANDARD_ERROR,
+                previous_questions=previous_questions
+            )
+        elif request.mixed:
+            seen_sets = await quiz_service.get_seen_sets(user_id=user_id, topics=plan["topics"])
+            quiz_data = await quiz_agent.generate_mixed_quiz(
+                subject=request.domain,
+                topics=plan["topics"],
+                sampler=plan["sampler"],
+                difficulty=difficulty_str,
+                num_questions=plan["num_questions"],
+                seen_sets=seen_sets
+            )
+        else:
+            previous_questions = await quiz_service.get_seen_set(
+                user_id=user_id,
+                topic=chosen_topic
+            )
+            quiz_data = await quiz_agent.generate_quiz(
+                subject=request.domain,
+                topic=chosen_topic,
+                difficulty=difficulty_str,
+                num_questions=plan["num_questions"],
+                previous_questions=previous_questions,
+                provider=request.provider
+            )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "providers": quiz_agent.provider_names()}
         )
     except Exception as e:
         raise HTTPException(
@@ -169,6 +286,13 @@ async def generate_auto_quiz(
             detail=f"Failed to generate quiz: {str(e)}"
         )
     
+    if quiz_data.get("done"):
+        # Nothing left to serve in this topic (e.g. the user has seen all of it)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"No adaptive questions available for {chosen_topic}"
+        )
+    
     # Save quiz to DB
     quiz_id = f"quiz_{secrets.token_hex(8)}"
     created_at = datetime.utcnow()
@@ -180,30 +304,18 @@ async def generate_auto_quiz(
         topic=chosen_topic,
         difficulty=difficulty_str,
         questions=quiz_data["questions"],
-        created_at=created_at
+        created_at=created_at,
+        bank_version=quiz_data.get("bank_version"),
+        max_questions=plan["num_questions"] if request.adaptive else None
     )
     
     # Build response (hide correct answers)
-    questions = []
-    for q in quiz_data["questions"]:
-        questions.append(QuizQuestion(
-            q_id=q["q_id"],
-            question=q["question"],
-            options=q["options"],
-            correct_answer="hidden",
-            topic=q.get("topic", chosen_topic),
-            sub_topic=q.get("sub_topic", chosen_topic),
-            difficulty=Difficulty(difficulty_str),
-            explanation=None
-        ))
-    
-    return QuizResponse(
+    return build_quiz_response(
         quiz_id=quiz_id,
         subject=request.domain,
         topic=chosen_topic,
         difficulty=Difficulty(difficulty_str),
-        questions=questions,
-        total_questions=len(questions),
+        quiz_data=quiz_data,
         time_limit_minutes=plan["num_questions"] * 2,
         created_at=created_at
     )
@@ -220,10 +332,12 @@ async def generate_quiz(
     """
     Manual quiz generation:
     - User chooses subject + topic + difficulty
+    - provider picks the question source (default: the bank)
     - 1 quiz per day limit
     """
     
     user_id = current_user["user_id"]
+    set_llm_caller("/quiz/generate", user_id)
     
     # Check daily limit
     has_taken = await check_daily_limit(user_id)
@@ -238,10 +352,9 @@ async def generate_quiz(
             }
         )
     
-    previous_questions = await quiz_service.get_previous_questions(
+    previous_questions = await quiz_service.get_seen_set(
         user_id=user_id,
-        topic=request.topic,
-        limit=50
+        topic=request.topic
     )
     
     try:
@@ -250,7 +363,13 @@ async def generate_quiz(
             topic=request.topic,
             difficulty=request.difficulty.value,
             num_questions=request.num_questions,
-            previous_questions=previous_questions
+            previous_questions=previous_questions,
+            provider=request.provider
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "providers": quiz_agent.provider_names()}
         )
     except Exception as e:
         raise HTTPException(
@@ -268,34 +387,217 @@ async def generate_quiz(
         topic=request.topic,
         difficulty=request.difficulty.value,
         questions=quiz_data["questions"],
-        created_at=created_at
+        created_at=created_at,
+        bank_version=quiz_data.get("bank_version")
     )
     
-    questions = []
-    for q in quiz_data["questions"]:
-        questions.append(QuizQuestion(
-            q_id=q["q_id"],
-            question=q["question"],
-            options=q["options"],
-            correct_answer="hidden",
-            topic=q.get("topic", request.topic),
-            sub_topic=q.get("sub_topic"),
-            difficulty=Difficulty(q.get("difficulty", request.difficulty.value)),
-            explanation=None
-        ))
-    
-    return QuizResponse(
+    return build_quiz_response(
         quiz_id=quiz_id,
         subject=request.subject,
         topic=request.topic,
         difficulty=request.difficulty,
-        questions=questions,
-        total_questions=len(questions),
+        quiz_data=quiz_data,
         time_limit_minutes=request.num_questions * 2,
         created_at=created_at
     )
 
 
+@router.post("/generate/stream")
+async def generate_quiz_stream(
+    request: QuizRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streaming quiz generation (server-sent events):
+    - "quiz": the envelope (quiz_id, subject, topic, ...), sent first
+    - "question": one answer-stripped question as soon as it is ready
+    - "done": the final question count, sent once the quiz is saved
+    - Same rules as /quiz/generate; answers go to /quiz/submit as usual
+    """
+    
+    user_id = current_user["user_id"]
+    set_llm_caller("/quiz/generate/stream", user_id)
+    
+    has_taken = await check_daily_limit(user_id)
+    if has_taken:
+        next_time = await get_next_quiz_time(user_id)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "message": "You have already taken a quiz today!",
+                "next_quiz_available": next_time,
+                "wait_message": "Please come back tomorrow for your next quiz."
+            }
+        )
+    
+    # Reject unknown providers before the stream starts
+    try:
+        quiz_agent.get_provider(request.provider)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "providers": quiz_agent.provider_names()}
+        )
+    
+    previous_questions = await quiz_service.get_seen_set(
+        user_id=user_id,
+        topic=request.topic
+    )
+    
+    quiz_id = f"quiz_{secrets.token_hex(8)}"
+    created_at = datetime.utcnow()
+    bank = quiz_agent.bank
+    
+    async def events():
+        yield sse_event("quiz", json.dumps({
+            "quiz_id": quiz_id,
+            "subject": request.subject,
+            "topic": request.topic,
+            "difficulty": request.difficulty.value,
+            "total_questions": request.num_questions,
+            "time_limit_minutes": request.num_questions * 2,
+            "created_at": created_at.isoformat()
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        
+        questions = []
+        try:
+            async for question, fragment in quiz_agent.stream_quiz(
+                subject=request.subject,
+                topic=request.topic,
+                difficulty=request.difficulty.value,
+                num_questions=request.num_questions,
+                previous_questions=previous_questions,
+                provider=request.provider,
+                bank=bank
+            ):
+                questions.append(question)
+                yield sse_event("question", b'{"q_id":' + json.dumps(question["q_id"]).encode("utf-8") + fragment)
+            
+            # Saved only once complete, so /quiz/submit sees the same quiz the client did
+            await quiz_service.save_quiz(
+                quiz_id=quiz_id,
+                user_id=user_id,
+                subject=request.subject,
+                topic=request.topic,
+                difficulty=request.difficulty.value,
+                questions=questions,
+                created_at=created_at,
+                bank_version=bank.version
+            )
+        except Exception as e:
+            print(f"Error streaming quiz {quiz_id}: {e}")
+            yield sse_event("error", json.dumps({"message": f"Failed to generate quiz: {e}"}).encode("utf-8"))
+            return
+        
+        yield sse_event("done", json.dumps({"quiz_id": quiz_id, "total_questions": len(questions)}).encode("utf-8"))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/adaptive/next")
+async def next_adaptive_question(
+    request: AdaptiveAnswerRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Adaptive quiz step:
+    - Send answers to every question served so far
+    - Returns the most informative next question at the updated ability estimate
+    - done=true once the estimate is precise enough (or the quiz is full); then POST /quiz/submit
+    """
+    
+    user_id = current_user["user_id"]
+    
+    quiz = await quiz_service.get_quiz(request.quiz_id)
+    
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+    
+    if quiz["user_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    
+    if quiz.get("is_completed"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Quiz already submitted"
+        )
+    
+    if not quiz.get("max_questions"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not an adaptive quiz"
+        )
+    
+    questions = quiz["questions"]
+    answer_lookup = {a.q_id: a.selected_option for a in request.answers}
+    
+    missing = [q["q_id"] for q in questions if q["q_id"] not in answer_lookup]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Answer every served question first", "missing": missing}
+        )
+    
+    answered = [
+        (q["item_id"], answer_lookup[q["q_id"]].upper() == q["correct_answer"].upper())
+        for q in questions if q.get("item_id")
+    ]
+    
+    ability = await quiz_service.get_user_ability(user_id)
+    previous_questions = await quiz_service.get_seen_set(user_id=user_id, topic=quiz["topic"])
+    
+    try:
+        step = await quiz_agent.next_adaptive_question(
+            topic=quiz["topic"],
+            load_params=quiz_service.get_item_params,
+            prior_ability=ability if ability is not None else DIFFICULTY_PRIORS.get(quiz["difficulty"], 0.0),
+            answered=answered,
+            served={q["item_id"] for q in questions if q.get("item_id")},
+            max_questions=quiz["max_questions"],
+            min_questions=settings.MIN_QUESTIONS_PER_QUIZ,
+            target_standard_error=settings.CAT_TARGET_STANDARD_ERROR,
+            previous_questions=previous_questions
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to pick next question: {str(e)}"
+        )
+    
+    question = b"null"
+    if not step["done"]:
+        new_question = step["questions"][0]
+        questions.append(new_question)
+        await quiz_service.add_quiz_question(request.quiz_id, user_id, questions)
+        question = b'{"q_id":' + json.dumps(new_question["q_id"]).encode("utf-8") + step["public_fragments"][0]
+    
+    head = json.dumps(
+        {
+            "quiz_id": request.quiz_id,
+            "done": step["done"],
+            "ability": round(step["ability"], 3),
+            "standard_error": round(step["standard_error"], 3),
+            "total_questions": len(questions),
+            "max_questions": quiz["max_questions"]
+        },
+        separators=(",", ":")
+    )
+    return Response(
+        content=head[:-1].encode("utf-8") + b',"question":' + question + b"}",
+        media_type="application/json"
+    )
+
+
 @router.post("/submit", response_model=QuizResult)
 async def submit_quiz(
     submission: AnswerSubmission,
@@ -329,6 +631,7 @@ async def submit_quiz(
     results = []
     correct_count = 0
     topic_breakdown = {}
+    item_outcomes = []
     
     answer_lookup = {a.q_id: a for a in submission.answers}
     
@@ -350,6 +653,14 @@ async def submit_quiz(
         if is_correct:
             topic_breakdown[topic]["correct"] += 1
         
+        if q.get("item_id"):
+            item_outcomes.append({
+                "item_id": q["item_id"],
+                "selected": selected,
+                "is_correct": is_correct,
+                "time_taken": user_answer.time_taken_seconds if user_answer else 0
+            })
+        
         results.append(QuestionResult(
             q_id=q_id,
             question=q["question"],
@@ -372,7 +683,8 @@ async def submit_quiz(
         total=total,
         time_taken=submission.total_time_seconds,
         topic_breakdown=topic_breakdown,
-        completed_at=completed_at
+        completed_at=completed_at,
+        item_outcomes=item_outcomes
     )
     
     await quiz_service.update_user_stats(user_id)
@@ -390,6 +702,19 @@ async def submit_quiz(
     )
 
 
+@router.get("/items/stats")
+async def get_item_stats(
+    item_ids: List[str] = Query(..., description="Question content hashes"),
+    current_user: dict = Depends(get_admin_user)
+):
+    """Get running statistics (attempts, accuracy, option picks, mean time) per question (admin only)"""
+    stats = await quiz_service.get_item_stats(item_ids[:100])
+    return {
+        "total_items": len(stats),
+        "items": stats
+    }
+
+
 @router.get("/history")
 async def get_quiz_history(
     current_user: dict = Depends(get_current_user),
@@ -435,6 +760,148 @@ async def get_available_topics(subject: Optional[str] = Query(default=None)):
     return {"subjects": list(topics.keys()), "topics_by_subject": topics}
 
 
+@router.get("/bank/search")
+async def search_question_bank(
+    q: str = Query(..., min_length=1, description="Free-text query"),
+    topic: Optional[str] = Query(default=None),
+    difficulty: Optional[Difficulty] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: dict = Depends(get_admin_user)
+):
+    """Full-text search over question, option and explanation text, ranked by BM25 (admin only)"""
+    
+    bank = quiz_agent.bank
+    # Built by the first search, off the event loop and without blocking quiz requests
+    index = await asyncio.to_thread(bank.search_index)
+    
+    started = time.perf_counter()
+    hits, total = index.search(
+        q,
+        topic=topic,
+        difficulty=difficulty.value if difficulty else None,
+        limit=limit
+    )
+    took_ms = (time.perf_counter() - started) * 1000
+    
+    items = bank.get_items([key for key, _ in hits])
+    results = []
+    for key, score in hits:
+        item = items.get(key)
+        if item is not None:
+            results.append({
+                "item_id": item.item_id,
+                "score": round(score, 3),
+                "topic": item.topic,
+                "difficulty": item.difficulty,
+                "question": item.question,
+                "options": item.options,
+                "correct_answer": item.correct_answer,
+                "explanation": item.explanation
+            })
+    
+    return {
+        "query": q,
+        "total_matches": total,
+        "took_ms": round(took_ms, 3),
+        "results": results
+    }
+
+
+@router.post("/bank/reload")
+async def reload_question_bank(current_user: dict = Depends(get_admin_user)):
+    """Hot-reload the question bank (admin only)"""
+    result = await quiz_agent.reload_bank()
+    return {
+        "message": "Question bank reloaded",
+        **result
+    }
+
+
+@router.post("/bank/import")
+async def import_question_bank(
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    allow_new_topics: bool = Query(default=False),
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Bulk-import questions from an NDJSON or CSV request body (admin only).
+    
+    The body is streamed to a temp file, so uploads of any size use
+    constant memory, then imported and hot-reloaded.
+    """
+    
+    fd, path = tempfile.mkstemp(suffix=f".{format}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                await asyncio.to_thread(f.write, chunk)
+        
+        bank = quiz_agent.bank
+        try:
+            report = await asyncio.to_thread(
+                import_questions,
+                path,
+                format,
+                seed_path=bank.seed_path,
+                db_path=bank.db_path,
+                allow_new_topics=allow_new_topics
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not read import: {e}"
+            )
+    finally:
+        os.unlink(path)
+    
+    reload = await quiz_agent.reload_bank() if report["imported"] else None
+    return {
+        "message": f"Imported {report['imported']} questions",
+        **report,
+        "reload": reload
+    }
+
+
+@router.get("/providers")
+async def list_generation_providers(current_user: dict = Depends(get_admin_user)):
+    """Question providers available to /quiz/generate, with cache and coalescing counters (admin only)"""
+    providers = []
+    for name in quiz_agent.provider_names():
+        provider = quiz_agent.providers.get(name)
+        providers.append({"name": name, **(provider.stats() if provider is not None else {})})
+    return {
+        "providers": providers,
+        "deadline_seconds": quiz_agent.provider_deadline_seconds,
+        "fallbacks": quiz_agent.provider_fallbacks,
+        "prompts": prompt_registry.stats()
+    }
+
+
+@router.get("/llm/usage")
+async def get_llm_usage(
+    days: int = Query(default=7, ge=1, le=90),
+    group_by: str = Query(default="topic", pattern="^(day|endpoint|user|deployment|topic)$"),
+    limit: int = Query(default=50, ge=1, le=500),
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Tokens, latency and estimated cost of LLM calls, most expensive first (admin only).
+    
+    Rows come from the daily rollup, grouped by day, endpoint, user,
+    deployment or topic; `live` has recent per-deployment p50/p95 latency.
+    """
+    await llm_telemetry.flush()
+    totals = await llm_telemetry.usage(days=days, group_by=None)
+    return {
+        "period_days": days,
+        "group_by": group_by,
+        "totals": totals[0] if totals else None,
+        "rows": await llm_telemetry.usage(days=days, group_by=group_by, limit=limit),
+        "live": llm_telemetry.stats()
+    }
+
+
 @router.get("/test")
 async def test_quiz():
     """Test endpoint"""
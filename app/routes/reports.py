@@ -17,7 +17,7 @@ from app.models.performance import (
     Trend
 )
 from app.routes.auth import get_current_user
-from app.services.ai_agent import QuizAgent
+from app.services.ai_agent import quiz_agent
 from app.services.analysis_service import AnalysisService
 from app.database.connection import get_database
 
@@ -28,7 +28,6 @@ from app.database.connection import get_database
 router = APIRouter()
 
 # Initialize services
-quiz_agent = QuizAgent()
 analysis_service = AnalysisService()
 
 # ============================================
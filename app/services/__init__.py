@@ -2,13 +2,14 @@
 QuizSense AI - Services Package
 """
 
-from app.services.ai_agent import QuizAgent
+from app.services.ai_agent import QuizAgent, quiz_agent
 from app.services.quiz_service import QuizService
 from app.services.analysis_service import AnalysisService
 from app.services.learning_agent import LearningAgent, learning_agent
 
 __all__ = [
     "QuizAgent",
+    "quiz_agent",
     "QuizService",
     "AnalysisService",
     "LearningAgent",
@@ -0,0 +1,340 @@
+"""
+QuizSense AI - Bank Growth
+Finds topic/difficulty cells that are running out of unseen questions and
+tops them up off-peak with generated ones, through the normal import path.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.database.connection import DATABASE_PATH
+from app.services.bank_import import DIFFICULTIES, import_questions, known_topics
+from app.services.file_lock import lock_for
+from app.services.llm_provider import GenerationProvider, ProviderError, ProviderOverloadedError
+from app.services.llm_scheduler import PRIORITY_BACKGROUND
+from app.services.llm_telemetry import set_llm_caller
+from app.services.near_duplicates import DUPLICATE_THRESHOLD, minhash, similarity
+from app.services.question_bank import BANK_DB_PATH, BANK_SEED_PATH, QuestionBank, ensure_compiled
+from app.services.seen_set import SeenSet
+
+# A cell's headroom is what the most-exposed tenth of its recent learners have left unseen
+HEADROOM_PERCENTILE = 0.1
+
+# Recent questions of a cell shown to the model as "avoid these"
+AVOID_EXAMPLES = 20
+AVOID_CHARS = 120
+
+# Give up on a cell after this many batches in a row add nothing new
+MAX_EMPTY_BATCHES = 2
+
+Cell = Tuple[str, str]
+
+
+def growth_lock_path(db_path: Path) -> Path:
+    """Lock file held by the one process that grows a bank"""
+    return db_path.with_name(f"{db_path.name}.growth.lock")
+
+
+def subject_for_topic(topic: str) -> str:
+    """The learning path a topic belongs to (the topic itself if none)"""
+    from app.services.learning_agent import learning_agent
+    for subject, path in learning_agent.learning_paths.items():
+        if any(step["topic"] == topic for step in path):
+            return subject
+    return topic
+
+
+# ============================================
+# Planning
+# ============================================
+
+def read_supply(db_path: Path) -> Dict[Cell, List[Tuple[str, str, str]]]:
+    """(item_id, dup_group, question) for every bank item, by cell, oldest first"""
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        supply: Dict[Cell, List[Tuple[str, str, str]]] = {}
+        for topic, difficulty, item_id, group, question in conn.execute(
+            "SELECT topic, difficulty, item_id, dup_group, question FROM items ORDER BY seq"
+        ):
+            supply.setdefault((topic, difficulty), []).append((item_id, group, question))
+        return supply
+    finally:
+        conn.close()
+
+
+def read_usage(app_db_path: Path, since: datetime) -> Tuple[Dict[Cell, int], Dict[str, List[SeenSet]]]:
+    """Questions served per cell, and recent learners' seen-sets per topic, since `since`"""
+
+    demand: Dict[Cell, int] = {}
+    seen: Dict[str, List[SeenSet]] = {}
+    if not Path(app_db_path).exists():
+        return demand, seen
+
+    conn = sqlite3.connect(f"file:{app_db_path}?mode=ro", uri=True)
+    try:
+        for topic, difficulty, served in conn.execute(
+            """
+            SELECT topic, difficulty, COALESCE(SUM(json_array_length(questions)), 0)
+            FROM quizzes WHERE created_at >= ?
+            GROUP BY topic, difficulty
+            """,
+            (since.isoformat(),)
+        ):
+            demand[(topic, difficulty)] = served
+        for topic, bits in conn.execute(
+            "SELECT topic, bits FROM seen_items WHERE updated_at >= ?",
+            (since.isoformat(),)
+        ):
+            seen.setdefault(topic, []).append(SeenSet(bits))
+    except sqlite3.OperationalError:
+        # App database not initialized yet
+        pass
+    finally:
+        conn.close()
+    return demand, seen
+
+
+def headroom(items: List[Tuple[str, str, str]], seen_sets: Sequence[SeenSet]) -> int:
+    """Distinct unseen questions (near-duplicates count once) left for the most-exposed learners"""
+
+    groups: Dict[str, List[str]] = {}
+    for item_id, group, _ in items:
+        groups.setdefault(group, []).append(item_id)
+    if not seen_sets:
+        return len(groups)
+
+    unseen = sorted(
+        sum(1 for members in groups.values() if any(item_id not in s for item_id in members))
+        for s in seen_sets
+    )
+    return unseen[int(len(unseen) * HEADROOM_PERCENTILE)]
+
+
+def plan_growth(
+    db_path: Path = BANK_DB_PATH,
+    seed_path: Path = BANK_SEED_PATH,
+    app_db_path: Path = DATABASE_PATH,
+    target_unseen: int = 30,
+    demand_days: int = 14
+) -> List[Dict]:
+    """
+    Cells whose headroom is below target_unseen, busiest first.
+
+    Every difficulty of every bank or learning-path topic is considered,
+    so an empty cell is planned too. Demand is the number of questions
+    quizzes served from the cell over the last `demand_days`; headroom
+    comes from the seen-sets of learners active in that period.
+    """
+
+    ensure_compiled(seed_path, db_path)
+    supply = read_supply(db_path)
+    demand, seen = read_usage(app_db_path, datetime.utcnow() - timedelta(days=demand_days))
+
+    topics = known_topics() | {topic for topic, _ in supply}
+    plan = []
+    for topic in sorted(topics):
+        for difficulty in DIFFICULTIES:
+            items = supply.get((topic, difficulty), [])
+            left = headroom(items, seen.get(topic, []))
+            if left >= target_unseen:
+                continue
+            plan.append({
+                "topic": topic,
+                "difficulty": difficulty,
+                "supply": len({group for _, group, _ in items}),
+                "demand": demand.get((topic, difficulty), 0),
+                "headroom": left,
+                "deficit": target_unseen - left,
+                "examples": [question for _, _, question in items[-AVOID_EXAMPLES:]]
+            })
+    plan.sort(key=lambda cell: (-cell["demand"], -cell["deficit"], cell["topic"], cell["difficulty"]))
+    return plan
+
+
+# ============================================
+# Growing
+# ============================================
+
+async def grow_cells(
+    provider: GenerationProvider,
+    plan: List[Dict],
+    db_path: Path = BANK_DB_PATH,
+    seed_path: Path = BANK_SEED_PATH,
+    max_items: int = 200,
+    batch_size: int = 10
+) -> Dict:
+    """
+    Generate questions for planned cells and import them in one batch.
+
+    Calls run at background priority, so they queue behind interactive
+    ones, and an over-quota scheduler ends the run early. Generated items
+    already in the bank or close to a bank item or an earlier item of this
+    run are dropped before import; the import itself validates again and
+    skips exact duplicates.
+    """
+
+    set_llm_caller("bank_growth")
+    bank = QuestionBank(seed_path=seed_path, db_path=db_path)
+    report = {
+        "cells": 0,
+        "calls": 0,
+        "generated": 0,
+        "accepted": 0,
+        "duplicates": 0,
+        "off_cell": 0,
+        "failures": 0,
+        "stopped_early": False,
+        "imported": 0
+    }
+    accepted: List[Dict] = []
+    try:
+        for cell in plan:
+            budget = max_items - len(accepted)
+            if budget <= 0 or report["stopped_early"]:
+                break
+            report["cells"] += 1
+            try:
+                await _grow_cell(provider, cell, bank, min(cell["deficit"], budget), batch_size, accepted, report)
+            except ProviderOverloadedError as e:
+                print(f"⏸️ Bank growth paused, LLM quota busy: {e}")
+                report["stopped_early"] = True
+            except ProviderError as e:
+                print(f"⚠️ Bank growth skipped {cell['topic']} ({cell['difficulty']}): {e}")
+                report["failures"] += 1
+    finally:
+        bank.close()
+
+    report["accepted"] = len(accepted)
+    if accepted:
+        fd, path = tempfile.mkstemp(suffix=".ndjson")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for q in accepted:
+                    f.write(json.dumps(q, ensure_ascii=False) + "\n")
+            result = await asyncio.to_thread(
+                import_questions, path, "ndjson", seed_path=seed_path, db_path=db_path, workers=0
+            )
+        finally:
+            os.unlink(path)
+        report["imported"] = result["imported"]
+        report["bank_version"] = result.get("bank_version")
+    return report
+
+
+async def _grow_cell(
+    provider: GenerationProvider,
+    cell: Dict,
+    bank: QuestionBank,
+    wanted: int,
+    batch_size: int,
+    accepted: List[Dict],
+    report: Dict
+):
+    """Append up to `wanted` new questions for one cell to `accepted` (kept if a later call fails)"""
+
+    topic, difficulty = cell["topic"], cell["difficulty"]
+    subject = subject_for_topic(topic)
+    examples = list(cell["examples"])
+    signatures: List[bytes] = []
+    added_total = 0
+    empty_batches = 0
+
+    while added_total < wanted and empty_batches < MAX_EMPTY_BATCHES:
+        avoid = [text[:AVOID_CHARS] for text in examples[-AVOID_EXAMPLES:]]
+        report["calls"] += 1
+        generated = await provider.generate(
+            subject, topic, difficulty, min(batch_size, wanted - added_total),
+            priority=PRIORITY_BACKGROUND, avoid=avoid
+        )
+        report["generated"] += len(generated)
+
+        added = 0
+        for q in generated:
+            if q["difficulty"] != difficulty:
+                report["off_cell"] += 1
+                continue
+            signature = minhash(q["question"], q["options"], q["correct_answer"])
+            if any(similarity(signature, other) >= DUPLICATE_THRESHOLD for other in signatures) or \
+                    await asyncio.to_thread(bank.find_near_duplicate, q["question"], q["options"], q["correct_answer"]):
+                report["duplicates"] += 1
+                continue
+            signatures.append(signature)
+            examples.append(q["question"])
+            accepted.append({key: q[key] for key in
+                             ("topic", "difficulty", "question", "options", "correct_answer", "explanation")})
+            added += 1
+            if added_total + added >= wanted:
+                break
+        added_total += added
+        empty_batches = 0 if added else empty_batches + 1
+
+
+# ============================================
+# Off-Peak Scheduling
+# ============================================
+
+def in_window(window: str, now: Optional[datetime] = None) -> bool:
+    """Whether the local hour falls in a "start-end" window such as "1-5" or "22-4" (end exclusive)"""
+    start, end = (int(part) for part in window.split("-"))
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+async def grow_bank(
+    agent,
+    provider_name: str,
+    app_db_path: Path = DATABASE_PATH,
+    target_unseen: int = 30,
+    demand_days: int = 14,
+    max_items: int = 200,
+    batch_size: int = 10
+) -> Dict:
+    """One growth pass for the agent's bank; hot-reloads it if anything was imported"""
+
+    provider = agent.get_provider(provider_name)
+    if provider is None:
+        raise ValueError("Bank growth needs a generation provider, not the bank itself")
+
+    bank = agent.bank
+    plan = await asyncio.to_thread(
+        plan_growth, bank.db_path, bank.seed_path, app_db_path, target_unseen, demand_days
+    )
+    report = await grow_cells(provider, plan, bank.db_path, bank.seed_path, max_items, batch_size)
+    report["planned_cells"] = len(plan)
+    if report["imported"]:
+        await agent.reload_bank()
+
+    print(f"🌱 Bank growth: {report['imported']} questions added across {report['cells']} "
+          f"of {len(plan)} thin cells ({report['calls']} calls)")
+    return report
+
+
+async def watch_growth(agent, provider_name: str, interval_seconds: float, window: str, **kwargs):
+    """
+    Run a growth pass every interval, whenever the clock is inside the off-peak window.
+
+    Every worker runs this, but only one grows the bank: the first to take
+    the growth lock keeps it for its lifetime, and the others keep trying
+    in case it exits.
+    """
+
+    runner = lock_for(growth_lock_path(agent.bank.db_path))
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if not in_window(window):
+            continue
+        if not runner.held and not runner.acquire(blocking=False):
+            continue
+        try:
+            await grow_bank(agent, provider_name, **kwargs)
+        except Exception as e:
+            print(f"Error growing question bank: {e}")
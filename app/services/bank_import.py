@@ -0,0 +1,318 @@
+"""
+QuizSense AI - Bulk Question Import
+Streams NDJSON or CSV questions into the bank: validated in a process
+pool, deduplicated by content hash and written in batched transactions.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from app.services.file_lock import lock_for
+from app.services.question_bank import (
+    BANK_DB_PATH,
+    BANK_SEED_PATH,
+    COMPILE_BATCH_SIZE,
+    bank_lock_path,
+    compile_bank,
+    is_stale,
+    next_bank_version,
+    prepare_item,
+    temp_bank_path,
+    write_item,
+    write_meta
+)
+
+
+OPTION_KEYS = ("A", "B", "C", "D")
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# CSV header: one column per option key
+CSV_COLUMNS = ("topic", "difficulty", "question", *OPTION_KEYS, "correct_answer", "explanation")
+
+# Records per worker task, and how many tasks may be in flight per worker
+IMPORT_CHUNK_SIZE = 2000
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+# Default worker count cap: imports run beside a live server
+MAX_IMPORT_WORKERS = 4
+
+MAX_REPORTED_ERRORS = 100
+
+
+def known_topics() -> FrozenSet[str]:
+    """Topics on some learning path (import_questions adds the bank's own)"""
+    from app.services.learning_agent import learning_agent
+    return frozenset(
+        step["topic"] for path in learning_agent.learning_paths.values() for step in path
+    )
+
+
+# ============================================
+# Validation (runs in worker processes)
+# ============================================
+
+def validate_question(record: Dict, topics: Optional[FrozenSet[str]]) -> Dict:
+    """
+    Normalize one question record, or raise ValueError saying what's wrong.
+
+    Requires exactly four non-empty options A-D, a correct_answer naming
+    one of them, a known difficulty and (unless `topics` is None) a known
+    topic.
+    """
+
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+
+    topic = str(record.get("topic") or "").strip()
+    if not topic:
+        raise ValueError("missing topic")
+    if topics is not None and topic not in topics:
+        raise ValueError(f"unknown topic: {topic}")
+
+    difficulty = str(record.get("difficulty") or "").strip().lower()
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+
+    question = str(record.get("question") or "").strip()
+    if not question:
+        raise ValueError("missing question")
+
+    options = record.get("options")
+    if options is None:
+        options = {key: record.get(key) for key in OPTION_KEYS}
+    if not isinstance(options, dict):
+        raise ValueError("options must be an object")
+    options = {str(k).strip().upper(): str(v).strip() for k, v in options.items() if v is not None}
+    if sorted(options) != list(OPTION_KEYS) or not all(options.values()):
+        raise ValueError("options must be exactly A, B, C and D, all non-empty")
+
+    correct_answer = str(record.get("correct_answer") or "").strip().upper()
+    if correct_answer not in options:
+        raise ValueError("correct_answer must be one of the option keys")
+
+    return {
+        "topic": topic,
+        "difficulty": difficulty,
+        "question": question,
+        "options": {key: options[key] for key in OPTION_KEYS},
+        "correct_answer": correct_answer,
+        "explanation": str(record.get("explanation") or "").strip()
+    }
+
+
+def _prepare_chunk(
+    records: List[Tuple[int, object]],
+    topics: Optional[FrozenSet[str]]
+) -> List[Tuple[int, Optional[tuple], Optional[str], Optional[str]]]:
+    """
+    Worker task: parse, validate, hash and MinHash a chunk of records.
+
+    Returns (line number, prepared row, seed line, error) per record, with
+    either the row and seed line or the error set.
+    """
+
+    results = []
+    for line_no, record in records:
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            q = validate_question(record, topics)
+        except (ValueError, TypeError) as e:
+            results.append((line_no, None, None, str(e)))
+            continue
+        results.append((line_no, prepare_item(q), json.dumps(q, ensure_ascii=False), None))
+    return results
+
+
+# ============================================
+# Reading
+# ============================================
+
+def _read_records(source: Path, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Stream (line number, record) pairs; NDJSON lines are left for the workers to parse"""
+
+    with open(source, encoding="utf-8", newline="") as f:
+        if fmt == "ndjson":
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, line
+        elif fmt == "csv":
+            reader = csv.DictReader(f)
+            missing = [c for c in CSV_COLUMNS[:-1] if c not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            raise ValueError(f"Unknown import format: {fmt}")
+
+
+def _chunks(records: Iterator[Tuple[int, object]], size: int) -> Iterator[List[Tuple[int, object]]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _prepared_results(
+    chunks: Iterator[List[Tuple[int, object]]],
+    topics: Optional[FrozenSet[str]],
+    workers: int
+) -> Iterator[Tuple[int, Optional[tuple], Optional[str], Optional[str]]]:
+    """
+    Run _prepare_chunk over the input, in order.
+
+    At most workers * CHUNKS_IN_FLIGHT_PER_WORKER chunks are submitted at
+    once, so memory stays bounded however long the input is. workers=0
+    prepares inline.
+    """
+
+    if workers <= 0:
+        for chunk in chunks:
+            yield from _prepare_chunk(chunk, topics)
+        return
+
+    # spawn, not fork: we're called from a thread of a running server, and
+    # a forked child would inherit other threads' locks mid-use
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_prepare_chunk, chunk, topics))
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+# ============================================
+# Import
+# ============================================
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def import_questions(
+    source: Path,
+    fmt: str = "ndjson",
+    seed_path: Path = BANK_SEED_PATH,
+    db_path: Path = BANK_DB_PATH,
+    workers: Optional[int] = None,
+    allow_new_topics: bool = False
+) -> Dict:
+    """
+    Import questions from an NDJSON or CSV file into the bank.
+
+    The current compiled bank is copied and new items are appended to the
+    copy (committing every COMPILE_BATCH_SIZE items), so the import costs
+    O(new items) rather than a full recompile. Items whose content hash is
+    already in the bank or earlier in the file are skipped. Accepted items
+    are also appended to the seed, and the copy is stamped with the new
+    seed signature and moved into place, so the next reload serves them
+    without recompiling. Imports into the same bank take turns, across
+    processes too, so none builds on a copy another is about to replace.
+    """
+
+    source = Path(source)
+    seed_path = Path(seed_path)
+    db_path = Path(db_path)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, MAX_IMPORT_WORKERS)
+    topics = None if allow_new_topics else known_topics()
+
+    with lock_for(bank_lock_path(db_path)):
+        started = time.perf_counter()
+        if is_stale(seed_path, db_path):
+            compile_bank(seed_path, db_path)
+
+        tmp_path = temp_bank_path(db_path)
+        seed_buffer = tmp_path.with_suffix(".seed")
+        shutil.copyfile(db_path, tmp_path)
+
+        report = {
+            "read": 0,
+            "imported": 0,
+            "duplicates": 0,
+            "near_duplicates": 0,
+            "invalid": 0,
+            "errors": []
+        }
+
+        conn = sqlite3.connect(str(tmp_path))
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            if topics is not None:
+                topics = topics | {row[0] for row in conn.execute("SELECT DISTINCT topic FROM items")}
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM items").fetchone()[0]
+
+            with open(seed_buffer, "w", encoding="utf-8") as buffer:
+                results = _prepared_results(
+                    _chunks(_read_records(source, fmt), IMPORT_CHUNK_SIZE),
+                    topics,
+                    workers
+                )
+                for line_no, row, seed_line, error in results:
+                    report["read"] += 1
+                    if error is not None:
+                        report["invalid"] += 1
+                        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                            report["errors"].append({"line": line_no, "error": error})
+                        continue
+
+                    # Earlier rows of this import are already in the file, so one lookup covers both
+                    near_duplicate = write_item(conn, seq + 1, row, skip_existing=True)
+                    if near_duplicate is None:
+                        report["duplicates"] += 1
+                        continue
+
+                    seq += 1
+                    report["near_duplicates"] += near_duplicate
+                    buffer.write(seed_line + "\n")
+                    report["imported"] += 1
+                    if report["imported"] % COMPILE_BATCH_SIZE == 0:
+                        conn.commit()
+
+            if report["imported"]:
+                # Seed first: if we stop before the swap, the bank is merely stale and recompiles
+                needs_newline = not _ends_with_newline(seed_path)
+                with open(seed_buffer, encoding="utf-8") as buffer, open(seed_path, "a", encoding="utf-8") as seed:
+                    if needs_newline:
+                        seed.write("\n")
+                    shutil.copyfileobj(buffer, seed)
+                report["bank_version"] = next_bank_version(db_path)
+                write_meta(conn, seed_path, report["bank_version"])
+            conn.commit()
+        finally:
+            conn.close()
+            seed_buffer.unlink(missing_ok=True)
+
+        if report["imported"]:
+            os.replace(tmp_path, db_path)
+        else:
+            tmp_path.unlink(missing_ok=True)
+
+        elapsed = time.perf_counter() - started
+        report["wall_seconds"] = round(elapsed, 3)
+        report["items_per_second"] = round(report["read"] / elapsed, 1) if elapsed > 0 else 0
+
+    print(f"📥 Imported {report['imported']} of {report['read']} questions "
+          f"({report['duplicates']} duplicates, {report['invalid']} invalid) in {report['wall_seconds']}s")
+    return report
@@ -0,0 +1,192 @@
+"""
+QuizSense AI - Question Bank Search
+In-process inverted index with BM25 ranking over question, option and
+explanation text.
+"""
+
+import math
+import re
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+# Too common in quiz questions to help ranking; dropped unless the query is nothing else
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "be", "by", "does", "for", "how", "in", "is", "it",
+    "of", "on", "or", "the", "to", "what", "which", "with"
+})
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+_INITIAL_CAPACITY = 1024
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over bank items.
+
+    Each term's postings are a pair of numpy arrays (doc numbers and term
+    frequencies), so a query scores all matching documents with a few
+    vectorized operations instead of a Python loop. Adding an item
+    appends to small per-term pending lists that are folded into the
+    arrays the next time the term is queried, so growing the index never
+    needs a rebuild. Removed items are tombstoned and left out of document
+    frequencies. Items are identified by any hashable key.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[Hashable] = []
+        self._docs: Dict[Hashable, int] = {}
+        self._topic_codes: Dict[str, int] = {}
+        self._difficulty_codes: Dict[str, int] = {}
+
+        self._lengths = np.zeros(_INITIAL_CAPACITY, dtype=np.float32)
+        self._topics = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._difficulties = np.zeros(_INITIAL_CAPACITY, dtype=np.int8)
+        self._live = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._pending: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._live_count = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._docs
+
+    def keys(self) -> List[Hashable]:
+        """Keys of every live item"""
+        with self._lock:
+            return list(self._docs.keys())
+
+    def _grow(self):
+        capacity = len(self._lengths) * 2
+        for name in ("_lengths", "_topics", "_difficulties", "_live"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, key: Hashable, topic: str, difficulty: str, text: str):
+        """Index one item (a no-op if it's already indexed)"""
+
+        terms: Dict[str, int] = {}
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0) + 1
+        length = sum(terms.values())
+
+        with self._lock:
+            if key in self._docs:
+                return
+            doc = len(self._keys)
+            if doc >= len(self._lengths):
+                self._grow()
+
+            self._keys.append(key)
+            self._docs[key] = doc
+            self._lengths[doc] = length
+            self._topics[doc] = self._topic_codes.setdefault(topic, len(self._topic_codes))
+            self._difficulties[doc] = self._difficulty_codes.setdefault(difficulty, len(self._difficulty_codes))
+            self._live[doc] = True
+            self._live_count += 1
+            self._total_length += length
+
+            for term, tf in terms.items():
+                docs, tfs = self._pending.setdefault(term, ([], []))
+                docs.append(doc)
+                tfs.append(tf)
+
+    def remove(self, key: Hashable):
+        """Drop an item from results (its postings stay until the next rebuild)"""
+        with self._lock:
+            doc = self._docs.pop(key, None)
+            if doc is not None and self._live[doc]:
+                self._live[doc] = False
+                self._live_count -= 1
+                self._total_length -= int(self._lengths[doc])
+
+    def _term_postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """A term's postings with any pending additions folded in (call under the lock)"""
+
+        postings = self._postings.get(term)
+        pending = self._pending.pop(term, None)
+        if pending is not None:
+            docs = np.array(pending[0], dtype=np.int32)
+            tfs = np.array(pending[1], dtype=np.float32)
+            if postings is not None:
+                docs = np.concatenate([postings[0], docs])
+                tfs = np.concatenate([postings[1], tfs])
+            postings = (docs, tfs)
+            self._postings[term] = postings
+        return postings
+
+    def search(
+        self,
+        query: str,
+        topic: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[Tuple[Hashable, float]], int]:
+        """
+        Rank items against a free-text query.
+
+        Returns up to `limit` (key, score) pairs, best first, and the
+        total number of items that matched at least one term.
+        """
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        terms = [t for t in terms if t not in STOPWORDS] or terms
+        if not terms:
+            return [], 0
+
+        with self._lock:
+            n = len(self._keys)
+            if n == 0 or self._live_count == 0:
+                return [], 0
+            if topic is not None and topic not in self._topic_codes:
+                return [], 0
+            if difficulty is not None and difficulty not in self._difficulty_codes:
+                return [], 0
+
+            avg_length = self._total_length / self._live_count
+            scores = np.zeros(n, dtype=np.float32)
+            for term in terms:
+                postings = self._term_postings(term)
+                if postings is None:
+                    continue
+                docs, tfs = postings
+                # Removed items keep their postings, so count only live ones
+                df = int(np.count_nonzero(self._live[docs]))
+                if df == 0:
+                    continue
+                idf = math.log(1 + (self._live_count - df + 0.5) / (df + 0.5))
+                norm = K1 * (1 - B + B * self._lengths[docs] / avg_length)
+                scores[docs] += idf * tfs * (K1 + 1) / (tfs + norm)
+
+            mask = (scores > 0) & self._live[:n]
+            if topic is not None:
+                mask &= self._topics[:n] == self._topic_codes[topic]
+            if difficulty is not None:
+                mask &= self._difficulties[:n] == self._difficulty_codes[difficulty]
+
+            matches = np.flatnonzero(mask)
+            if len(matches) > limit:
+                top = matches[np.argpartition(-scores[matches], limit - 1)[:limit]]
+            else:
+                top = matches
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            return [(self._keys[doc], float(scores[doc])) for doc in top], len(matches)
@@ -0,0 +1,77 @@
+"""
+QuizSense AI - File Locks
+Exclusive locks on lock files, held across processes (e.g. uvicorn
+workers and the CLI jobs) as well as across threads of one process.
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Optional, TextIO
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of this process are serialized
+    fcntl = None
+
+
+class FileLock:
+    """
+    flock() on a lock file, plus a thread lock for this process.
+
+    Use lock_for() rather than constructing one directly, so every caller
+    in a process shares the instance for a path.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._thread_lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock; with blocking=False, return False at once if someone else holds it"""
+
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if fcntl is None:
+            return True
+        f = open(self.path, "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            f.close()
+            self._thread_lock.release()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    @property
+    def held(self) -> bool:
+        return self._thread_lock.locked()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_locks: Dict[Path, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def lock_for(path: Path) -> FileLock:
+    """This process's lock on `path` (created on first use)"""
+    path = Path(path).resolve()
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = FileLock(path)
+        return lock
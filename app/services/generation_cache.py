@@ -0,0 +1,202 @@
+"""
+QuizSense AI - Generation Cache
+Two-tier cache of LLM-generated question sets: an in-process LRU in
+front of a SQLite file shared by every worker.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.question_bank import BASE_DIR
+
+GENERATION_CACHE_PATH = BASE_DIR / "data" / "generation_cache.sqlite"
+
+
+def cache_key(deployment: str, request: Dict) -> str:
+    """Hash of the deployment and everything that determines the request sent to it"""
+    canonical = json.dumps([deployment, request], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Question sets keyed by cache_key, with a TTL.
+
+    Lookups try the in-process LRU first (no I/O), then the SQLite tier,
+    promoting disk hits into memory. Both tiers are capped by entry count:
+    the LRU drops its least recently used entry, and the SQLite tier
+    drops expired entries and then the oldest ones whenever a store takes
+    it over its limit. The SQLite row count is tracked as entries are
+    stored and only recounted when it looks over the limit (other workers
+    write to the same file).
+
+    aget()/aput() are for the event loop: they answer from the LRU
+    directly and do the SQLite work in a worker thread.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = GENERATION_CACHE_PATH,
+        ttl_seconds: float = 86400,
+        memory_entries: int = 256,
+        max_entries: int = 10000
+    ):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+
+        self._memory: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS generation_cache (
+                    key TEXT PRIMARY KEY,
+                    questions TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generation_cache_expires ON generation_cache (expires_at)"
+            )
+            self._conn.commit()
+            self._rows = self._conn.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+        return self._conn
+
+    def _remember(self, key: str, expires_at: float, questions: List[Dict]):
+        """Put an entry in the LRU tier (call under the lock)"""
+        self._memory[key] = (expires_at, questions)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _get_memory(self, key: str, now: float) -> Optional[List[Dict]]:
+        """The LRU tier's entry, if it has a live one (call under the lock)"""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry[0] > now:
+            self._memory.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return entry[1]
+        del self._memory[key]
+        self._counters["expired"] += 1
+        return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[List[Dict]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT questions, expires_at FROM generation_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+
+            questions = json.loads(row[0])
+            self._remember(key, row[1], questions)
+            self._counters["disk_hits"] += 1
+            return questions
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        now = time.time()
+        with self._lock:
+            questions = self._get_memory(key, now)
+        return questions if questions is not None else self._get_disk(key, now)
+
+    async def aget(self, key: str) -> Optional[List[Dict]]:
+        now = time.time()
+        with self._lock:
+            questions = self._get_memory(key, now)
+        if questions is not None:
+            return questions
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    def _store(self, key: str, data: str, now: float, expires_at: float):
+        """Write one entry to the SQLite tier, trimming it if that takes it over max_entries"""
+        with self._lock:
+            conn = self._connection()
+            updated = conn.execute(
+                "UPDATE generation_cache SET questions = ?, expires_at = ? WHERE key = ?",
+                (data, expires_at, key)
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT OR REPLACE INTO generation_cache (key, questions, expires_at) VALUES (?, ?, ?)",
+                    (key, data, expires_at)
+                )
+                self._rows += 1
+
+            if self._rows > self.max_entries:
+                expired = conn.execute("DELETE FROM generation_cache WHERE expires_at <= ?", (now,)).rowcount
+                self._counters["expired"] += expired
+                self._rows = conn.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+                surplus = self._rows - self.max_entries
+                if surplus > 0:
+                    conn.execute(
+                        """
+                        DELETE FROM generation_cache WHERE key IN (
+                            SELECT key FROM generation_cache ORDER BY expires_at LIMIT ?
+                        )
+                        """,
+                        (surplus,)
+                    )
+                    self._counters["evictions"] += surplus
+                    self._rows -= surplus
+            conn.commit()
+
+    def _put_memory(self, key: str, questions: List[Dict]) -> Tuple[float, float]:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, questions)
+            self._counters["stores"] += 1
+        return now, expires_at
+
+    def put(self, key: str, questions: List[Dict]):
+        now, expires_at = self._put_memory(key, questions)
+        self._store(key, json.dumps(questions, ensure_ascii=False), now, expires_at)
+
+    async def aput(self, key: str, questions: List[Dict]):
+        now, expires_at = self._put_memory(key, questions)
+        data = json.dumps(questions, ensure_ascii=False)
+        await asyncio.to_thread(self._store, key, data, now, expires_at)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -4,9 +4,16 @@ Adaptive learning that acts like a real AI tutor!
 """
 
 import random
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 from datetime import datetime, timedelta
 
+from app.services.sampling import AliasTable
+
+
+# Per-user alias tables kept for mixed quizzes (least recently used evicted)
+TOPIC_SAMPLER_CACHE_SIZE = 10000
+
 
 class LearningAgent:
     """
@@ -20,6 +27,9 @@ class LearningAgent:
     def __init__(self):
         print("🤖 Learning Agent Initialized!")
         
+        # (user_id, domain) -> (stats signature, topics, alias table)
+        self._topic_samplers: "OrderedDict[Tuple[str, str], Tuple]" = OrderedDict()
+        
         # Learning paths: Domain -> Ordered topics (basic to advanced)
         self.learning_paths = {
             "Python Programming": [
@@ -209,6 +219,101 @@ class LearningAgent:
             "is_weak_area": decision.get("is_weak_area", False)
         }
 
+    
+    def topic_weights(self, domain: str, user_performance: Dict, topic_performance: Dict) -> Dict[str, float]:
+        """
+        Weakness weight per topic for mixed quizzes
+        
+        Attempted topics weigh (1 - accuracy), floored so mastered topics
+        still come up for review; unattempted topics weigh 0.5 once the
+        user's level has unlocked them.
+        """
+        
+        path = self.learning_paths.get(domain, self.learning_paths["Python Programming"])
+        user_level = self.analyze_user_level(user_performance)
+        
+        weights = {}
+        for topic_info in path:
+            topic = topic_info["topic"]
+            data = topic_performance.get(topic)
+            if data and data.get("attempts", 0) > 0:
+                weights[topic] = max(0.05, 1 - data.get("accuracy", 0) / 100)
+            elif topic_info["level"] <= user_level["level"] + 1:
+                weights[topic] = 0.5
+        
+        return weights
+    
+    def get_topic_sampler(
+        self,
+        user_id: str,
+        domain: str,
+        user_performance: Dict,
+        topic_performance: Dict
+    ) -> Tuple[List[str], AliasTable]:
+        """
+        Alias table over a domain's topics, weighted by the user's weakness
+        
+        Cached per (user, domain) and rebuilt only when the user's topic
+        stats change, so drawing a topic is O(1) per question.
+        """
+        
+        key = (user_id, domain)
+        signature = (
+            self.analyze_user_level(user_performance)["level"],
+            tuple(sorted(
+                (topic, data.get("attempts", 0), round(data.get("accuracy", 0), 1))
+                for topic, data in topic_performance.items()
+            ))
+        )
+        
+        cached = self._topic_samplers.get(key)
+        if cached is not None and cached[0] == signature:
+            self._topic_samplers.move_to_end(key)
+            return cached[1], cached[2]
+        
+        weights = self.topic_weights(domain, user_performance, topic_performance)
+        topics = list(weights.keys())
+        sampler = AliasTable([weights[t] for t in topics])
+        
+        self._topic_samplers[key] = (signature, topics, sampler)
+        self._topic_samplers.move_to_end(key)
+        while len(self._topic_samplers) > TOPIC_SAMPLER_CACHE_SIZE:
+            self._topic_samplers.popitem(last=False)
+        
+        return topics, sampler
+    
+    def plan_mixed_quiz(
+        self,
+        user_id: str,
+        domain: str,
+        user_performance: Dict,
+        topic_performance: Dict,
+        num_questions: int = 5
+    ) -> Dict:
+        """
+        Plan a quiz drawn across all of a domain's topics
+        Topics are sampled per question in proportion to the user's weakness
+        """
+        
+        if domain not in self.learning_paths:
+            domain = "Python Programming"  # Default
+        
+        topics, sampler = self.get_topic_sampler(user_id, domain, user_performance, topic_performance)
+        user_level = self.analyze_user_level(user_performance)
+        
+        return {
+            "domain": domain,
+            "topic": "Mixed",
+            "topics": topics,
+            "sampler": sampler,
+            "difficulty": user_level["difficulty"],
+            "num_questions": num_questions,
+            "reason": "Mixed review weighted towards your weakest topics.",
+            "user_level": user_level,
+            "is_new_topic": False,
+            "is_weak_area": False
+        }
+
 
 # Global instance
 learning_agent = LearningAgent()
\ No newline at end of file
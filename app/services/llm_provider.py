@@ -0,0 +1,709 @@
+"""
+QuizSense AI - Quiz Generation Providers
+Pluggable sources of fresh quiz questions. The bank is always available;
+an Azure OpenAI deployment can be added when it is configured.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Container, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.config import settings
+from app.services.generation_cache import GenerationCache, cache_key
+from app.services.llm_scheduler import (
+    CHARS_PER_TOKEN,
+    PRIORITY_INTERACTIVE,
+    SchedulerOverloaded,
+    TokenBucketScheduler,
+    estimate_tokens
+)
+from app.services.llm_telemetry import CallMetrics, LLMTelemetry, llm_telemetry
+from app.services.prompt_registry import PromptRegistry, prompt_registry
+from app.services.question_schema import (
+    QuestionStreamParser,
+    SchemaError,
+    extract_records,
+    validate_questions,
+    validate_record
+)
+from app.services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged
+from app.services.single_flight import SingleFlight
+
+# Name of the built-in provider that only samples the question bank
+BANK_PROVIDER = "bank"
+
+
+# Hedge at the observed p95 once there are this many samples, before that at a fixed delay
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+
+# Completion allowance per requested question (sent as max_tokens and reserved from the TPM quota)
+COMPLETION_TOKENS_PER_QUESTION = 150
+COMPLETION_TOKENS_MARGIN = 100
+
+
+class ProviderError(Exception):
+    """A generation provider failed or returned nothing usable"""
+
+
+class ProviderTimeoutError(ProviderError):
+    """A provider call timed out"""
+
+
+class ProviderOverloadedError(ProviderError):
+    """A call was shed because the provider's quota queue is too long, or throttled upstream (429)"""
+
+
+def parse_questions(content: str, topic: str, difficulty: str) -> List[Dict]:
+    """
+    Parse a model's JSON reply into quiz questions (without q_ids).
+
+    See question_schema: fences, prose and common defects are repaired,
+    invalid questions are dropped and the rest kept.
+    """
+
+    try:
+        records = extract_records(content)
+    except SchemaError as e:
+        raise ProviderError(str(e))
+    return validate_questions(records, topic, difficulty).questions
+
+
+def to_question(record: object, topic: str, difficulty: str) -> Optional[Dict]:
+    """One model-produced record as a quiz question, or None if it fails validation"""
+    return validate_record(record, topic, difficulty)[0]
+
+
+class GenerationProvider:
+    """Base class for question sources other than the bank"""
+
+    name = ""
+
+    async def generate(
+        self,
+        subject: str,
+        topic: str,
+        difficulty: str,
+        num_questions: int,
+        seen: Optional[Container[str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        avoid: Sequence[str] = ()
+    ) -> List[Dict]:
+        """
+        Return up to num_questions validated questions, or raise ProviderError.
+
+        `seen` holds item IDs the user has already answered; providers may
+        use it to pick among cached sets, and callers drop any that remain.
+        `priority` orders calls waiting on a rate-limited upstream (see
+        llm_scheduler; background jobs pass PRIORITY_BACKGROUND). `avoid`
+        lists question texts the new questions should not repeat.
+        """
+        raise NotImplementedError
+
+    async def stream(
+        self,
+        subject: str,
+        topic: str,
+        difficulty: str,
+        num_questions: int,
+        seen: Optional[Container[str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        avoid: Sequence[str] = ()
+    ) -> AsyncIterator[Dict]:
+        """Yield questions as they become available (by default, all at once after generate)"""
+        for q in await self.generate(subject, topic, difficulty, num_questions, seen, priority, avoid):
+            yield q
+
+    def stats(self) -> Dict:
+        """Counters for the admin providers endpoint"""
+        return {}
+
+    async def aclose(self):
+        """Release pooled connections"""
+
+
+class AzureOpenAIProvider(GenerationProvider):
+    """
+    Generates questions with an Azure OpenAI chat deployment.
+
+    Every call goes through one keep-alive httpx.AsyncClient, created on
+    first use, so connections and TLS sessions are reused across requests.
+    A semaphore caps in-flight calls at max_concurrency, which also sizes
+    the connection pool. Pass `transport` (e.g. httpx.MockTransport) to
+    talk to a fake endpoint.
+
+    With a `cache`, replies are stored under a hash of the deployment, the
+    prompt templates' content hashes and the request parameters, so
+    repeated requests for the same subject, topic, difficulty and size
+    skip the call without even rendering the prompt. If `serve_seen_filtered` is
+    False, a cached set the user has already seen part of is regenerated
+    instead of being served minus those items.
+
+    Calls that miss the cache go through a SingleFlight keyed the same
+    way plus the call's priority, so a burst of identical requests makes
+    one call between them, and an interactive request never waits behind
+    a background one queued at background priority.
+
+    Completions are hedged: if the first attempt hasn't answered by the
+    p95 of recent latencies (hedge_delay_seconds until there's enough
+    history), a second one is sent and the first answer wins. A circuit
+    breaker opens after `breaker_failures` consecutive errors or timeouts
+    and fails calls fast until `breaker_reset_seconds` have passed.
+
+    With a `scheduler`, every request first reserves its estimated prompt
+    and completion tokens against the deployment's TPM/RPM quotas, so
+    bursts queue locally (interactive calls first) instead of drawing 429s.
+    Calls the queue can't start within its delay budget, and calls the
+    upstream throttles (429), fail with ProviderOverloadedError, which
+    callers treat like any provider error (quizzes come from the bank)
+    but which doesn't trip the breaker.
+
+    Replies are validated item by item and repaired where possible (see
+    question_schema). If fewer than num_questions survive, up to
+    `follow_up_calls` more requests ask for just the missing ones.
+
+    With `telemetry`, every generate() and stream() call is recorded with
+    its tokens (the reply's usage, or estimated from text when there is
+    none, as with streams), queue wait, time to first token, latency,
+    cache hit and estimated cost, attributed to the caller set with
+    set_llm_caller().
+    """
+
+    name = "azure_openai"
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        deployment: str,
+        api_version: str = "2024-02-01",
+        max_concurrency: int = 8,
+        timeout_seconds: float = 30.0,
+        connect_timeout_seconds: float = 5.0,
+        temperature: float = 0.7,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        prompts: Optional[PromptRegistry] = None,
+        cache: Optional[GenerationCache] = None,
+        serve_seen_filtered: bool = True,
+        hedge_delay_seconds: Optional[float] = 3.0,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30.0,
+        scheduler: Optional[TokenBucketScheduler] = None,
+        follow_up_calls: int = 1,
+        telemetry: Optional[LLMTelemetry] = None
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.api_key = api_key
+        self.deployment = deployment
+        self.api_version = api_version
+        self.max_concurrency = max_concurrency
+        self.timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self.temperature = temperature
+        self.prompts = prompts or prompt_registry
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.cache = cache
+        self.serve_seen_filtered = serve_seen_filtered
+        self.flights = SingleFlight()
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_seconds)
+        self._hedges = 0
+        self.scheduler = scheduler
+        self.follow_up_calls = follow_up_calls
+        self._validation = {"valid": 0, "repaired": 0, "rejected": 0, "unparseable": 0, "follow_ups": 0}
+        self.telemetry = telemetry
+
+    @classmethod
+    def from_settings(cls) -> "AzureOpenAIProvider":
+        cache = None
+        if settings.GENERATION_CACHE_TTL_SECONDS > 0:
+            cache = GenerationCache(
+                ttl_seconds=settings.GENERATION_CACHE_TTL_SECONDS,
+                memory_entries=settings.GENERATION_CACHE_MEMORY_ENTRIES,
+                max_entries=settings.GENERATION_CACHE_MAX_ENTRIES
+            )
+        scheduler = None
+        if settings.LLM_TOKENS_PER_MINUTE > 0 and settings.LLM_REQUESTS_PER_MINUTE > 0:
+            scheduler = TokenBucketScheduler(
+                tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+                requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+                max_queue_delay_seconds=settings.LLM_MAX_QUEUE_DELAY_SECONDS
+            )
+        return cls(
+            endpoint=settings.AZURE_OPENAI_ENDPOINT,
+            api_key=settings.AZURE_OPENAI_KEY,
+            deployment=settings.AZURE_OPENAI_DEPLOYMENT,
+            api_version=settings.AZURE_OPENAI_API_VERSION,
+            max_concurrency=settings.AZURE_OPENAI_MAX_CONCURRENCY,
+            timeout_seconds=settings.AZURE_OPENAI_TIMEOUT_SECONDS,
+            cache=cache,
+            serve_seen_filtered=settings.GENERATION_CACHE_SERVE_SEEN_FILTERED,
+            hedge_delay_seconds=settings.LLM_HEDGE_DELAY_SECONDS if settings.LLM_HEDGE_DELAY_SECONDS > 0 else None,
+            breaker_failures=settings.LLM_BREAKER_FAILURES,
+            breaker_reset_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+            scheduler=scheduler,
+            telemetry=llm_telemetry if settings.LLM_TELEMETRY_FLUSH_SECONDS > 0 else None
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                headers={"api-key": self.api_key},
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                transport=self._transport
+            )
+        return self._client
+
+    def prompt_values(
+        self,
+        subject: str,
+        topic: str,
+        difficulty: str,
+        num_questions: int,
+        avoid: Sequence[str] = ()
+    ) -> Dict:
+        return {
+            "subject": subject,
+            "topic": topic,
+            "difficulty": difficulty,
+            "num_questions": num_questions,
+            "previous_questions": "".join(f"\n  - {text}" for text in avoid) or "None"
+        }
+
+    def build_messages(self, values: Dict) -> List[Dict]:
+        return [
+            {"role": "system", "content": self.prompts.render("system")},
+            {"role": "user", "content": self.prompts.render("quiz_generation", values)}
+        ]
+
+    @staticmethod
+    def max_tokens(num_questions: int) -> int:
+        return num_questions * COMPLETION_TOKENS_PER_QUESTION + COMPLETION_TOKENS_MARGIN
+
+    def build_request(self, messages: List[Dict], num_questions: int) -> Dict:
+        return {
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens(num_questions),
+            "response_format": {"type": "json_object"}
+        }
+
+    def request_key(self, values: Dict, num_questions: int) -> str:
+        """Cache and coalescing key for a request, computed without rendering its prompt"""
+        return cache_key(self.deployment, {
+            "prompts": self.prompts.version("system", "quiz_generation"),
+            "values": values,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens(num_questions)
+        })
+
+    @property
+    def _url(self) -> str:
+        return f"/openai/deployments/{self.deployment}/chat/completions"
+
+    def hedge_delay(self) -> Optional[float]:
+        if self.hedge_delay_seconds is None:
+            return None
+        if len(self.latency) < HEDGE_MIN_SAMPLES:
+            return self.hedge_delay_seconds
+        return self.latency.quantile(HEDGE_QUANTILE)
+
+    def _check_breaker(self):
+        try:
+            self.breaker.check()
+        except CircuitOpenError as e:
+            raise ProviderError(f"Azure OpenAI unavailable: {e}")
+
+    def _hedged(self):
+        self._hedges += 1
+
+    @contextmanager
+    def _track(self, topic: str, difficulty: str) -> Iterator[CallMetrics]:
+        """Metrics for one generate() or stream() call, recorded when it ends"""
+        metrics = CallMetrics(topic, difficulty)
+        try:
+            yield metrics
+        except (Exception, asyncio.CancelledError):
+            metrics.error = True
+            raise
+        finally:
+            metrics.latency = time.monotonic() - metrics.started
+            if self.telemetry is not None:
+                self.telemetry.record(self.deployment, metrics)
+
+    async def _reserve(self, body: Dict, priority: int) -> int:
+        """Wait for quota for this request; returns the tokens reserved"""
+        if self.scheduler is None:
+            return 0
+        tokens = estimate_tokens(body["messages"], body.get("max_tokens", 0))
+        try:
+            await self.scheduler.acquire(tokens, priority)
+        except SchedulerOverloaded as e:
+            raise ProviderOverloadedError(f"Azure OpenAI quota queue full: {e}")
+        return tokens
+
+    def _throttled(self, response: httpx.Response):
+        """Back off the scheduler after a 429, for as long as the upstream asks"""
+        if self.scheduler is None:
+            return
+        try:
+            retry_after = float(response.headers.get("retry-after", "1"))
+        except ValueError:
+            retry_after = 1.0
+        self.scheduler.pause(retry_after)
+
+    async def complete(
+        self,
+        body: Dict,
+        priority: int = PRIORITY_INTERACTIVE,
+        metrics: Optional[CallMetrics] = None
+    ) -> str:
+        """One chat completion, hedged and guarded by the circuit breaker; returns the reply text"""
+
+        self._check_breaker()
+        try:
+            content = await hedged(
+                lambda: self._attempt(body, priority, metrics), self.hedge_delay(), on_hedge=self._hedged
+            )
+        except ProviderOverloadedError:
+            # Shed locally or throttled; says nothing about the upstream's health
+            self.breaker.release()
+            raise
+        except ProviderError as e:
+            self.breaker.record_failure(timeout=isinstance(e, ProviderTimeoutError))
+            raise
+        except asyncio.CancelledError:
+            # Every caller gave up waiting (e.g. their deadlines passed)
+            self.breaker.record_failure(timeout=True)
+            raise
+        self.breaker.record_success()
+        return content
+
+    async def _attempt(
+        self,
+        body: Dict,
+        priority: int = PRIORITY_INTERACTIVE,
+        metrics: Optional[CallMetrics] = None
+    ) -> str:
+        """A single completion request"""
+
+        queued = time.monotonic()
+        reserved = await self._reserve(body, priority)
+        async with self._semaphore:
+            started = time.monotonic()
+            if metrics is not None:
+                metrics.upstream_calls += 1
+                metrics.queue_wait += started - queued
+            try:
+                response = await self._get_client().post(self._url, params={"api-version": self.api_version}, json=body)
+            except httpx.TimeoutException as e:
+                raise ProviderTimeoutError(f"Azure OpenAI request timed out: {e!r}")
+            except httpx.HTTPError as e:
+                raise ProviderError(f"Azure OpenAI request failed: {e!r}")
+
+        if response.status_code == 200:
+            self.latency.record(time.monotonic() - started)
+        else:
+            if response.status_code == 429:
+                self._throttled(response)
+                raise ProviderOverloadedError(f"Azure OpenAI throttled the call: {response.text[:200]}")
+            raise ProviderError(f"Azure OpenAI returned {response.status_code}: {response.text[:200]}")
+        try:
+            reply = response.json()
+            content = reply["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            raise ProviderError("Azure OpenAI reply has no message content")
+
+        usage = reply.get("usage") or {}
+        used = usage.get("total_tokens")
+        if self.scheduler is not None and isinstance(used, int):
+            self.scheduler.settle(reserved, used)
+        if metrics is not None:
+            metrics.mark_first_token()
+            prompt_tokens = usage.get("prompt_tokens")
+            completion_tokens = usage.get("completion_tokens")
+            metrics.add_usage(
+                prompt_tokens if isinstance(prompt_tokens, int) else estimate_tokens(body["messages"]),
+                completion_tokens if isinstance(completion_tokens, int) else len(content or "") // CHARS_PER_TOKEN
+            )
+        return content
+
+    async def generate(
+        self,
+        subject: str,
+        topic: str,
+        difficulty: str,
+        num_questions: int,
+        seen: Optional[Container[str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        avoid: Sequence[str] = ()
+    ) -> List[Dict]:
+        with self._track(topic, difficulty) as metrics:
+            return await self._generate(subject, topic, difficulty, num_questions, seen, priority, avoid, metrics)
+
+    async def _generate(
+        self,
+        subject: str,
+        topic: str,
+        difficulty: str,
+        num_questions: int,
+        seen: Optional[Container[str]],
+        priority: int,
+        avoid: Sequence[str],
+        metrics: CallMetrics
+    ) -> List[Dict]:
+        values = self.prompt_values(subject, topic, difficulty, num_questions, avoid)
+        key = self.request_key(values, num_questions)
+
+        cached, seen_count = await self._cached(key, seen)
+        if cached and not seen_count:
+            metrics.cache_hit = True
+            return cached
+        if cached:
+            # Partly seen: keep the rest and ask for replacements (not cached; they're this user's)
+            follow_up = self.prompt_values(
+                subject, topic, difficulty, seen_count, [*avoid, *(q["question"] for q in cached)]
+            )
+            try:
+                extra = await self._complete_questions(follow_up, seen_count, topic, difficulty, priority, metrics)
+            except ProviderError:
+                return cached
+            have = {q["item_id"] for q in cached}
+            return cached + [
+                q for q in extra if q["item_id"] not in have and q["item_id"] not in seen
+            ][:seen_count]
+
+        async def call() -> List[Dict]:
+            questions = await self._complete_questions(values, num_questions, topic, difficulty, priority, metrics)
+            for _ in range(self.follow_up_calls):
+                missing = num_questions - len(questions)
+                if missing <= 0:
+                    break
+                # Ask for just the missing ones, steering away from those we have
+                self._validation["follow_ups"] += 1
+                follow_up = self.prompt_values(
+                    subject, topic, difficulty, missing, [*avoid, *(q["question"] for q in questions)]
+                )
+                try:
+                    extra = await self._complete_questions(follow_up, missing, topic, difficulty, priority, metrics)
+                except ProviderError:
+                    if questions:
+                        break
+                    raise
+                have = {q["item_id"] for q in questions}
+                questions += [q for q in extra if q["item_id"] not in have][:missing]
+
+            if not questions:
+                raise ProviderError("Azure OpenAI reply had no valid questions")
+            if self.cache is not None:
+                await self.cache.aput(key, questions)
+            return questions
+
+        # Keyed by priority too: the flight is queued (and metered) as its first caller's
+        return await self.flights.run((key, priority), call)
+
+    async def _complete_questions(
+        self,
+        values: Dict,
+        num_questions: int,
+        topic: str,
+        difficulty: str,
+        priority: int,
+        metrics: Optional[CallMetrics] = None
+    ) -> List[Dict]:
+        """One completion's valid questions (none if the reply can't be read at all)"""
+
+        body = self.build_request(self.build_messages(values), num_questions)
+        content = await self.complete(body, priority, metrics)
+        try:
+            records = extract_records(content)
+        except SchemaError as e:
+            self._validation["unparseable"] += 1
+            print(f"⚠️ Unreadable Azure OpenAI reply: {e}")
+            return []
+        result = validate_questions(records, topic, difficulty)
+        self._validation["valid"] += len(result.questions)
+        self._validation["repaired"] += result.repaired
+        self._validation["rejected"] += result.rejected
+        return result.questions[:num_questions]
+
+    async def _cached(self, key: str, seen: Optional[Container[str]]) -> Tuple[List[Dict], int]:
+        """
+        The cached questions to serve for this request, and how many of the
+        cached set were left out because the user has seen them.
+
+        Nothing to serve (an empty list) means call the provider: the cache
+        has no set, the user has seen all of it, or they've seen some and
+        serve_seen_filtered is off.
+        """
+
+        if self.cache is None:
+            return [], 0
+        cached = await self.cache.aget(key)
+        if cached is None:
+            return [], 0
+        if seen is None:
+            return cached, 0
+        unseen = [q for q in cached if q["item_id"] not in seen]
+        if len(unseen) < len(cached) and not self.serve_seen_filtered:
+            return [], 0
+        return unseen, len(cached) - len(unseen)
+
+    async def stream_completion(
+        self,
+        body: Dict,
+        priority: int = PRIORITY_INTERACTIVE,
+        metrics: Optional[CallMetrics] = None
+    ) -> AsyncIterator[str]:
+        """One streamed chat completion; yields reply text as the deltas arrive"""
+
+        queued = time.monotonic()
+        await self._reserve(body, priority)
+        received = 0
+        async with self._semaphore:
+            if metrics is not None:
+                metrics.upstream_calls += 1
+                metrics.queue_wait += time.monotonic() - queued
+            try:
+                async with self._get_client().stream(
+                    "POST",
+                    self._url,
+                    params={"api-version": self.api_version},
+                    json={**body, "stream": True}
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        if response.status_code == 429:
+                            self._throttled(response)
+                            raise ProviderOverloadedError(f"Azure OpenAI throttled the call: {response.text[:200]}")
+                        raise ProviderError(f"Azure OpenAI returned {response.status_code}: {response.text[:200]}")
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            choices = json.loads(data).get("choices") or []
+                        except (ValueError, AttributeError):
+                            continue
+                        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                        if delta:
+                            if metrics is not None:
+                                metrics.mark_first_token()
+                            received += len(delta)
+                            yield delta
+            except httpx.HTTPError as e:
+                raise ProviderError(f"Azure OpenAI request failed: {e!r}")
+            finally:
+                # Streamed replies carry no usage; estimate what was sent and received
+                if metrics is not None and received:
+                    metrics.add_usage(estimate_tokens(body["messages"]), received // CHARS_PER_TOKEN)
+
+    async def stream(
+        self,
+        subject: str,
+        topic: str,
+        difficulty: str,
+        num_questions: int,
+        seen: Optional[Container[str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        avoid: Sequence[str] = ()
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield each question as soon as the model finishes writing it.
+
+        Cache hits are replayed at once; if the user has seen part of the
+        cached set, the rest is replayed and replacements are streamed. A
+        complete streamed set is cached like a generate() reply; streams
+        are not coalesced, since each caller needs its own token stream.
+        """
+
+        with self._track(topic, difficulty) as metrics:
+            values = self.prompt_values(subject, topic, difficulty, num_questions, avoid)
+            key = self.request_key(values, num_questions)
+
+            cached, seen_count = await self._cached(key, seen)
+            if cached and not seen_count:
+                metrics.cache_hit = True
+                for q in cached:
+                    yield q
+                return
+            for q in cached:
+                yield q
+            if cached:
+                num_questions = seen_count
+                values = self.prompt_values(
+                    subject, topic, difficulty, num_questions, [*avoid, *(q["question"] for q in cached)]
+                )
+            have = {q["item_id"] for q in cached}
+
+            body = self.build_request(self.build_messages(values), num_questions)
+            self._check_breaker()
+            parser = QuestionStreamParser()
+            questions = []
+            try:
+                async for text in self.stream_completion(body, priority, metrics):
+                    for record in parser.feed(text):
+                        q = to_question(record, topic, difficulty)
+                        if q is None or len(questions) >= num_questions or q["item_id"] in have:
+                            continue
+                        have.add(q["item_id"])
+                        questions.append(q)
+                        yield q
+            except ProviderOverloadedError:
+                self.breaker.release()
+                raise
+            except ProviderError:
+                self.breaker.record_failure()
+                if not cached:
+                    raise
+                return
+            except asyncio.CancelledError:
+                # The caller gave up waiting (e.g. its deadline for the first question passed)
+                self.breaker.record_failure(timeout=True)
+                raise
+            except GeneratorExit:
+                # Closed early by the caller; only a stream that produced something vouches for the upstream
+                if questions:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.release()
+                raise
+            self.breaker.record_success()
+
+            if not questions and not cached:
+                raise ProviderError("Azure OpenAI reply had no valid questions")
+            if self.cache is not None and not cached:
+                await self.cache.aput(key, questions)
+
+    def stats(self) -> Dict:
+        return {
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "single_flight": self.flights.stats(),
+            "circuit_breaker": self.breaker.stats(),
+            "hedges": self._hedges,
+            "hedge_delay_seconds": self.hedge_delay(),
+            "latency_p50_seconds": self.latency.quantile(0.5),
+            "latency_p95_seconds": self.latency.quantile(0.95),
+            "scheduler": self.scheduler.stats() if self.scheduler is not None else None,
+            "validation": dict(self._validation)
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,179 @@
+"""
+QuizSense AI - LLM Call Scheduler
+Token buckets for a deployment's tokens-per-minute and requests-per-minute
+quotas, with a priority queue in front of them.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional
+
+from app.services.resilience import LatencyTracker
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Rough chars-per-token for English prompts, plus per-message framing
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+
+def estimate_tokens(messages: List[Dict], max_completion_tokens: int = 0) -> int:
+    """Prompt tokens estimated from message length, plus the completion allowance"""
+    prompt = sum(len(m.get("content") or "") // CHARS_PER_TOKEN + TOKENS_PER_MESSAGE for m in messages)
+    return prompt + max_completion_tokens
+
+
+class SchedulerOverloaded(Exception):
+    """The queue is too deep to start this call within the delay budget"""
+
+
+class TokenBucketScheduler:
+    """
+    Admits LLM calls at a rate the deployment's quotas allow.
+
+    Each call reserves its estimated tokens and one request from two
+    buckets that refill continuously (per-minute quota / 60 per second)
+    up to one minute's worth. Calls that don't fit wait in a priority
+    queue, served strictly in priority then arrival order, so interactive
+    quiz generation always goes before background work. A call whose
+    expected wait is over `max_queue_delay_seconds` is shed at once, and
+    one still queued when the budget runs out is dropped; both raise
+    SchedulerOverloaded so the caller can downgrade (e.g. to the bank).
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        requests_per_minute: int,
+        max_queue_delay_seconds: float = 2.0
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.max_queue_delay_seconds = max_queue_delay_seconds
+
+        self._tokens = float(tokens_per_minute)
+        self._requests = float(requests_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+        # (priority, arrival, tokens, enqueued at, future)
+        self._queue: list = []
+        self._arrivals = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._waits = LatencyTracker()
+        self._max_depth = 0
+        self._counters = {"granted": 0, "queued": 0, "shed": 0, "timed_out": 0, "throttled": 0}
+
+    # ----- buckets -----
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+
+    def _seconds_until(self, tokens: float, requests: float) -> float:
+        """How long until the buckets hold this much, from their current levels"""
+        token_wait = max(0.0, tokens - self._tokens) * 60 / self.tokens_per_minute
+        request_wait = max(0.0, requests - self._requests) * 60 / self.requests_per_minute
+        return max(token_wait, request_wait, self._paused_until - time.monotonic())
+
+    def settle(self, reserved: int, used: int):
+        """Correct a reservation once the reply reports the tokens actually used"""
+        self._refill()
+        self._tokens = min(self.tokens_per_minute, self._tokens + reserved - used)
+
+    def pause(self, seconds: float):
+        """Stop admitting calls for a while (e.g. the upstream answered 429 with Retry-After)"""
+        self._counters["throttled"] += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    # ----- queue -----
+
+    def _live(self) -> list:
+        return [entry for entry in self._queue if not entry[4].done()]
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE):
+        """Wait for room for one call of `tokens` tokens, or raise SchedulerOverloaded"""
+
+        # A call larger than the whole bucket could never fit; let it drain the bucket instead
+        tokens = min(tokens, self.tokens_per_minute)
+        self._refill()
+
+        live = self._live()
+        if not live and self._seconds_until(tokens, 1) == 0:
+            self._grant(tokens, 0.0)
+            return
+
+        ahead = [entry for entry in live if entry[0] <= priority]
+        expected = self._seconds_until(tokens + sum(e[2] for e in ahead), 1 + len(ahead))
+        if expected > self.max_queue_delay_seconds:
+            self._counters["shed"] += 1
+            raise SchedulerOverloaded(
+                f"Expected queue delay {expected:.1f}s is over the {self.max_queue_delay_seconds}s budget"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._arrivals), tokens, time.monotonic(), future))
+        self._counters["queued"] += 1
+        self._max_depth = max(self._max_depth, len(live) + 1)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(future, timeout=self.max_queue_delay_seconds)
+        except asyncio.TimeoutError:
+            self._counters["timed_out"] += 1
+            self._dispatch()
+            raise SchedulerOverloaded(f"Still queued after {self.max_queue_delay_seconds}s")
+        except asyncio.CancelledError:
+            # Granted just as we were cancelled: hand the reservation back
+            if future.done() and not future.cancelled():
+                self.settle(tokens, 0)
+                self._requests = min(self.requests_per_minute, self._requests + 1)
+            self._dispatch()
+            raise
+
+    def _grant(self, tokens: int, waited: float):
+        self._tokens -= tokens
+        self._requests -= 1
+        self._waits.record(waited)
+        self._counters["granted"] += 1
+
+    def _dispatch(self):
+        """Grant queued calls in order while the buckets allow, then sleep until the next fits"""
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._refill()
+        while self._queue:
+            priority, _, tokens, enqueued_at, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = self._seconds_until(tokens, 1)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self._grant(tokens, time.monotonic() - enqueued_at)
+            future.set_result(None)
+
+    def stats(self) -> Dict:
+        self._refill()
+        return {
+            **self._counters,
+            "queue_depth": len(self._live()),
+            "max_queue_depth": self._max_depth,
+            "wait_p50_seconds": self._waits.quantile(0.5),
+            "wait_p95_seconds": self._waits.quantile(0.95),
+            "tokens_available": int(self._tokens),
+            "requests_available": int(self._requests)
+        }
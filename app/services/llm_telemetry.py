@@ -0,0 +1,261 @@
+"""
+QuizSense AI - LLM Telemetry
+Per-call token, latency and cost accounting for generation providers,
+rolled up per day, endpoint, user, deployment and topic.
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.database.connection import get_database
+from app.services.resilience import LatencyTracker
+
+# Who LLM calls are made for: (endpoint, user_id); set per request or task
+_caller: ContextVar[Tuple[str, Optional[str]]] = ContextVar("llm_caller", default=("background", None))
+
+# Rollup columns summed per (day, endpoint, user_id, deployment, topic)
+ROLLUP_COLUMNS = (
+    "calls", "cache_hits", "coalesced", "errors", "upstream_calls",
+    "prompt_tokens", "completion_tokens", "cost_usd",
+    "queue_wait_ms", "first_token_calls", "first_token_ms", "latency_ms"
+)
+
+# Grouping accepted by usage(), -> rollup key column
+GROUP_COLUMNS = {
+    "day": "day",
+    "endpoint": "endpoint",
+    "user": "user_id",
+    "deployment": "deployment",
+    "topic": "topic"
+}
+
+RollupKey = Tuple[str, str, str, str, str]
+
+
+def set_llm_caller(endpoint: str, user_id: Optional[str] = None):
+    """Attribute LLM calls made from here on in this request (or task) to an endpoint and user"""
+    _caller.set((endpoint, user_id))
+
+
+def current_caller() -> Tuple[str, Optional[str]]:
+    return _caller.get()
+
+
+class CallMetrics:
+    """
+    What one provider call (a generate() or stream()) took and cost.
+
+    The provider fills it in as its upstream requests complete: follow-ups
+    and hedges add their tokens, queue waits and requests to the same call.
+    Timings are seconds from `started`; first_token stays None if no
+    upstream reply arrived (a cache hit, a coalesced call or an error).
+    """
+
+    __slots__ = (
+        "topic", "difficulty", "started", "cache_hit", "error", "upstream_calls",
+        "prompt_tokens", "completion_tokens", "queue_wait", "first_token", "latency"
+    )
+
+    def __init__(self, topic: str, difficulty: str):
+        self.topic = topic
+        self.difficulty = difficulty
+        self.started = time.monotonic()
+        self.cache_hit = False
+        self.error = False
+        self.upstream_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.queue_wait = 0.0
+        self.first_token: Optional[float] = None
+        self.latency = 0.0
+
+    def add_usage(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+    def mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.monotonic() - self.started
+
+    @property
+    def coalesced(self) -> bool:
+        """Answered by an identical call already in flight"""
+        return not self.cache_hit and not self.error and self.upstream_calls == 0
+
+
+class LLMTelemetry:
+    """
+    Aggregates CallMetrics into the llm_usage_daily rollup.
+
+    record() only adds to an in-memory row for the call's day, endpoint,
+    user, deployment and topic, so a call costs a dict update; flush()
+    (or watch(), which calls it periodically) upserts the pending rows in
+    one batch. Recent latencies per deployment are kept in memory for
+    p50/p95, which a rollup of sums can't give.
+    """
+
+    def __init__(self, prompt_cost_per_1k: float = 0.0, completion_cost_per_1k: float = 0.0):
+        self.prompt_cost_per_1k = prompt_cost_per_1k
+        self.completion_cost_per_1k = completion_cost_per_1k
+        self._pending: Dict[RollupKey, List[float]] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._first_token: Dict[str, LatencyTracker] = {}
+        self._counters = {"recorded": 0, "flushes": 0, "rows_flushed": 0}
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """Estimated USD for this many tokens at the configured rates"""
+        return (prompt_tokens * self.prompt_cost_per_1k + completion_tokens * self.completion_cost_per_1k) / 1000
+
+    def record(self, deployment: str, metrics: CallMetrics):
+        """Fold one finished call into its rollup row"""
+
+        endpoint, user_id = _caller.get()
+        key = (datetime.utcnow().date().isoformat(), endpoint, user_id or "", deployment, metrics.topic)
+        timed = metrics.first_token is not None
+        self._add(key, [
+            1,
+            int(metrics.cache_hit),
+            int(metrics.coalesced),
+            int(metrics.error),
+            metrics.upstream_calls,
+            metrics.prompt_tokens,
+            metrics.completion_tokens,
+            self.cost(metrics.prompt_tokens, metrics.completion_tokens),
+            round(metrics.queue_wait * 1000),
+            int(timed),
+            round(metrics.first_token * 1000) if timed else 0,
+            round(metrics.latency * 1000)
+        ], round(metrics.latency * 1000))
+
+        self._counters["recorded"] += 1
+        if metrics.upstream_calls:
+            self._latency.setdefault(deployment, LatencyTracker()).record(metrics.latency)
+        if timed:
+            self._first_token.setdefault(deployment, LatencyTracker()).record(metrics.first_token)
+
+    def _add(self, key: RollupKey, values: List[float], max_latency_ms: int):
+        row = self._pending.get(key)
+        if row is None:
+            self._pending[key] = values + [max_latency_ms]
+            return
+        for i, value in enumerate(values):
+            row[i] += value
+        row[-1] = max(row[-1], max_latency_ms)
+
+    # ============================================
+    # Rollup Table
+    # ============================================
+
+    async def flush(self) -> int:
+        """Upsert pending rows into llm_usage_daily; returns how many were written"""
+
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        db = await get_database()
+        try:
+            await db.executemany(
+                f"""
+                INSERT INTO llm_usage_daily
+                (day, endpoint, user_id, deployment, topic, {", ".join(ROLLUP_COLUMNS)}, max_latency_ms)
+                VALUES ({", ".join("?" for _ in range(len(ROLLUP_COLUMNS) + 6))})
+                ON CONFLICT (day, endpoint, user_id, deployment, topic) DO UPDATE SET
+                    {", ".join(f"{c} = {c} + excluded.{c}" for c in ROLLUP_COLUMNS)},
+                    max_latency_ms = MAX(max_latency_ms, excluded.max_latency_ms)
+                """,
+                [(*key, *values) for key, values in pending.items()]
+            )
+            await db.commit()
+        except Exception:
+            # Keep the counts for the next flush
+            for key, values in pending.items():
+                self._add(key, values[:-1], values[-1])
+            raise
+        self._counters["flushes"] += 1
+        self._counters["rows_flushed"] += len(pending)
+        return len(pending)
+
+    async def watch(self, interval_seconds: float):
+        """Flush the pending rollup every interval"""
+
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing LLM telemetry: {e}")
+
+    async def usage(self, days: int = 7, group_by: Optional[str] = "topic", limit: int = 50) -> List[Dict]:
+        """
+        Rolled-up usage over the last `days` days (today included), most
+        expensive first, grouped by day, endpoint, user, deployment or
+        topic; group_by=None gives one row of totals.
+        """
+
+        column = GROUP_COLUMNS[group_by] if group_by is not None else None
+        since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+        sums = ", ".join(f"SUM({c})" for c in ROLLUP_COLUMNS)
+        query = f"SELECT {column or 'NULL'}, {sums}, MAX(max_latency_ms) FROM llm_usage_daily WHERE day >= ?"
+        if column is not None:
+            query += f" GROUP BY {column} ORDER BY SUM(cost_usd) DESC, SUM(calls) DESC LIMIT ?"
+
+        db = await get_database()
+        async with db.execute(query, (since, limit) if column is not None else (since,)) as cursor:
+            rows = await cursor.fetchall()
+
+        results = []
+        for row in rows:
+            totals = dict(zip(ROLLUP_COLUMNS, (value or 0 for value in row[1:-1])))
+            calls = totals["calls"]
+            if not calls:
+                continue
+            upstream_calls = totals["upstream_calls"]
+            results.append({
+                **({group_by: row[0]} if column is not None else {}),
+                "calls": calls,
+                "cache_hit_rate": round(totals["cache_hits"] / calls, 3),
+                "coalesced": totals["coalesced"],
+                "errors": totals["errors"],
+                "upstream_calls": upstream_calls,
+                "prompt_tokens": totals["prompt_tokens"],
+                "completion_tokens": totals["completion_tokens"],
+                "cost_usd": round(totals["cost_usd"], 4),
+                "avg_queue_wait_ms": round(totals["queue_wait_ms"] / upstream_calls, 1) if upstream_calls else None,
+                "avg_first_token_ms": round(totals["first_token_ms"] / totals["first_token_calls"], 1)
+                if totals["first_token_calls"] else None,
+                "avg_latency_ms": round(totals["latency_ms"] / calls, 1),
+                "max_latency_ms": row[-1] or 0
+            })
+        return results
+
+    def stats(self) -> Dict:
+        def seconds(tracker: LatencyTracker, q: float) -> Optional[float]:
+            value = tracker.quantile(q)
+            return round(value, 3) if value is not None else None
+
+        return {
+            **self._counters,
+            "pending_rows": len(self._pending),
+            "deployments": {
+                deployment: {
+                    "latency_p50_seconds": seconds(tracker, 0.5),
+                    "latency_p95_seconds": seconds(tracker, 0.95),
+                    "first_token_p50_seconds": seconds(self._first_token[deployment], 0.5)
+                    if deployment in self._first_token else None,
+                    "first_token_p95_seconds": seconds(self._first_token[deployment], 0.95)
+                    if deployment in self._first_token else None
+                }
+                for deployment, tracker in self._latency.items()
+            }
+        }
+
+
+# Global instance
+llm_telemetry = LLMTelemetry(
+    prompt_cost_per_1k=settings.LLM_PROMPT_COST_PER_1K_TOKENS,
+    completion_cost_per_1k=settings.LLM_COMPLETION_COST_PER_1K_TOKENS
+)
@@ -0,0 +1,154 @@
+"""
+QuizSense AI - Near-Duplicate Detection
+MinHash signatures and an LSH index for spotting paraphrased questions.
+"""
+
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Signatures are stored in compiled banks: bump BANK_FORMAT_VERSION if these change
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+
+# Byte 4-grams survive small rewordings better than word n-grams on short questions
+SHINGLE_SIZE = 4
+
+# Estimated Jaccard similarity at which two items count as the same question
+DUPLICATE_THRESHOLD = 0.7
+
+_PRIME = (1 << 31) - 1
+_rng = random.Random(20240115)
+_A = np.array([_rng.randrange(1, _PRIME) for _ in range(NUM_PERMUTATIONS)], dtype=np.uint64)[:, None]
+_B = np.array([_rng.randrange(0, _PRIME) for _ in range(NUM_PERMUTATIONS)], dtype=np.uint64)[:, None]
+
+_FOLD = np.uint64(0x9E3779B97F4A7C15)
+_BAND_SEEDS = np.arange(1, NUM_BANDS + 1, dtype=np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _normalize(question: str, options: Dict[str, str], correct_answer: str) -> str:
+    """
+    Lower-cased question plus the text of its correct option.
+
+    The distractors are left out on purpose: "Stack follows which
+    principle?" and "Queue follows which principle?" share all four
+    options but are different questions.
+    """
+    answer = options.get(correct_answer, "") if options else ""
+    return _NON_WORD.sub(" ", f"{question} {answer}".lower()).strip()
+
+
+def minhash(question: str, options: Dict[str, str], correct_answer: str) -> bytes:
+    """128-slot MinHash signature of a question, as 512 raw bytes"""
+
+    data = np.frombuffer(_normalize(question, options, correct_answer).encode("utf-8"), dtype=np.uint8)
+    if len(data) < SHINGLE_SIZE:
+        data = np.concatenate([data, np.zeros(SHINGLE_SIZE - len(data), dtype=np.uint8)])
+    # Each 4-byte window read as one integer is the shingle itself, no string slicing or hashing
+    data = data.astype(np.uint64)
+    x = (data[:-3] << 24) | (data[1:-2] << 16) | (data[2:-1] << 8) | data[3:]
+    # One universal hash per row, all shingles at once; products stay under 2**63
+    signature = ((_A * x[None, :] + _B) % _PRIME).min(axis=1)
+    return signature.astype(np.uint32).tobytes()
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(np.frombuffer(a, np.uint32) == np.frombuffer(b, np.uint32))) / NUM_PERMUTATIONS
+
+
+def band_keys(signature: bytes) -> List[int]:
+    """
+    One bucket key per LSH band.
+
+    Each band's rows are folded into a 63-bit polynomial hash seeded with
+    the band number, so keys are stable across processes (unlike hash()),
+    fit in a signed SQLite INTEGER, and never collide between bands.
+    """
+    rows = np.frombuffer(signature, dtype=np.uint32).astype(np.uint64).reshape(NUM_BANDS, ROWS_PER_BAND)
+    keys = _BAND_SEEDS.copy()
+    with np.errstate(over="ignore"):
+        for r in range(ROWS_PER_BAND):
+            keys = keys * _FOLD + rows[:, r]
+    return (keys >> np.uint64(1)).tolist()
+
+
+class LshIndex:
+    """
+    In-memory LSH index over MinHash signatures.
+
+    With 32 bands of 4 rows, pairs at similarity 0.7 share a bucket with
+    probability > 0.999 while unrelated items rarely do, so a query
+    touches a handful of candidates instead of the whole bank.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[int, List[str]] = {}
+        self._signatures: Dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, key: str, signature: bytes):
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for bucket in band_keys(signature):
+            self._buckets.setdefault(bucket, []).append(key)
+
+    def query(self, signature: bytes, threshold: float = DUPLICATE_THRESHOLD) -> List[Tuple[str, float]]:
+        """Indexed items at or above the threshold, most similar first"""
+
+        candidates = set()
+        for bucket in band_keys(signature):
+            candidates.update(self._buckets.get(bucket, ()))
+
+        matches = [(key, similarity(signature, self._signatures[key])) for key in candidates]
+        return sorted((m for m in matches if m[1] >= threshold), key=lambda m: -m[1])
+
+    def find(self, signature: bytes, threshold: float = DUPLICATE_THRESHOLD) -> Optional[str]:
+        """The closest near-duplicate, if any"""
+        matches = self.query(signature, threshold)
+        return matches[0][0] if matches else None
+
+
+def duplicate_clusters(
+    signatures: Iterable[Tuple[str, bytes]],
+    threshold: float = DUPLICATE_THRESHOLD
+) -> List[List[str]]:
+    """
+    Group items into near-duplicate clusters (transitively, via union-find).
+
+    Only clusters with more than one member are returned, largest first.
+    """
+
+    index = LshIndex()
+    parent: Dict[str, str] = {}
+
+    def root(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for key, signature in signatures:
+        if key in parent:
+            continue
+        parent[key] = key
+        for other, _ in index.query(signature, threshold):
+            a, b = root(key), root(other)
+            if a != b:
+                parent[a] = b
+        index.add(key, signature)
+
+    clusters: Dict[str, List[str]] = {}
+    for key in parent:
+        clusters.setdefault(root(key), []).append(key)
+
+    return sorted((c for c in clusters.values() if len(c) > 1), key=len, reverse=True)
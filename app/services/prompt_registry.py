@@ -0,0 +1,191 @@
+"""
+QuizSense AI - Prompt Registry
+Loads the prompts/*.md templates once, compiled into literal and
+placeholder segments, so rendering a prompt is a single join.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from app.services.question_bank import BASE_DIR
+from app.services.resilience import LatencyTracker
+
+PROMPTS_DIR = BASE_DIR / "prompts"
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Placeholders each shipped template must use, no more and no fewer
+TEMPLATE_PLACEHOLDERS: Dict[str, Tuple[str, ...]] = {
+    "system": (),
+    "quiz_generation": ("subject", "topic", "difficulty", "num_questions", "previous_questions"),
+    "analysis": (),
+    "weekly_report": ()
+}
+
+
+class PromptTemplateError(ValueError):
+    """A template is malformed, or a render is missing one of its values"""
+
+
+def _signature(path: Path) -> str:
+    """Cheap staleness key for a template file (no need to read it)"""
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class CompiledPrompt:
+    """
+    One template split at its {{placeholders}}.
+
+    `parts` alternates literal text and slots: literals sit at even
+    indices and each slot's index is recorded, so render() copies the list,
+    drops the values into the slots and joins it.
+    """
+
+    __slots__ = ("name", "signature", "content_hash", "placeholders", "_parts", "_slots", "render_count", "render_times")
+
+    def __init__(self, name: str, text: str, signature: str = ""):
+        for opening in re.finditer(r"\{\{", text):
+            if not _PLACEHOLDER.match(text, opening.start()):
+                line = text.count("\n", 0, opening.start()) + 1
+                raise PromptTemplateError(f"{name}: malformed placeholder on line {line}")
+
+        self.name = name
+        self.signature = signature
+        self.content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(text):
+            parts.append(text[position:match.start()])
+            slots.append((len(parts), match.group(1)))
+            parts.append("")
+            position = match.end()
+        parts.append(text[position:])
+
+        self._parts = parts
+        self._slots = slots
+        self.placeholders = frozenset(slot for _, slot in slots)
+        self.render_count = 0
+        self.render_times = LatencyTracker()
+
+        expected = TEMPLATE_PLACEHOLDERS.get(name)
+        if expected is not None and self.placeholders != set(expected):
+            missing = sorted(set(expected) - self.placeholders)
+            unknown = sorted(self.placeholders - set(expected))
+            raise PromptTemplateError(f"{name}: missing placeholders {missing}, unknown placeholders {unknown}")
+
+    def render(self, values: Mapping[str, object]) -> str:
+        started = time.perf_counter()
+        parts = self._parts.copy()
+        try:
+            for index, slot in self._slots:
+                parts[index] = str(values[slot])
+        except KeyError as e:
+            raise PromptTemplateError(f"{self.name}: no value for placeholder {e}")
+        text = "".join(parts)
+        self.render_count += 1
+        self.render_times.record(time.perf_counter() - started)
+        return text
+
+
+class PromptRegistry:
+    """
+    Every prompts/*.md template, compiled.
+
+    load() compiles the whole directory; a broken template fails it, so
+    problems surface at startup rather than on the first LLM call. After
+    that, refresh() (or watch(), which polls it) recompiles only files
+    whose size or mtime changed. A template that no longer compiles is
+    reported and its previous version stays in service.
+    """
+
+    def __init__(self, prompts_dir: Path = PROMPTS_DIR):
+        self.prompts_dir = Path(prompts_dir)
+        self._templates: Dict[str, CompiledPrompt] = {}
+        self.reloads = 0
+
+    def _compile(self, path: Path) -> CompiledPrompt:
+        signature = _signature(path)
+        return CompiledPrompt(path.stem, path.read_text(encoding="utf-8"), signature)
+
+    def load(self) -> "PromptRegistry":
+        """Compile every template, raising PromptTemplateError if any is broken"""
+        self._templates = {path.stem: self._compile(path) for path in sorted(self.prompts_dir.glob("*.md"))}
+        missing = sorted(set(TEMPLATE_PLACEHOLDERS) - set(self._templates))
+        if missing:
+            raise PromptTemplateError(f"Missing prompt templates: {missing}")
+        return self
+
+    def refresh(self) -> List[str]:
+        """Recompile templates whose files changed; returns their names"""
+
+        if not self._templates:
+            self.load()
+            return sorted(self._templates)
+
+        changed = []
+        for path in sorted(self.prompts_dir.glob("*.md")):
+            current = self._templates.get(path.stem)
+            try:
+                if current is not None and current.signature == _signature(path):
+                    continue
+                self._templates[path.stem] = self._compile(path)
+            except (OSError, PromptTemplateError) as e:
+                print(f"⚠️ Keeping previous prompt template: {e}")
+                continue
+            changed.append(path.stem)
+        if changed:
+            self.reloads += 1
+            print(f"🔄 Prompt templates reloaded: {', '.join(changed)}")
+        return changed
+
+    async def watch(self, interval_seconds: float):
+        """Poll the prompts directory and recompile templates whenever they change"""
+
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Error reloading prompt templates: {e}")
+
+    def get(self, name: str) -> CompiledPrompt:
+        if not self._templates:
+            self.load()
+        template = self._templates.get(name)
+        if template is None:
+            raise PromptTemplateError(f"Unknown prompt template: {name}")
+        return template
+
+    def render(self, name: str, values: Optional[Mapping[str, object]] = None) -> str:
+        return self.get(name).render(values or {})
+
+    def version(self, *names: str) -> str:
+        """Combined content hash of these templates, for keying anything derived from them"""
+        return hashlib.sha256(":".join(self.get(name).content_hash for name in names).encode()).hexdigest()[:16]
+
+    def stats(self) -> Dict:
+        return {
+            "reloads": self.reloads,
+            "templates": [
+                {
+                    "name": t.name,
+                    "content_hash": t.content_hash,
+                    "placeholders": sorted(t.placeholders),
+                    "renders": t.render_count,
+                    "render_p50_us": round(t.render_times.quantile(0.5) * 1e6, 1) if t.render_count else None,
+                    "render_p95_us": round(t.render_times.quantile(0.95) * 1e6, 1) if t.render_count else None
+                }
+                for t in self._templates.values()
+            ]
+        }
+
+
+# Global instance
+prompt_registry = PromptRegistry()
@@ -0,0 +1,637 @@
+"""
+QuizSense AI - File-Backed Question Bank
+Seed questions live in data/question_bank.jsonl and are compiled into a
+versioned SQLite file that is opened lazily and read one topic at a time.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.bank_search import SearchIndex
+from app.services.file_lock import lock_for
+from app.services.near_duplicates import DUPLICATE_THRESHOLD, band_keys, minhash, similarity
+
+# Determine absolute path to quizsense-ai root
+BASE_DIR = Path(__file__).resolve().parents[2]
+BANK_SEED_PATH = BASE_DIR / "data" / "question_bank.jsonl"
+BANK_DB_PATH = BASE_DIR / "data" / "question_bank.sqlite"
+
+# Bump whenever the compiled file layout changes; stale files are recompiled
+BANK_FORMAT_VERSION = 5
+
+COMPILE_BATCH_SIZE = 1000
+
+
+# ============================================
+# Content Hash
+# ============================================
+
+def content_hash(question: str, options: Dict[str, str]) -> str:
+    """
+    Stable ID for a question, derived from its text and options.
+
+    Unlike the positional q1..qN IDs it is the same in every quiz, bank
+    version and worker, so it can key seen-sets and per-item statistics.
+    """
+    canonical = json.dumps(
+        [question.strip(), sorted((k.upper(), v.strip()) for k, v in options.items())],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+# ============================================
+# Compilation (seed JSONL -> SQLite)
+# ============================================
+
+def _create_schema(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+            seq INTEGER PRIMARY KEY,
+            item_id TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            difficulty TEXT NOT NULL,
+            question TEXT NOT NULL,
+            options TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            explanation TEXT,
+            minhash BLOB NOT NULL,
+            dup_group TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lsh_buckets (
+            bucket INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (bucket, seq)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_topic ON items (topic, seq)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_item_id ON items (item_id)")
+
+
+def _seed_signature(seed_path: Path) -> str:
+    """Cheap staleness key for the seed file (no need to read it)"""
+    stat = seed_path.stat()
+    return f"{BANK_FORMAT_VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def prepare_item(q: Dict) -> tuple:
+    """
+    Row for the items table (minus seq and dup_group), plus its LSH band keys.
+
+    Holds the CPU-heavy part of compiling (content hash, MinHash, band
+    keys), so bulk imports can run it in worker processes.
+    """
+    signature = minhash(q["question"], q["options"], q["correct_answer"])
+    return (
+        content_hash(q["question"], q["options"]),
+        q["topic"],
+        q["difficulty"],
+        q["question"],
+        json.dumps(q["options"], ensure_ascii=False),
+        q["correct_answer"],
+        q.get("explanation", ""),
+        signature,
+        band_keys(signature)
+    )
+
+
+def _lookup_near_duplicate(
+    conn: sqlite3.Connection,
+    signature: bytes,
+    keys: List[int],
+    threshold: float = DUPLICATE_THRESHOLD
+) -> Optional[Tuple[str, str, float]]:
+    """Closest item to a signature as (item_id, dup_group, similarity), via the LSH bucket index"""
+
+    placeholders = ",".join("?" for _ in keys)
+    rows = conn.execute(
+        f"""
+        SELECT item_id, dup_group, minhash FROM items WHERE seq IN (
+            SELECT seq FROM lsh_buckets WHERE bucket IN ({placeholders})
+        )
+        """,
+        keys
+    ).fetchall()
+
+    best = None
+    for item_id, group, other in rows:
+        score = similarity(signature, other)
+        if score >= threshold and (best is None or score > best[2]):
+            best = (item_id, group, score)
+    return best
+
+
+def write_item(conn: sqlite3.Connection, seq: int, row: tuple, skip_existing: bool = False) -> Optional[bool]:
+    """
+    Insert a prepared row and its LSH buckets; True if it joined an existing dup_group.
+
+    The group comes from an identical item already written (same question
+    under another topic) or else the closest near-duplicate, both looked
+    up through indexes, so memory stays flat however large the bank is.
+    With skip_existing, an identical item means nothing is written and
+    None is returned.
+    """
+
+    item_id, signature, keys = row[0], row[7], row[8]
+    existing = conn.execute("SELECT dup_group FROM items WHERE item_id = ? LIMIT 1", (item_id,)).fetchone()
+    if existing and skip_existing:
+        return None
+    if existing:
+        group = existing[0]
+    else:
+        match = _lookup_near_duplicate(conn, signature, keys)
+        group = match[1] if match else None
+
+    conn.execute(
+        """
+        INSERT INTO items (seq, item_id, topic, difficulty, question, options, correct_answer, explanation,
+                           minhash, dup_group)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (seq, *row[:8], group or item_id)
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO lsh_buckets (bucket, seq) VALUES (?, ?)",
+        [(bucket, seq) for bucket in keys]
+    )
+    return group is not None
+
+
+def write_meta(conn: sqlite3.Connection, seed_path: Path, bank_version: int):
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        [
+            ("format_version", str(BANK_FORMAT_VERSION)),
+            ("seed_signature", _seed_signature(seed_path)),
+            ("bank_version", str(bank_version)),
+        ]
+    )
+
+
+def temp_bank_path(db_path: Path) -> Path:
+    """Private path to build a bank file in before moving it over db_path"""
+    tmp_path = db_path.with_name(f"{db_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    return tmp_path
+
+
+def next_bank_version(db_path: Path) -> int:
+    bank_version = _read_meta(db_path, "bank_version")
+    return int(bank_version) + 1 if bank_version else 1
+
+
+def compile_bank(seed_path: Path = BANK_SEED_PATH, db_path: Path = BANK_DB_PATH) -> int:
+    """
+    Compile the JSONL seed into a SQLite bank file.
+
+    Streams the seed, committing every COMPILE_BATCH_SIZE items, into a
+    temporary file that is atomically moved into place, so concurrent
+    workers never observe a half-written bank. Each item gets a MinHash
+    signature and LSH bucket rows, and near-duplicates of an earlier
+    item join its `dup_group`. Returns the number of questions written.
+    """
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temp_bank_path(db_path)
+    bank_version = next_bank_version(db_path)
+
+    conn = sqlite3.connect(str(tmp_path))
+    count = 0
+    duplicates = 0
+    try:
+        # The file isn't visible to anyone until it's moved into place
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        _create_schema(conn)
+        with open(seed_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                count += 1
+                duplicates += write_item(conn, count, prepare_item(json.loads(line)))
+                if count % COMPILE_BATCH_SIZE == 0:
+                    conn.commit()
+
+        write_meta(conn, seed_path, bank_version)
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    print(f"📚 Compiled question bank v{bank_version}: {count} questions ({duplicates} near-duplicates) -> {db_path}")
+    return count
+
+
+def _read_meta(db_path: Path, key: str) -> Optional[str]:
+    if not db_path.exists():
+        return None
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def is_stale(seed_path: Path = BANK_SEED_PATH, db_path: Path = BANK_DB_PATH) -> bool:
+    """True if the compiled bank is missing or older than its seed"""
+    if not db_path.exists():
+        return True
+    if not seed_path.exists():
+        return False
+    return _read_meta(db_path, "seed_signature") != _seed_signature(seed_path)
+
+
+def bank_lock_path(db_path: Path) -> Path:
+    """Lock file for writers of a compiled bank and its seed (one import at a time, across processes)"""
+    return db_path.with_name(f"{db_path.name}.lock")
+
+
+def ensure_compiled(seed_path: Path = BANK_SEED_PATH, db_path: Path = BANK_DB_PATH):
+    """Recompile a stale bank, under the writers' lock so an import can't be halfway through the seed"""
+    if not is_stale(seed_path, db_path):
+        return
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_for(bank_lock_path(db_path)):
+        # Whoever held the lock may have brought it up to date
+        if is_stale(seed_path, db_path):
+            compile_bank(seed_path, db_path)
+
+
+# ============================================
+# Public Payload Fragments
+# ============================================
+
+def encode_public_fragment(question: Dict) -> bytes:
+    """
+    Answer-stripped JSON for one quiz question, minus its opening q_id.
+
+    The result starts with a comma, so a response splices it as
+    b'{"q_id":"q1"' + fragment. Field order and values match what
+    QuizQuestion produces with correct_answer="hidden" and no explanation.
+    """
+    body = json.dumps(
+        {
+            "question": question["question"],
+            "options": question["options"],
+            "correct_answer": "hidden",
+            "topic": question["topic"],
+            "sub_topic": question.get("sub_topic"),
+            "difficulty": question["difficulty"],
+            "explanation": None
+        },
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return b"," + body[1:].encode("utf-8")
+
+
+def _index_row(index: SearchIndex, row: tuple):
+    """Add an (item_id, topic, difficulty, question, options, explanation) row to a search index"""
+    item_id, topic, difficulty, question, options, explanation = row
+    text = " ".join([question, *json.loads(options).values(), explanation or ""])
+    index.add((item_id, topic), topic, difficulty, text)
+
+
+# ============================================
+# Question Item
+# ============================================
+
+class QuestionItem:
+    """
+    Compact, read-only record for one bank question.
+
+    Uses __slots__ instead of a per-question dict, and interns the topic,
+    difficulty and option strings so the thousands of items sharing them
+    point at one copy. The `options` mapping is built once at load time and
+    shared by every quiz that serves the item; callers must not mutate it.
+    `group` is shared by near-duplicate items (see near_duplicates.py).
+    """
+
+    __slots__ = ("item_id", "topic", "difficulty", "question", "options", "correct_answer", "explanation", "group")
+
+    def __init__(
+        self,
+        item_id: str,
+        topic: str,
+        difficulty: str,
+        question: str,
+        options: Dict[str, str],
+        correct_answer: str,
+        explanation: str = "",
+        group: Optional[str] = None
+    ):
+        self.item_id = item_id
+        self.topic = sys.intern(topic)
+        self.difficulty = sys.intern(difficulty)
+        self.question = question
+        self.options = {sys.intern(k): sys.intern(v) for k, v in options.items()}
+        self.correct_answer = sys.intern(correct_answer)
+        self.explanation = explanation or ""
+        self.group = group or item_id
+
+    def to_question(self, q_id: str) -> Dict:
+        """Format as a quiz question (shares the item's options mapping)"""
+        return {
+            "q_id": q_id,
+            "item_id": self.item_id,
+            "question": self.question,
+            "options": self.options,
+            "correct_answer": self.correct_answer,
+            "topic": self.topic,
+            "sub_topic": self.topic,
+            "difficulty": self.difficulty,
+            "explanation": self.explanation
+        }
+
+
+# ============================================
+# Topic Index
+# ============================================
+
+class TopicIndex:
+    """
+    Sampling index for one topic.
+
+    `items` holds the topic's questions in bank order and `cells` maps each
+    difficulty to an array of integer slots into `items`.
+    """
+
+    __slots__ = ("topic", "items", "cells")
+
+    def __init__(self, topic: str, items: List[QuestionItem], cells: Dict[str, List[int]]):
+        self.topic = topic
+        self.items = items
+        self.cells = cells
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+# ============================================
+# Question Bank
+# ============================================
+
+class QuestionBank:
+    """
+    Lazily opened, read-only snapshot of the compiled question bank.
+
+    Nothing is read until the first request; each topic is loaded with a
+    single indexed query the first time it is asked for and then cached.
+    A snapshot keeps reading the file it opened even after a recompile
+    replaces it on disk, so reloading means building a new QuestionBank.
+    """
+
+    def __init__(self, seed_path: Path = BANK_SEED_PATH, db_path: Path = BANK_DB_PATH):
+        self.seed_path = Path(seed_path)
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._topics: Optional[List[str]] = None
+        self._loaded: Dict[str, TopicIndex] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        # Items never change within a snapshot, so this is keyed by
+        # (content hash, topic, bank version) with the version implied by
+        # self; the topic is in the fragment but not in the hash
+        self._fragments: Dict[Tuple[str, str], bytes] = {}
+        self._search: Optional[SearchIndex] = None
+        # Held while the search index is built, which doesn't take self._lock
+        self._search_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            ensure_compiled(self.seed_path, self.db_path)
+            self._conn = self._open()
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'bank_version'").fetchone()
+            self._version = int(row[0]) if row else 0
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _ensure_open(self):
+        """Open the snapshot (compiling the bank first if stale); a no-op once open"""
+        if self._conn is None:
+            with self._lock:
+                self._connection()
+
+    @property
+    def version(self) -> int:
+        """Version of the compiled file this snapshot reads from"""
+        self._ensure_open()
+        return self._version
+
+    def topics(self) -> List[str]:
+        """All topic names, in bank order"""
+        if self._topics is None:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT topic FROM items GROUP BY topic ORDER BY MIN(seq)"
+                ).fetchall()
+            self._topics = [row[0] for row in rows]
+        return self._topics
+
+    def get_topic(self, topic: str) -> Optional[TopicIndex]:
+        """Get a topic's sampling index, loading it on first use"""
+
+        index = self._loaded.get(topic)
+        if index is not None:
+            return index
+
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT difficulty, question, options, correct_answer, explanation, item_id, dup_group
+                FROM items WHERE topic = ?
+                ORDER BY seq
+                """,
+                (topic,)
+            ).fetchall()
+
+        if not rows:
+            return None
+
+        items = []
+        cells: Dict[str, List[int]] = {}
+        for slot, row in enumerate(rows):
+            item = QuestionItem(
+                item_id=row[5],
+                topic=topic,
+                difficulty=row[0],
+                question=row[1],
+                options=json.loads(row[2]),
+                correct_answer=row[3],
+                explanation=row[4],
+                group=row[6]
+            )
+            items.append(item)
+            cells.setdefault(item.difficulty, []).append(slot)
+
+        index = TopicIndex(topic, items, cells)
+        self._loaded[topic] = index
+        return index
+
+    def public_fragment(self, item: QuestionItem) -> bytes:
+        """Cached answer-stripped JSON fragment for a bank item"""
+        key = (item.item_id, item.topic)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = encode_public_fragment(item.to_question(""))
+            self._fragments[key] = fragment
+        return fragment
+
+    def find_near_duplicate(
+        self,
+        question: str,
+        options: Dict[str, str],
+        correct_answer: str,
+        threshold: float = DUPLICATE_THRESHOLD
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Closest bank item to a question, as (item_id, similarity), if any.
+
+        Looks up the signature's LSH buckets through an index and only
+        compares signatures of the few items found there.
+        """
+
+        signature = minhash(question, options, correct_answer)
+        with self._lock:
+            match = _lookup_near_duplicate(self._connection(), signature, band_keys(signature), threshold)
+        return (match[0], match[2]) if match else None
+
+    def duplicate_group(
+        self,
+        question: str,
+        options: Dict[str, str],
+        correct_answer: str,
+        threshold: float = DUPLICATE_THRESHOLD
+    ) -> Optional[str]:
+        """The dup_group of the closest bank item to a question, if any (see find_near_duplicate)"""
+
+        signature = minhash(question, options, correct_answer)
+        with self._lock:
+            match = _lookup_near_duplicate(self._connection(), signature, band_keys(signature), threshold)
+        return match[1] if match else None
+
+    def search_index(self) -> SearchIndex:
+        """
+        Full-text index over every item, keyed by (item_id, topic); built on first use.
+
+        The build reads through its own connection and doesn't hold the
+        snapshot's lock, so quizzes keep being served meanwhile.
+        """
+
+        if self._search is None:
+            with self._search_lock:
+                if self._search is None:
+                    self._ensure_open()
+                    index = SearchIndex()
+                    conn = self._open()
+                    try:
+                        for row in conn.execute(
+                            "SELECT item_id, topic, difficulty, question, options, explanation FROM items ORDER BY seq"
+                        ):
+                            _index_row(index, row)
+                    finally:
+                        conn.close()
+                    self._search = index
+        return self._search
+
+    def adopt_search_index(self, other: "QuestionBank"):
+        """
+        Take over another snapshot's search index, applying only what changed.
+
+        Used on reload: items new in this snapshot are added and items it
+        no longer has are tombstoned, instead of re-tokenizing the bank.
+        The index is shared, so the old snapshot's searches see the new
+        items too.
+        """
+
+        index = other._search
+        if index is None:
+            return
+
+        self._ensure_open()
+        with self._search_lock:
+            conn = self._open()
+            try:
+                current = set(conn.execute("SELECT item_id, topic FROM items").fetchall())
+                indexed = set(index.keys())
+                for key in indexed - current:
+                    index.remove(key)
+                for item_id, topic in current - indexed:
+                    row = conn.execute(
+                        """
+                        SELECT item_id, topic, difficulty, question, options, explanation
+                        FROM items WHERE item_id = ? AND topic = ?
+                        """,
+                        (item_id, topic)
+                    ).fetchone()
+                    _index_row(index, row)
+            finally:
+                conn.close()
+            self._search = index
+
+    def get_items(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], QuestionItem]:
+        """Look up items by (item_id, topic) without loading their topics"""
+
+        if not keys:
+            return {}
+        placeholders = ",".join("?" for _ in keys)
+        with self._lock:
+            rows = self._connection().execute(
+                f"""
+                SELECT item_id, topic, difficulty, question, options, correct_answer, explanation, dup_group
+                FROM items WHERE item_id IN ({placeholders})
+                """,
+                [item_id for item_id, _ in keys]
+            ).fetchall()
+
+        wanted = set(keys)
+        return {
+            (row[0], row[1]): QuestionItem(
+                item_id=row[0],
+                topic=row[1],
+                difficulty=row[2],
+                question=row[3],
+                options=json.loads(row[4]),
+                correct_answer=row[5],
+                explanation=row[6],
+                group=row[7]
+            )
+            for row in rows if (row[0], row[1]) in wanted
+        }
+
+    def warm(self, topics: List[str]):
+        """Open the bank and build indexes for the given topics up front"""
+        self.topics()
+        for topic in topics:
+            self.get_topic(topic)
+
+    def loaded_topics(self) -> List[str]:
+        """Topics currently held in memory"""
+        return list(self._loaded.keys())
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,308 @@
+"""
+QuizSense AI - Question Schema
+Strict one-pass validation of model-produced questions, with repairs for
+the defects models commonly make.
+"""
+
+import json
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.question_bank import content_hash
+
+OPTION_KEYS = ("A", "B", "C", "D")
+DIFFICULTIES = frozenset(("easy", "medium", "hard"))
+
+# Field names models use, normalized (lower case, "_" for spaces and dashes) -> schema field
+FIELD_ALIASES = {
+    "question": "question",
+    "question_text": "question",
+    "text": "question",
+    "options": "options",
+    "choices": "options",
+    "answers": "options",
+    "correct_answer": "correct_answer",
+    "correctanswer": "correct_answer",
+    "correct_option": "correct_answer",
+    "correct": "correct_answer",
+    "answer": "correct_answer",
+    "explanation": "explanation",
+    "rationale": "explanation",
+    "difficulty": "difficulty",
+    "topic": "topic",
+    "sub_topic": "sub_topic",
+    "subtopic": "sub_topic",
+    "q_id": "q_id",
+    "id": "q_id"
+}
+_SCHEMA_FIELDS = frozenset(FIELD_ALIASES.values())
+_OPTION_KEY_SET = frozenset(OPTION_KEYS)
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# "A) text", "(b). text", "C: text", "Option D - text"
+_LETTER_PREFIX = re.compile(r"^\s*(?:option\s+)?\(?([A-Da-d])\)?\s*[\).:\-]\s*", re.IGNORECASE)
+_BARE_LETTER = re.compile(r"^\s*(?:option\s+)?\(?([A-Da-d])\)?\s*[\).:]?\s*$", re.IGNORECASE)
+
+
+class SchemaError(ValueError):
+    """A reply that can't be read as a list of question records at all"""
+
+
+class ValidationResult(NamedTuple):
+    questions: List[Dict]
+    repaired: int
+    rejected: int
+    errors: List[str]
+
+
+def extract_records(content: str) -> List[object]:
+    """
+    The question records in a model reply.
+
+    Accepts {"questions": [...]} (key in any case), a bare array, or an
+    object with a single list, optionally inside a code fence or prose.
+    Trailing commas are stripped if the JSON doesn't parse as is; if it
+    still doesn't (say the reply was cut off), the question objects that
+    were completed are returned.
+    """
+
+    text = _strip_fence(content)
+    payload = _loads(text)
+    if payload is None:
+        starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+        end = max(text.rfind("}"), text.rfind("]"))
+        if not starts or end < min(starts):
+            raise SchemaError("Reply contains no JSON")
+        text = text[min(starts):end + 1]
+        payload = _loads(text)
+        if payload is None:
+            payload = _loads(_TRAILING_COMMA.sub(r"\1", text))
+        if payload is None:
+            # Most often a reply cut off by max_tokens: keep the objects it completed
+            records = QuestionStreamParser().feed(text)
+            if not records:
+                raise SchemaError("Reply is not valid JSON")
+            return records
+
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            if key.strip().lower() == "questions" and isinstance(value, list):
+                return value
+        lists = [value for value in payload.values() if isinstance(value, list)]
+        if len(lists) == 1:
+            return lists[0]
+        if "question" in {key.strip().lower() for key in payload}:
+            return [payload]
+    raise SchemaError("Reply has no questions list")
+
+
+def _strip_fence(content: str) -> str:
+    text = content.strip()
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1:] if newline >= 0 else text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text
+
+
+def _loads(text: str) -> Optional[object]:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _letter(value: str) -> Optional[str]:
+    match = _BARE_LETTER.match(value)
+    return match.group(1).upper() if match else None
+
+
+def _options(raw: object) -> Tuple[Optional[Dict[str, str]], bool]:
+    """Options as {"A".."D": text}, and whether they needed repair; None if unusable"""
+
+    # Fast path: already exactly right
+    if type(raw) is dict and raw.keys() == _OPTION_KEY_SET:
+        values = [raw[key] for key in OPTION_KEYS]
+        if all(type(v) is str and v and v == v.strip() and not _LETTER_PREFIX.match(v) for v in values) \
+                and len(set(values)) == 4:
+            return dict(zip(OPTION_KEYS, values)), False
+
+    repaired = False
+    if isinstance(raw, list):
+        raw = dict(zip(OPTION_KEYS, raw)) if len(raw) == 4 else None
+        repaired = True
+    if not isinstance(raw, dict) or len(raw) != 4:
+        return None, repaired
+
+    options = {}
+    for key, value in raw.items():
+        letter = key if key in OPTION_KEYS else _letter(str(key).replace("_", " "))
+        if letter is None or letter in options or not isinstance(value, (str, int, float)):
+            return None, repaired
+        text = str(value).strip()
+        prefix = _LETTER_PREFIX.match(text)
+        if prefix and prefix.group(1).upper() == letter:
+            text = text[prefix.end():]
+            repaired = True
+        if not text:
+            return None, repaired
+        repaired = repaired or letter != key or text != value
+        options[letter] = text
+    if len(set(options.values())) != 4:
+        return None, repaired
+    return {key: options[key] for key in OPTION_KEYS}, repaired
+
+
+def _correct_answer(raw: object, options: Dict[str, str]) -> Tuple[Optional[str], bool]:
+    if not isinstance(raw, str):
+        return None, False
+    if raw in options:
+        return raw, False
+    letter = _letter(raw)
+    if letter is None:
+        prefix = _LETTER_PREFIX.match(raw)
+        letter = prefix.group(1).upper() if prefix else None
+    if letter is None:
+        # The answer given as the option's text
+        wanted = raw.strip().lower()
+        letter = next((key for key, text in options.items() if text.lower() == wanted), None)
+    return letter, letter is not None
+
+
+def _normalize_fields(record: Dict) -> Tuple[Dict, bool]:
+    """Map aliased or oddly-cased field names onto the schema's (first one wins); True if any were renamed"""
+    fields = {}
+    renamed = False
+    for key, value in record.items():
+        name = FIELD_ALIASES.get(key) or FIELD_ALIASES.get(str(key).strip().lower().replace(" ", "_").replace("-", "_"))
+        if name is not None:
+            fields.setdefault(name, value)
+            renamed = renamed or name != key
+    return fields, renamed
+
+
+def validate_record(record: object, topic: str, difficulty: str) -> Tuple[Optional[Dict], bool, Optional[str]]:
+    """
+    One record as a quiz question: (question, repaired, None) or (None, False, error).
+
+    Every question is filed under the requested topic, with the model's
+    topic kept as its sub-topic; an unknown difficulty becomes the
+    requested one.
+    """
+
+    if not isinstance(record, dict):
+        return None, False, "record is not an object"
+
+    fields, repaired = record, False
+    if not record.keys() <= _SCHEMA_FIELDS:
+        fields, repaired = _normalize_fields(record)
+
+    question = fields.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return None, False, "missing question"
+    question = question.strip()
+
+    options, fixed = _options(fields.get("options"))
+    if options is None:
+        return None, False, "options must be four distinct non-empty choices A-D"
+    repaired = repaired or fixed
+
+    correct_answer, fixed = _correct_answer(fields.get("correct_answer"), options)
+    if correct_answer is None:
+        return None, False, "correct_answer must name one of the options"
+    repaired = repaired or fixed
+
+    level = fields.get("difficulty")
+    if not isinstance(level, str) or level not in DIFFICULTIES:
+        normalized = str(level or "").strip().lower()
+        level = normalized if normalized in DIFFICULTIES else difficulty
+        repaired = repaired or fields.get("difficulty") is not None
+
+    explanation = fields.get("explanation")
+    sub_topic = fields.get("sub_topic") or fields.get("topic") or topic
+    return {
+        "item_id": content_hash(question, options),
+        "question": question,
+        "options": options,
+        "correct_answer": correct_answer,
+        "topic": topic,
+        "sub_topic": str(sub_topic),
+        "difficulty": level,
+        "explanation": str(explanation).strip() if explanation is not None else ""
+    }, repaired, None
+
+
+def validate_questions(records: List[object], topic: str, difficulty: str) -> ValidationResult:
+    """Validate a decoded array in one pass, keeping every valid item (repeats only once)"""
+
+    questions = []
+    seen = set()
+    repaired = rejected = 0
+    errors = []
+    for index, record in enumerate(records):
+        q, fixed, error = validate_record(record, topic, difficulty)
+        if q is None or q["item_id"] in seen:
+            rejected += 1
+            errors.append(f"item {index}: {error or 'repeats an earlier item'}")
+            continue
+        seen.add(q["item_id"])
+        repaired += fixed
+        questions.append(q)
+    return ValidationResult(questions, repaired, rejected, errors)
+
+
+class QuestionStreamParser:
+    """
+    Pulls question objects out of a {"questions": [...]} reply as it streams in.
+
+    Tracks brace depth (skipping braces inside strings), so each question
+    object can be parsed the moment its closing brace arrives rather than
+    when the whole reply is done. Text before the first brace, such as a
+    ```json fence, is ignored. A reply that is a bare [...] array has its
+    questions one level up.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._record_depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[object]:
+        """Add streamed text; returns the records completed by it"""
+
+        records = []
+        for ch in text:
+            if not self._record_depth:
+                if ch == "[":
+                    self._record_depth = 1
+                elif ch == "{":
+                    self._record_depth = 2
+            if self._depth >= self._record_depth:
+                self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = self._depth > 0
+            elif ch == "{":
+                self._depth += 1
+                if self._depth == self._record_depth:
+                    self._buffer = [ch]
+            elif ch == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == self._record_depth - 1:
+                    try:
+                        records.append(json.loads("".join(self._buffer)))
+                    except json.JSONDecodeError:
+                        pass
+                    self._buffer = []
+        return records
@@ -5,10 +5,11 @@ Handles quiz storage, retrieval, and scoring
 
 import json
 import secrets
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
 from app.database.connection import get_database
+from app.services.seen_set import SeenSet
 
 
 class QuizService:
@@ -23,17 +24,20 @@ class QuizService:
         topic: str,
         difficulty: str,
         questions: List[Dict],
-        created_at: datetime
+        created_at: datetime,
+        bank_version: Optional[int] = None,
+        max_questions: Optional[int] = None
     ) -> bool:
-        """Save a generated quiz to database"""
+        """Save a generated quiz to database (max_questions marks an adaptive quiz)"""
         
         db = await get_database()
         
         try:
             await db.execute(
                 """
-                INSERT INTO quizzes (id, user_id, subject, topic, difficulty, questions, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO quizzes (id, user_id, subject, topic, difficulty, questions, created_at,
+                                     bank_version, max_questions)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     quiz_id,
@@ -42,9 +46,15 @@ class QuizService:
                     topic,
                     difficulty,
                     json.dumps(questions),
-                    created_at.isoformat()
+                    created_at.isoformat(),
+                    bank_version,
+                    max_questions
                 )
             )
+            
+            # Remember what this user has now been shown
+            await self._mark_seen(user_id, questions)
+            
             await db.commit()
             return True
             
@@ -61,7 +71,7 @@ class QuizService:
         async with db.execute(
             """
             SELECT id, user_id, subject, topic, difficulty, questions, 
-                   created_at, is_completed, score
+                   created_at, is_completed, score, max_questions
             FROM quizzes WHERE id = ?
             """,
             (quiz_id,)
@@ -80,38 +90,77 @@ class QuizService:
             "questions": json.loads(row[5]),
             "created_at": row[6],
             "is_completed": bool(row[7]),
-            "score": row[8]
+            "score": row[8],
+            "max_questions": row[9]
         }
     
     
-    async def get_previous_questions(
-        self,
-        user_id: str,
-        topic: str,
-        limit: int = 50
-    ) -> List[str]:
-        """Get previously asked question IDs for a topic"""
+    async def add_quiz_question(self, quiz_id: str, user_id: str, questions: List[Dict]):
+        """Store an adaptive quiz's grown question list (the last entry is new)"""
+        
+        db = await get_database()
+        
+        await db.execute(
+            "UPDATE quizzes SET questions = ? WHERE id = ?",
+            (json.dumps(questions), quiz_id)
+        )
+        await self._mark_seen(user_id, questions[-1:])
+        await db.commit()
+    
+    
+    async def get_seen_set(self, user_id: str, topic: str) -> SeenSet:
+        """Get the set of question content hashes a user has seen for a topic"""
         
         db = await get_database()
         
         async with db.execute(
-            """
-            SELECT questions FROM quizzes 
-            WHERE user_id = ? AND topic = ?
-            ORDER BY created_at DESC
-            LIMIT ?
-            """,
-            (user_id, topic, limit)
+            "SELECT bits FROM seen_items WHERE user_id = ? AND topic = ?",
+            (user_id, topic)
+        ) as cursor:
+            row = await cursor.fetchone()
+        
+        return SeenSet(row[0] if row else None)
+    
+    
+    async def get_seen_sets(self, user_id: str, topics: List[str]) -> Dict[str, SeenSet]:
+        """Get seen-sets for several topics in one query"""
+        
+        db = await get_database()
+        
+        if not topics:
+            return {}
+        
+        placeholders = ",".join("?" for _ in topics)
+        async with db.execute(
+            f"SELECT topic, bits FROM seen_items WHERE user_id = ? AND topic IN ({placeholders})",
+            (user_id, *topics)
         ) as cursor:
             rows = await cursor.fetchall()
         
-        question_ids = []
-        for row in rows:
-            questions = json.loads(row[0])
-            for q in questions:
-                question_ids.append(q.get("q_id", ""))
+        return {row[0]: SeenSet(row[1]) for row in rows}
+    
+    
+    async def _mark_seen(self, user_id: str, questions: List[Dict]):
+        """Add a quiz's questions to the user's per-topic seen sets"""
         
-        return question_ids
+        db = await get_database()
+        
+        by_topic: Dict[str, List[str]] = {}
+        for q in questions:
+            if q.get("item_id"):
+                by_topic.setdefault(q.get("topic", ""), []).append(q["item_id"])
+        
+        for topic, item_ids in by_topic.items():
+            seen = await self.get_seen_set(user_id, topic)
+            seen.update(item_ids)
+            await db.execute(
+                """
+                INSERT INTO seen_items (user_id, topic, bits, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id, topic) DO UPDATE SET bits = excluded.bits, updated_at = excluded.updated_at
+                """,
+                (user_id, topic, seen.to_bytes(), datetime.utcnow().isoformat())
+            )
     
     
     async def save_attempt(
@@ -123,7 +172,8 @@ class QuizService:
         total: int,
         time_taken: int,
         topic_breakdown: Dict,
-        completed_at: datetime
+        completed_at: datetime,
+        item_outcomes: Optional[List[Dict]] = None
     ) -> bool:
         """Save quiz attempt to database"""
         
@@ -162,6 +212,17 @@ class QuizService:
             # Update topic performance
             await self._update_topic_performance(user_id, topic_breakdown)
             
+            # Update per-question statistics and the response log used for calibration
+            if item_outcomes:
+                await self._update_item_stats(item_outcomes)
+                await db.executemany(
+                    "INSERT INTO item_responses (user_id, item_id, correct, answered_at) VALUES (?, ?, ?, ?)",
+                    [
+                        (user_id, o["item_id"], int(bool(o["is_correct"])), completed_at.isoformat())
+                        for o in item_outcomes
+                    ]
+                )
+            
             await db.commit()
             return True
             
@@ -225,6 +286,122 @@ class QuizService:
                 )
     
     
+    async def _update_item_stats(self, item_outcomes: List[Dict]):
+        """
+        Fold one submission's graded answers into item_stats
+        
+        Each outcome is {"item_id", "selected", "is_correct", "time_taken"}.
+        All items are written with a single batched upsert. Unanswered
+        questions add no time, and mean_time_seconds is over the answered
+        attempts (attempts - picks_none).
+        """
+        
+        db = await get_database()
+        now = datetime.utcnow().isoformat()
+        
+        rows = []
+        for outcome in item_outcomes:
+            selected = (outcome.get("selected") or "").upper()
+            picks = [int(selected == key) for key in ("A", "B", "C", "D")]
+            answered = any(picks)
+            rows.append((
+                outcome["item_id"],
+                int(bool(outcome["is_correct"])),
+                *picks,
+                int(not answered),
+                int(outcome.get("time_taken") or 0) if answered else 0,
+                now
+            ))
+        
+        await db.executemany(
+            """
+            INSERT INTO item_stats
+            (item_id, attempts, corrects, picks_a, picks_b, picks_c, picks_d, picks_none,
+             total_time_seconds, mean_time_seconds, last_updated)
+            VALUES (?1, 1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?8, ?9)
+            ON CONFLICT (item_id) DO UPDATE SET
+                attempts = attempts + 1,
+                corrects = corrects + excluded.corrects,
+                picks_a = picks_a + excluded.picks_a,
+                picks_b = picks_b + excluded.picks_b,
+                picks_c = picks_c + excluded.picks_c,
+                picks_d = picks_d + excluded.picks_d,
+                picks_none = picks_none + excluded.picks_none,
+                total_time_seconds = total_time_seconds + excluded.total_time_seconds,
+                mean_time_seconds = (total_time_seconds + excluded.total_time_seconds) * 1.0
+                    / MAX(1, attempts + 1 - picks_none - excluded.picks_none),
+                last_updated = excluded.last_updated
+            """,
+            rows
+        )
+    
+    
+    async def get_item_stats(self, item_ids: List[str]) -> Dict[str, Dict]:
+        """Get running statistics for questions by content hash (primary-key lookups)"""
+        
+        db = await get_database()
+        
+        if not item_ids:
+            return {}
+        
+        placeholders = ",".join("?" for _ in item_ids)
+        async with db.execute(
+            f"""
+            SELECT item_id, attempts, corrects, picks_a, picks_b, picks_c, picks_d, picks_none,
+                   mean_time_seconds, last_updated
+            FROM item_stats WHERE item_id IN ({placeholders})
+            """,
+            list(item_ids)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        
+        stats = {}
+        for row in rows:
+            attempts = row[1]
+            stats[row[0]] = {
+                "item_id": row[0],
+                "attempts": attempts,
+                "corrects": row[2],
+                "p_correct": round(row[2] / attempts, 3) if attempts > 0 else 0,
+                "option_picks": {"A": row[3], "B": row[4], "C": row[5], "D": row[6], "none": row[7]},
+                "mean_time_seconds": round(row[8], 1),
+                "last_updated": row[9]
+            }
+        
+        return stats
+    
+    
+    async def get_item_params(self, item_ids: List[str]) -> Dict[str, Tuple[float, float]]:
+        """Calibrated (difficulty, discrimination) per item; uncalibrated items are left out"""
+        
+        db = await get_database()
+        
+        params = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(item_ids), 500):
+            chunk = item_ids[start:start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            async with db.execute(
+                f"SELECT item_id, difficulty, discrimination FROM item_params WHERE item_id IN ({placeholders})",
+                chunk
+            ) as cursor:
+                for row in await cursor.fetchall():
+                    params[row[0]] = (row[1], row[2])
+        
+        return params
+    
+    
+    async def get_user_ability(self, user_id: str) -> Optional[float]:
+        """Calibrated ability (logit scale), if the calibration job has fitted one"""
+        
+        db = await get_database()
+        
+        async with db.execute("SELECT theta FROM user_ability WHERE user_id = ?", (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        
+        return row[0] if row else None
+    
+    
     async def update_user_stats(self, user_id: str):
         """Update user statistics after quiz completion"""
         
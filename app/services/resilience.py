@@ -0,0 +1,144 @@
+"""
+QuizSense AI - Resilience Helpers
+Latency tracking, hedged calls and a circuit breaker for slow or flaky
+upstreams such as LLM endpoints.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling window of recent call durations (seconds)"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def hedged(
+    attempt: Callable[[], Awaitable[T]],
+    delay: Optional[float],
+    max_attempts: int = 2,
+    on_hedge: Optional[Callable[[], None]] = None
+) -> T:
+    """
+    Run attempt(), starting another copy if it hasn't answered after `delay`.
+
+    The first attempt to succeed wins and the rest are cancelled. An
+    attempt that fails early also triggers the next one, so a hedge doubles
+    as a retry. If every attempt fails, the last error is raised. A delay
+    of None never hedges.
+    """
+
+    pending = {asyncio.ensure_future(attempt())}
+    launched = 1
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            can_hedge = delay is not None and launched < max_attempts
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            # Either the delay passed with nothing back, or an attempt failed
+            if can_hedge:
+                pending.add(asyncio.ensure_future(attempt()))
+                launched += 1
+                if on_hedge is not None:
+                    on_hedge()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after repeated failures.
+
+    Closed: calls go through. After `failure_threshold` consecutive
+    failures (errors or timeouts) it opens and rejects calls outright.
+    Once `reset_seconds` have passed it lets one probe call through
+    (half-open) and keeps rejecting the rest; the probe's success closes
+    it, a failure reopens it. A probe that ends without telling either
+    way (see release()) frees the slot for the next caller, and one that
+    never reports is given up on after another `reset_seconds`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._counters = {"opened": 0, "rejected": 0, "failures": 0, "timeouts": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def check(self):
+        """Raise CircuitOpenError if calls should not go through right now"""
+        state = self.state
+        if state == "open":
+            self._counters["rejected"] += 1
+            raise CircuitOpenError(f"Circuit open for another {self._retry_in():.1f}s")
+        if state == "half_open":
+            now = time.monotonic()
+            if self._probe_started is not None and now - self._probe_started < self.reset_seconds:
+                self._counters["rejected"] += 1
+                raise CircuitOpenError("Circuit half-open, waiting on a probe call")
+            self._probe_started = now
+            self._counters["probes"] += 1
+
+    def _retry_in(self) -> float:
+        return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self, timeout: bool = False):
+        self._counters["timeouts" if timeout else "failures"] += 1
+        self._failures += 1
+        if self.state == "half_open" or (self._opened_at is None and self._failures >= self.failure_threshold):
+            self._opened_at = time.monotonic()
+            self._counters["opened"] += 1
+        self._probe_started = None
+
+    def release(self):
+        """End a call that said nothing about the upstream's health (shed, throttled or abandoned)"""
+        self._probe_started = None
+
+    def stats(self) -> Dict:
+        return {**self._counters, "state": self.state, "consecutive_failures": self._failures}
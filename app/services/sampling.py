@@ -0,0 +1,55 @@
+"""
+QuizSense AI - Sampling Utilities
+Walker/Vose alias tables for O(1) weighted draws.
+"""
+
+import random
+from typing import Sequence
+
+
+class AliasTable:
+    """
+    Alias table over a fixed set of weights.
+
+    Built once in O(n); every draw afterwards costs two random numbers and
+    one comparison, regardless of how many outcomes there are.
+    """
+
+    __slots__ = ("prob", "alias", "n")
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("AliasTable needs at least one weight")
+        total = float(sum(weights))
+        if total <= 0:
+            weights = [1.0] * n
+            total = float(n)
+
+        self.n = n
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # Leftovers are 1.0 up to floating point error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def sample(self) -> int:
+        """Draw one outcome index"""
+        i = int(random.random() * self.n)
+        return i if random.random() < self.prob[i] else self.alias[i]
@@ -0,0 +1,93 @@
+"""
+QuizSense AI - Seen-Question Sets
+Compact per-(user, topic) record of which questions a learner has already been shown.
+"""
+
+import hashlib
+from typing import Iterable, List, Optional
+
+
+class SeenSet:
+    """
+    Growable Bloom filter over question content hashes.
+
+    Works the same for bank items and LLM-generated items, since both are
+    keyed by `content_hash`. A question that was added is always reported
+    as seen; a question that wasn't is wrongly reported as seen (skipped,
+    and not counted in bank_growth headroom) with a small probability.
+
+    A single fixed-size filter would see that rate climb steeply once a
+    learner has seen a few thousand questions in a topic, so the set is a
+    chain of segments: the first is 1 KB (8192 bits, 4 hashes), and once
+    the newest segment is FILL_LIMIT full, new items go into a fresh one
+    twice its size with one more hash. Each segment's false-positive
+    rate is about FILL_LIMIT ** hashes, so the whole set stays around
+    1-1.5% however many items it holds. Membership is O(segments) and
+    the set serializes to the segments' bits back to back (a set still in
+    its first segment is the old 1 KB blob).
+    """
+
+    NUM_BITS = 8192
+    NUM_HASHES = 4
+    FILL_LIMIT = 0.3
+
+    __slots__ = ("segments", "_filled")
+
+    def __init__(self, bits: Optional[bytes] = None):
+        self.segments: List[bytearray] = []
+        if bits is not None:
+            offset, size = 0, self.NUM_BITS // 8
+            while offset + size <= len(bits):
+                self.segments.append(bytearray(bits[offset:offset + size]))
+                offset, size = offset + size, size * 2
+            if offset != len(bits):
+                # Not a whole number of segments: unreadable, start over
+                self.segments = []
+        if not self.segments:
+            self.segments = [bytearray(self.NUM_BITS // 8)]
+        # Set bits in the newest segment, to know when it is full
+        self._filled = int.from_bytes(self.segments[-1], "big").bit_count()
+
+    def _positions(self, item_id: str, segment: int):
+        try:
+            value = int(item_id[:16], 16)
+        except ValueError:
+            value = int.from_bytes(hashlib.blake2b(item_id.encode(), digest_size=8).digest(), "big")
+
+        # Double hashing: two 32-bit halves give all k positions
+        h1 = value >> 32
+        h2 = (value & 0xFFFFFFFF) | 1
+        num_bits = self.NUM_BITS << segment
+        for i in range(self.NUM_HASHES + segment):
+            yield (h1 + i * h2) % num_bits
+
+    def add(self, item_id: str):
+        if item_id in self:
+            return
+        segment = len(self.segments) - 1
+        if self._filled >= self.FILL_LIMIT * (self.NUM_BITS << segment):
+            segment += 1
+            self.segments.append(bytearray((self.NUM_BITS << segment) // 8))
+            self._filled = 0
+        bits = self.segments[segment]
+        for pos in self._positions(item_id, segment):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                self._filled += 1
+
+    def update(self, item_ids: Iterable[str]):
+        for item_id in item_ids:
+            self.add(item_id)
+
+    def __contains__(self, item_id: str) -> bool:
+        return any(
+            all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item_id, segment))
+            for segment, bits in enumerate(self.segments)
+        )
+
+    def __bool__(self) -> bool:
+        return any(self.segments[0])
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self.segments)
@@ -0,0 +1,73 @@
+"""
+QuizSense AI - Single-Flight Call Coalescing
+Concurrent identical calls share one in-flight task and its result.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the call as a task; callers that
+    arrive while it is running await the same task. Nothing is kept once
+    it finishes, so a failure reaches everyone waiting on it but the next
+    call retries. A caller that is cancelled stops waiting without
+    cancelling the shared task, unless it was the last one waiting.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._counters = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "cancelled": 0
+        }
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await factory() for this key, or the call already in flight for it"""
+
+        self._counters["calls"] += 1
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done() or flight.task.cancelling():
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+            self._counters["executions"] += 1
+        else:
+            self._counters["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            # shield: cancelling this caller must not cancel the others' task
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget it now, not when the task finishes, so nobody joins a cancelled call
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def _finish(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.task.cancelled():
+            self._counters["cancelled"] += 1
+        elif flight.task.exception() is not None:
+            self._counters["errors"] += 1
+
+    def stats(self) -> Dict:
+        return {**self._counters, "in_flight": len(self._flights)}
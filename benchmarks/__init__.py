@@ -0,0 +1,3 @@
+"""
+QuizSense AI - Benchmarks Package
+"""
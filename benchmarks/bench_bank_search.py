@@ -0,0 +1,84 @@
+"""
+QuizSense AI - Bank Search Benchmark
+Builds a BM25 index over a synthetic bank (seed questions with random
+vocabulary mixed in) and reports query latency with and without filters.
+
+Run with: python -m benchmarks.bench_bank_search [num_items]
+"""
+
+import json
+import random
+import sys
+import time
+
+from app.services.bank_search import SearchIndex
+from app.services.question_bank import BANK_SEED_PATH
+
+DEFAULT_ITEMS = 100_000
+QUERIES = 500
+
+QUERY_TERMS = [
+    "closure", "recursion base case", "time complexity", "binary search", "stack",
+    "dictionary keys", "http method", "css selector", "exception", "list comprehension"
+]
+
+
+def synthetic_items(n: int):
+    seed = [json.loads(line) for line in open(BANK_SEED_PATH, encoding="utf-8") if line.strip()]
+    vocabulary = sorted({w for q in seed for w in q["question"].lower().split()})
+    rng = random.Random(42)
+    for i in range(n):
+        q = seed[i % len(seed)]
+        noise = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 12)))
+        text = " ".join([q["question"], noise, *q["options"].values(), q.get("explanation", "")])
+        yield (f"{i:016x}", q["topic"]), q["topic"], q["difficulty"], text
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000 for p in (50, 95, 99)}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITEMS
+    index = SearchIndex()
+
+    started = time.perf_counter()
+    for key, topic, difficulty, text in synthetic_items(n):
+        index.add(key, topic, difficulty, text)
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(7)
+    results = {}
+    for name, filters in [
+        ("no filter", {}),
+        ("topic", {"topic": "Searching"}),
+        ("topic+difficulty", {"topic": "Functions", "difficulty": "hard"}),
+    ]:
+        # First query per term folds the pending postings; measure steady state
+        for query in QUERY_TERMS:
+            index.search(query, **filters)
+        samples = []
+        for _ in range(QUERIES):
+            query = rng.choice(QUERY_TERMS)
+            t = time.perf_counter()
+            index.search(query, **filters)
+            samples.append(time.perf_counter() - t)
+        results[name] = percentiles(samples)
+
+    started = time.perf_counter()
+    for key, topic, difficulty, text in synthetic_items(1000):
+        index.add(("new",) + key, topic, difficulty, text)
+    add_us = (time.perf_counter() - started) / 1000 * 1e6
+
+    print("=" * 50)
+    print(f"Bank search over {n:,} items (built in {build_seconds:.1f}s)")
+    print("=" * 50)
+    for name, p in results.items():
+        print(f"{name:>18}: p50 {p[50]:6.2f} ms  p95 {p[95]:6.2f} ms  p99 {p[99]:6.2f} ms")
+    print(f"{'incremental add':>18}: {add_us:6.1f} µs/item")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
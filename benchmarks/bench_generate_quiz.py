@@ -0,0 +1,314 @@
+"""
+QuizSense AI - Quiz Generation Scaling Benchmark
+Builds synthetic banks of 1k, 100k and 1M items with skewed topic and
+difficulty distributions and measures QuizAgent.generate_quiz latency
+percentiles and per-call allocations on each sampling path:
+
+    exact     - the requested topic/difficulty cell has plenty of items
+    top_up    - the cell runs short and the topic's other difficulties fill in
+    fallback  - the whole topic runs short and other topics fill in
+
+Results can be saved as JSON and compared against a saved baseline; the
+exit status is 1 if any metric regressed by more than the tolerance.
+
+Run with: python -m benchmarks.bench_generate_quiz [--sizes 1000,100000]
+          [--output results.json] [--baseline baseline.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.services.ai_agent import QuizAgent
+from app.services.question_bank import (
+    QuestionBank,
+    _create_schema,
+    content_hash,
+    write_meta
+)
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_CALLS = 2000
+ALLOCATION_CALLS = 200
+WARMUP_CALLS = 50
+NUM_QUESTIONS = 20
+
+# Zipf-skewed topics; each topic leans towards a different difficulty
+NUM_TOPICS = 40
+TOPIC_SKEW = 1.2
+DIFFICULTY_WEIGHTS = [0.25, 0.6, 0.15]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+# Fixed-size topics that force the slower paths at every bank size
+TOP_UP_TOPIC = ("Top-Up", {"easy": 200, "medium": 200, "hard": 5})
+TAIL_TOPIC = ("Tail", {"easy": 5})
+
+COMPARE_METRICS = ["p50_us", "p95_us", "p99_us", "alloc_peak_kib_p50"]
+
+
+# ============================================
+# Synthetic Bank
+# ============================================
+
+def _question(i: int, topic: str, difficulty: str) -> Dict:
+    return {
+        "topic": topic,
+        "difficulty": difficulty,
+        "question": f"Synthetic question {i} on {topic}?",
+        "options": {"A": f"Answer {i}", "B": f"Distractor {i}", "C": "Neither", "D": "Both"},
+        "correct_answer": "A",
+        "explanation": f"Explanation {i}."
+    }
+
+
+def synthetic_questions(n: int) -> Iterator[Dict]:
+    """n Zipf-distributed questions, then the fixed top-up and tail topics"""
+
+    rng = random.Random(42)
+    topics = [f"Topic {rank:03d}" for rank in range(NUM_TOPICS)]
+    topic_weights = [1 / (rank + 1) ** TOPIC_SKEW for rank in range(NUM_TOPICS)]
+    i = 0
+    for _ in range(n):
+        rank = rng.choices(range(NUM_TOPICS), topic_weights)[0]
+        shift = rank % len(DIFFICULTIES)
+        weights = DIFFICULTY_WEIGHTS[shift:] + DIFFICULTY_WEIGHTS[:shift]
+        yield _question(i, topics[rank], rng.choices(DIFFICULTIES, weights)[0])
+        i += 1
+
+    for topic, cells in (TOP_UP_TOPIC, TAIL_TOPIC):
+        for difficulty, count in cells.items():
+            for _ in range(count):
+                yield _question(i, topic, difficulty)
+                i += 1
+
+
+def build_bank(n: int, directory: Path) -> Tuple[Path, Path]:
+    """
+    Write a seed and a matching compiled bank directly.
+
+    compile_bank would spend most of its time on MinHash signatures and
+    LSH rows, which sampling never reads; synthetic items are unique by
+    construction, so each is its own dup_group and the signature is empty.
+    """
+
+    seed_path = directory / f"bank_{n}.jsonl"
+    db_path = directory / f"bank_{n}.sqlite"
+
+    def rows():
+        with open(seed_path, "w", encoding="utf-8") as seed:
+            for seq, q in enumerate(synthetic_questions(n), 1):
+                seed.write(json.dumps(q) + "\n")
+                item_id = content_hash(q["question"], q["options"])
+                yield (
+                    seq, item_id, q["topic"], q["difficulty"], q["question"],
+                    json.dumps(q["options"]), q["correct_answer"], q["explanation"], b"", item_id
+                )
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        _create_schema(conn)
+        conn.executemany(
+            """
+            INSERT INTO items
+                (seq, item_id, topic, difficulty, question, options, correct_answer, explanation, minhash, dup_group)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows()
+        )
+        write_meta(conn, seed_path, 1)
+        conn.commit()
+    finally:
+        conn.close()
+    return seed_path, db_path
+
+
+# ============================================
+# Measurement
+# ============================================
+
+def _percentile(samples: List[float], p: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+async def _measure_path(agent: QuizAgent, topic: str, difficulty: str, calls: int) -> Dict:
+    """Latency and allocation figures for one sampling path"""
+
+    def call():
+        return agent.generate_quiz(
+            subject="Benchmark",
+            topic=topic,
+            difficulty=difficulty,
+            num_questions=NUM_QUESTIONS
+        )
+
+    # First call loads the topic (and, on the fallback path, the topics it borrows from)
+    started = time.perf_counter()
+    quiz = await call()
+    cold_ms = (time.perf_counter() - started) * 1000
+    picked_topics = [q["topic"] for q in quiz["questions"]]
+    picked_difficulties = [q["difficulty"] for q in quiz["questions"] if q["topic"] == topic]
+
+    for _ in range(WARMUP_CALLS):
+        await call()
+
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+
+    # Separate pass: tracing slows every allocation down
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(ALLOCATION_CALLS):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+
+    return {
+        "topic": topic,
+        "difficulty": difficulty,
+        "questions": len(picked_topics),
+        "from_topic": picked_topics.count(topic),
+        "at_difficulty": picked_difficulties.count(difficulty),
+        "cold_ms": round(cold_ms, 3),
+        "p50_us": round(_percentile(samples, 50) * 1e6, 2),
+        "p95_us": round(_percentile(samples, 95) * 1e6, 2),
+        "p99_us": round(_percentile(samples, 99) * 1e6, 2),
+        "mean_us": round(sum(samples) / len(samples) * 1e6, 2),
+        "alloc_peak_kib_p50": round(_percentile(peaks, 50) / 1024, 2),
+        "alloc_peak_kib_max": round(peaks[-1] / 1024, 2)
+    }
+
+
+def run_size(n: int, calls: int, directory: Path) -> Dict:
+    started = time.perf_counter()
+    seed_path, db_path = build_bank(n, directory)
+    build_seconds = time.perf_counter() - started
+
+    # The most common topic, at the difficulty it leans towards
+    paths = {
+        "exact": ("Topic 000", DIFFICULTIES[DIFFICULTY_WEIGHTS.index(max(DIFFICULTY_WEIGHTS))]),
+        "top_up": (TOP_UP_TOPIC[0], "hard"),
+        "fallback": (TAIL_TOPIC[0], "easy")
+    }
+
+    results = {"build_seconds": round(build_seconds, 2), "paths": {}}
+    try:
+        # generate_quiz logs every call
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for name, (topic, difficulty) in paths.items():
+                # A fresh snapshot per path, so cold_ms includes loading every topic it touches
+                bank = QuestionBank(seed_path=seed_path, db_path=db_path)
+                try:
+                    results["paths"][name] = asyncio.run(
+                        _measure_path(QuizAgent(bank=bank), topic, difficulty, calls)
+                    )
+                finally:
+                    bank.close()
+    finally:
+        seed_path.unlink()
+        db_path.unlink()
+    return results
+
+
+# ============================================
+# Baseline Comparison
+# ============================================
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print metric changes against the baseline; returns the regressed metrics"""
+
+    regressions = []
+    print(f"\nAgainst baseline from {baseline.get('timestamp', '?')} (tolerance {tolerance:.0%}):")
+    for size, result in current["sizes"].items():
+        base_size = baseline.get("sizes", {}).get(size)
+        if base_size is None:
+            print(f"  {int(size):>9,}: not in baseline")
+            continue
+        for path, metrics in result["paths"].items():
+            base = base_size["paths"].get(path)
+            if base is None:
+                continue
+            for metric in COMPARE_METRICS:
+                old, new = base.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                flag = ""
+                if change > tolerance:
+                    flag = "  REGRESSION"
+                    regressions.append(f"{size}/{path}/{metric}")
+                print(f"  {int(size):>9,} {path:>8} {metric:>18}: {old:10.2f} -> {new:10.2f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Benchmark QuizAgent.generate_quiz against synthetic banks")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                        help="Comma-separated bank sizes")
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS, help="Timed calls per path")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare against a saved results file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "num_questions": NUM_QUESTIONS,
+        "calls": args.calls,
+        "sizes": {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            report["sizes"][str(n)] = run_size(n, args.calls, Path(tmp))
+
+    print("=" * 78)
+    print(f"QuizAgent.generate_quiz, {NUM_QUESTIONS} questions, {args.calls} calls per path")
+    print("=" * 78)
+    for size, result in report["sizes"].items():
+        print(f"{int(size):,} items (built in {result['build_seconds']}s)")
+        for path, m in result["paths"].items():
+            print(f"  {path:>8}: p50 {m['p50_us']:8.1f} µs  p95 {m['p95_us']:8.1f} µs  "
+                  f"p99 {m['p99_us']:8.1f} µs  alloc {m['alloc_peak_kib_p50']:6.1f} KiB  "
+                  f"cold {m['cold_ms']:8.1f} ms")
+    print("=" * 78)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+QuizSense AI - LLM Provider Load Benchmark
+Drives AzureOpenAIProvider with concurrent quiz generation requests against
+the local simulator (benchmarks/llm_simulator.py) and reports latency
+percentiles, failures and what caching, single-flight, hedging and the
+quota scheduler did along the way.
+
+By default the simulator runs in-process; --endpoint points the provider
+at a served one instead (its counters are read from GET /stats).
+
+Run with: python -m benchmarks.bench_llm_provider [--requests 200] [--concurrency 20]
+          [--distinct 10] [--latency-ms 300] [--error-429 0.05] [--tpm 60000 --rpm 300]
+          [--no-cache] [--hedge-delay 0.5] [--endpoint http://127.0.0.1:8001]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.services.generation_cache import GenerationCache
+from app.services.llm_provider import AzureOpenAIProvider, ProviderError
+from app.services.llm_scheduler import TokenBucketScheduler
+from benchmarks.llm_simulator import LATENCY_DISTRIBUTIONS, LLMSimulator
+
+TOPICS = ["Variables and Data Types", "Operators", "Control Flow", "Loops", "Functions", "Lists and Tuples"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def _percentile(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 1)
+
+
+def make_workload(requests: int, distinct: int, seed: int = 7) -> List[tuple]:
+    """`requests` (topic, difficulty) keys drawn from `distinct` of them, the first few most often"""
+    rng = random.Random(seed)
+    keys = [(topic, difficulty) for difficulty in DIFFICULTIES for topic in TOPICS][:distinct]
+    weights = [1 / (rank + 1) for rank in range(len(keys))]
+    return rng.choices(keys, weights, k=requests)
+
+
+async def run(args, cache_dir: Path) -> Dict:
+    simulator = None
+    transport = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        simulator = LLMSimulator(
+            latency_ms=args.latency_ms,
+            latency_distribution=args.latency_distribution,
+            latency_jitter=args.latency_jitter,
+            tokens_per_second=args.tokens_per_second,
+            error_429_rate=args.error_429,
+            error_500_rate=args.error_500,
+            tokens_per_minute=args.upstream_tpm,
+            requests_per_minute=args.upstream_rpm,
+            random_seed=args.seed
+        )
+        transport = httpx.ASGITransport(app=simulator)
+        endpoint = "http://simulator"
+
+    scheduler = None
+    if args.tpm and args.rpm:
+        scheduler = TokenBucketScheduler(args.tpm, args.rpm, args.max_queue_delay)
+    provider = AzureOpenAIProvider(
+        endpoint=endpoint,
+        api_key="local",
+        deployment="quiz-gpt",
+        max_concurrency=args.max_concurrency,
+        transport=transport,
+        cache=None if args.no_cache else GenerationCache(db_path=cache_dir / "cache.db"),
+        hedge_delay_seconds=args.hedge_delay if args.hedge_delay > 0 else None,
+        scheduler=scheduler
+    )
+
+    latencies: List[float] = []
+    failures: Dict[str, int] = {}
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(topic: str, difficulty: str):
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await provider.generate("Python Programming", topic, difficulty, args.num_questions)
+            except ProviderError as e:
+                kind = type(e).__name__
+                failures[kind] = failures.get(kind, 0) + 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(topic, difficulty) for topic, difficulty in make_workload(args.requests, args.distinct, args.seed)))
+        elapsed = time.perf_counter() - started
+        stats = provider.stats()
+        if simulator is not None:
+            upstream = simulator.stats()
+        else:
+            async with httpx.AsyncClient(base_url=endpoint) as client:
+                upstream = (await client.get("/stats")).json()
+    finally:
+        await provider.aclose()
+
+    return {
+        "requests": args.requests,
+        "succeeded": len(latencies),
+        "failures": failures,
+        "seconds": round(elapsed, 2),
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "provider": stats,
+        "upstream": upstream
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Load-test the LLM generation provider against a simulated endpoint")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once")
+    parser.add_argument("--distinct", type=int, default=10, help="Distinct topic/difficulty keys requested")
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+
+    provider = parser.add_argument_group("provider")
+    provider.add_argument("--no-cache", action="store_true", help="Disable the generation cache")
+    provider.add_argument("--hedge-delay", type=float, default=3.0, help="Seconds before hedging (0 = never)")
+    provider.add_argument("--max-concurrency", type=int, default=8)
+    provider.add_argument("--tpm", type=int, default=0, help="Scheduler tokens per minute (0 = no scheduler)")
+    provider.add_argument("--rpm", type=int, default=0, help="Scheduler requests per minute")
+    provider.add_argument("--max-queue-delay", type=float, default=2.0)
+
+    upstream = parser.add_argument_group("simulator (in-process)")
+    upstream.add_argument("--endpoint", help="Use a served simulator instead")
+    upstream.add_argument("--latency-ms", type=float, default=300.0)
+    upstream.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    upstream.add_argument("--latency-jitter", type=float, default=0.5)
+    upstream.add_argument("--tokens-per-second", type=float, default=0.0)
+    upstream.add_argument("--error-429", type=float, default=0.0)
+    upstream.add_argument("--error-500", type=float, default=0.0)
+    upstream.add_argument("--upstream-tpm", type=int, default=0, help="Simulated deployment's TPM quota")
+    upstream.add_argument("--upstream-rpm", type=int, default=0, help="Simulated deployment's RPM quota")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = asyncio.run(run(args, Path(directory)))
+
+    print("=" * 60)
+    print(f"LLM provider load ({args.requests} requests, {args.concurrency} concurrent, {args.distinct} keys)")
+    print("=" * 60)
+    print(f"succeeded: {result['succeeded']}/{result['requests']} in {result['seconds']}s  failures: {result['failures']}")
+    print(f"latency:   p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms")
+    stats = result["provider"]
+    if stats["cache"] is not None:
+        print(f"cache:     hit rate {stats['cache']['hit_rate']}")
+    print(f"hedges:    {stats['hedges']}  breaker: {stats['circuit_breaker']}")
+    if stats["scheduler"] is not None:
+        print(f"scheduler: {stats['scheduler']}")
+    print(f"upstream:  {result['upstream']}")
+    print("=" * 60)
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
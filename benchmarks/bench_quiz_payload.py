@@ -0,0 +1,99 @@
+"""
+QuizSense AI - Quiz Payload Serialization Benchmark
+Compares building a 20-question quiz response through pydantic models
+(the old route path) against splicing cached JSON fragments.
+
+Run with: python -m benchmarks.bench_quiz_payload
+"""
+
+import asyncio
+import json
+import tempfile
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.quiz import QuizQuestion, QuizResponse, Difficulty
+from app.routes.quiz import build_quiz_response
+from app.services.ai_agent import QuizAgent
+from app.services.question_bank import QuestionBank, BANK_SEED_PATH
+
+NUM_QUESTIONS = 20
+ROUNDS = 2000
+
+
+def models_path(quiz_data: dict, created_at: datetime) -> bytes:
+    """What /quiz/generate did before: build models, then FastAPI re-validates and encodes"""
+    questions = [
+        QuizQuestion(
+            q_id=q["q_id"],
+            question=q["question"],
+            options=q["options"],
+            correct_answer="hidden",
+            topic=q["topic"],
+            sub_topic=q.get("sub_topic"),
+            difficulty=Difficulty(q["difficulty"]),
+            explanation=None
+        )
+        for q in quiz_data["questions"]
+    ]
+    response = QuizResponse(
+        quiz_id="quiz_abc123",
+        subject="Python Programming",
+        topic="Strings",
+        difficulty=Difficulty.MEDIUM,
+        questions=questions,
+        total_questions=len(questions),
+        time_limit_minutes=NUM_QUESTIONS * 2,
+        created_at=created_at
+    )
+    # response_model=QuizResponse validation + JSONResponse rendering
+    validated = QuizResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def splice_path(quiz_data: dict, created_at: datetime) -> bytes:
+    return build_quiz_response(
+        quiz_id="quiz_abc123",
+        subject="Python Programming",
+        topic="Strings",
+        difficulty=Difficulty.MEDIUM,
+        quiz_data=quiz_data,
+        time_limit_minutes=NUM_QUESTIONS * 2,
+        created_at=created_at
+    ).body
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = QuestionBank(seed_path=BANK_SEED_PATH, db_path=Path(tmp) / "bank.sqlite")
+        agent = QuizAgent(bank=bank)
+        quiz_data = asyncio.run(agent.generate_quiz(
+            subject="Python Programming",
+            topic="Strings",
+            difficulty="medium",
+            num_questions=NUM_QUESTIONS
+        ))
+        created_at = datetime.utcnow()
+
+        assert json.loads(models_path(quiz_data, created_at)) == json.loads(splice_path(quiz_data, created_at))
+
+        results = {}
+        for name, fn in [("models", models_path), ("splice", splice_path)]:
+            best = min(timeit.repeat(lambda: fn(quiz_data, created_at), number=ROUNDS, repeat=5))
+            results[name] = best / ROUNDS * 1e6
+
+        print("=" * 50)
+        print(f"Quiz payload serialization ({NUM_QUESTIONS} questions)")
+        print("=" * 50)
+        for name, us in results.items():
+            print(f"{name:>8}: {us:8.1f} µs/quiz")
+        print(f" speedup: {results['models'] / results['splice']:8.1f}x")
+        print("=" * 50)
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+QuizSense AI - LLM Question Validation Benchmark
+Measures how many model-produced questions per second the schema
+validator gets through, on replies mixing clean, repairable and invalid
+items, against the previous per-record import validator.
+
+Run with: python -m benchmarks.bench_validate_questions [--items 100000] [--min-rate 10000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from app.services.bank_import import validate_question
+from app.services.question_bank import content_hash
+from app.services.question_schema import extract_records, validate_questions
+
+DEFAULT_ITEMS = 100_000
+DEFAULT_MIN_RATE = 10_000
+ITEMS_PER_REPLY = 10
+
+
+def clean_item(n: int) -> Dict:
+    return {
+        "q_id": f"q{n}",
+        "question": f"What does expression number {n} evaluate to in Python?",
+        "options": {"A": f"{n}", "B": f"{n + 1}", "C": f"{n * 2}", "D": "An error"},
+        "correct_answer": "B",
+        "topic": "Operators",
+        "sub_topic": "Arithmetic",
+        "difficulty": "medium",
+        "explanation": "Worked through step by step."
+    }
+
+
+def defective_item(n: int, rng: random.Random) -> Dict:
+    """A clean item with one of the defects models commonly make"""
+    item = clean_item(n)
+    defect = rng.randrange(4)
+    if defect == 0:
+        item = {key.title(): value for key, value in item.items()}
+    elif defect == 1:
+        item["options"] = [f"{key}) {text}" for key, text in item["options"].items()]
+    elif defect == 2:
+        item["options"] = {key.lower(): text for key, text in item["options"].items()}
+        item["correct_answer"] = "b"
+    else:
+        item["correct_answer"] = item["options"]["B"]
+        item["difficulty"] = "Medium"
+    return item
+
+
+def invalid_item(n: int) -> Dict:
+    item = clean_item(n)
+    del item["options"]["D"]
+    return item
+
+
+def make_replies(num_items: int, seed: int = 7) -> List[str]:
+    """Fenced replies of ITEMS_PER_REPLY items: 70% clean, 20% repairable, 10% invalid"""
+    rng = random.Random(seed)
+    items = []
+    for n in range(num_items):
+        roll = rng.random()
+        items.append(clean_item(n) if roll < 0.7 else defective_item(n, rng) if roll < 0.9 else invalid_item(n))
+    return [
+        "```json\n" + json.dumps({"questions": items[i:i + ITEMS_PER_REPLY]}) + "\n```"
+        for i in range(0, num_items, ITEMS_PER_REPLY)
+    ]
+
+
+def schema_path(replies: List[str]) -> int:
+    return sum(len(validate_questions(extract_records(reply), "Operators", "medium").questions) for reply in replies)
+
+
+def previous_path(replies: List[str]) -> int:
+    """What the provider did before: locate the object, then validate_question + hash per record"""
+    valid = 0
+    for reply in replies:
+        records = json.loads(reply[reply.find("{"):reply.rfind("}") + 1])["questions"]
+        for record in records:
+            try:
+                q = validate_question({**record, "topic": "Operators"}, None)
+            except (ValueError, AttributeError):
+                continue
+            content_hash(q["question"], q["options"])
+            valid += 1
+    return valid
+
+
+def measure(fn, replies: List[str], num_items: int) -> Dict:
+    started = time.perf_counter()
+    valid = fn(replies)
+    elapsed = time.perf_counter() - started
+    return {"valid": valid, "seconds": round(elapsed, 3), "items_per_second": round(num_items / elapsed)}
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Benchmark validation of LLM-produced questions")
+    parser.add_argument("--items", type=int, default=DEFAULT_ITEMS)
+    parser.add_argument("--min-rate", type=int, default=DEFAULT_MIN_RATE, help="Fail below this many items/s")
+    args = parser.parse_args(argv)
+
+    replies = make_replies(args.items)
+    results = {name: measure(fn, replies, args.items) for name, fn in [("previous", previous_path), ("schema", schema_path)]}
+
+    print("=" * 60)
+    print(f"LLM question validation ({args.items} items, {ITEMS_PER_REPLY} per reply)")
+    print("=" * 60)
+    for name, result in results.items():
+        print(f"{name:>9}: {result['items_per_second']:>9,} items/s  "
+              f"({result['valid']:,} valid, {result['seconds']}s)")
+    print("=" * 60)
+
+    rate = results["schema"]["items_per_second"]
+    if rate < args.min_rate:
+        print(f"❌ Schema validation below {args.min_rate:,} items/s")
+        sys.exit(1)
+    print(f"✅ Schema validation at {rate:,} items/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+QuizSense AI - Local Azure OpenAI Simulator
+An ASGI app that answers the chat-completions API the way an Azure OpenAI
+deployment does (plain and streamed replies, usage, 429s with
+Retry-After), with configurable latency, token rate, failure injection and
+quotas, so caching, hedging and quota scheduling can be measured offline.
+
+Point a provider at it in-process with
+    AzureOpenAIProvider(..., transport=httpx.ASGITransport(app=LLMSimulator()))
+or serve it and pass the URL as the endpoint:
+
+Run with: python -m benchmarks.llm_simulator [--port 8001] [--latency-ms 800]
+          [--tokens-per-second 80] [--error-429 0.02] [--payload synthetic]
+Then:     python -m app.jobs.grow_bank --endpoint http://127.0.0.1:8001
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.llm_scheduler import CHARS_PER_TOKEN, estimate_tokens
+from app.services.question_bank import BANK_SEED_PATH
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+PAYLOADS = ("bank", "synthetic")
+
+# Streamed replies are sent in chunks of about this many tokens
+STREAM_CHUNK_TOKENS = 4
+
+_CHAT_PATH = re.compile(r"^/openai/deployments/([^/]+)/chat/completions$")
+_PARAMETER = {
+    "topic": re.compile(r"\*\*Topic:\*\*\s*(.+)"),
+    "difficulty": re.compile(r"\*\*Difficulty:\*\*\s*(\w+)"),
+    "num_questions": re.compile(r"\*\*Number of Questions:\*\*\s*(\d+)")
+}
+
+_WORDS = ("list", "tuple", "loop", "scope", "class", "module", "slice", "string", "lambda", "index",
+          "generator", "decorator", "exception", "iterator", "closure", "keyword", "method", "set")
+
+
+def load_bank_questions(seed_path: Path = BANK_SEED_PATH) -> Dict[Tuple[str, str], List[Dict]]:
+    """The seed bank's questions by (topic, difficulty)"""
+    cells: Dict[Tuple[str, str], List[Dict]] = {}
+    with open(seed_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                q = json.loads(line)
+                cells.setdefault((q["topic"], q["difficulty"]), []).append(q)
+    return cells
+
+
+class LLMSimulator:
+    """
+    A fake Azure OpenAI chat deployment.
+
+    Each request waits for a sampled time-to-first-token (`latency_ms`,
+    drawn from `latency_distribution` with `latency_jitter` as the
+    lognormal sigma or the uniform +/- fraction), then for the reply's
+    tokens at `tokens_per_second` (0 sends them at once). Streamed replies
+    pace their chunks the same way.
+
+    `error_429_rate` and `error_500_rate` fail that fraction of requests
+    up front. With `tokens_per_minute`/`requests_per_minute` set, requests
+    over a sliding one-minute window also get a 429, with a Retry-After for
+    when the window frees up, as the real quota does.
+
+    Replies carry `num_questions` questions for the prompt's topic and
+    difficulty: with payload="bank", drawn from the seed bank; with
+    "synthetic", new ones no bank or earlier reply contains (for bank
+    growth runs). `bad_item_rate` breaks that fraction of them.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency_distribution: str = "lognormal",
+        latency_jitter: float = 0.3,
+        tokens_per_second: float = 0.0,
+        error_429_rate: float = 0.0,
+        error_500_rate: float = 0.0,
+        retry_after_seconds: float = 1.0,
+        tokens_per_minute: int = 0,
+        requests_per_minute: int = 0,
+        payload: str = "bank",
+        bad_item_rate: float = 0.0,
+        seed_path: Path = BANK_SEED_PATH,
+        random_seed: Optional[int] = None
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {LATENCY_DISTRIBUTIONS}")
+        if payload not in PAYLOADS:
+            raise ValueError(f"payload must be one of {PAYLOADS}")
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_jitter = latency_jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_429_rate = error_429_rate
+        self.error_500_rate = error_500_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.payload = payload
+        self.bad_item_rate = bad_item_rate
+        self.seed_path = Path(seed_path)
+        self.rng = random.Random(random_seed)
+
+        self._bank: Optional[Dict[Tuple[str, str], List[Dict]]] = None
+        self._window: "deque[Tuple[float, int]]" = deque()
+        self._window_tokens = 0
+        self._generated = 0
+        self._in_flight = 0
+        self._counters = {
+            "requests": 0,
+            "streamed": 0,
+            "ok": 0,
+            "injected_429": 0,
+            "quota_429": 0,
+            "injected_500": 0,
+            "bad_requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "max_in_flight": 0
+        }
+
+    # ============================================
+    # ASGI
+    # ============================================
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["method"] == "GET" and scope["path"] == "/stats":
+            await self._send_json(send, 200, self.stats())
+            return
+        if scope["method"] != "POST" or not _CHAT_PATH.match(scope["path"]):
+            await self._send_json(send, 404, {"error": {"code": "404", "message": "Resource not found"}})
+            return
+        if not any(name == b"api-key" for name, _ in scope["headers"]):
+            await self._send_json(send, 401, {"error": {"code": "401", "message": "Access denied: missing api-key"}})
+            return
+
+        raw = b""
+        while True:
+            message = await receive()
+            raw += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        self._counters["requests"] += 1
+        self._in_flight += 1
+        self._counters["max_in_flight"] = max(self._counters["max_in_flight"], self._in_flight)
+        try:
+            await self._chat(raw, send)
+        finally:
+            self._in_flight -= 1
+
+    async def _chat(self, raw: bytes, send):
+        try:
+            body = json.loads(raw)
+            messages = body["messages"]
+            prompt = "\n".join(m.get("content") or "" for m in messages)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._counters["bad_requests"] += 1
+            await self._send_json(send, 400, {"error": {"code": "400", "message": "Invalid request body"}})
+            return
+
+        roll = self.rng.random()
+        if roll < self.error_429_rate:
+            self._counters["injected_429"] += 1
+            await self._too_many_requests(send, self.retry_after_seconds)
+            return
+        if roll < self.error_429_rate + self.error_500_rate:
+            self._counters["injected_500"] += 1
+            await asyncio.sleep(self.sample_latency())
+            await self._send_json(send, 500, {"error": {"code": "500", "message": "Simulated server error"}})
+            return
+
+        prompt_tokens = estimate_tokens(messages)
+        retry_after = self._admit(prompt_tokens + int(body.get("max_tokens") or 0))
+        if retry_after is not None:
+            self._counters["quota_429"] += 1
+            await self._too_many_requests(send, retry_after)
+            return
+
+        content = json.dumps({"questions": self.make_questions(prompt)})
+        completion_tokens = max(1, len(content) // CHARS_PER_TOKEN)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        self._counters["prompt_tokens"] += prompt_tokens
+        self._counters["completion_tokens"] += completion_tokens
+
+        await asyncio.sleep(self.sample_latency())
+        if body.get("stream"):
+            self._counters["streamed"] += 1
+            await self._stream(send, content)
+        else:
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(completion_tokens / self.tokens_per_second)
+            await self._send_json(send, 200, {
+                "id": f"chatcmpl-sim-{self._counters['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage
+            })
+        self._counters["ok"] += 1
+
+    async def _stream(self, send, content: str):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]
+        })
+
+        async def event(delta: Dict, finish_reason: Optional[str] = None):
+            chunk = {"object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            await send({"type": "http.response.body", "body": f"data: {json.dumps(chunk)}\n\n".encode(), "more_body": True})
+
+        await event({"role": "assistant"})
+        step = STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+        for start in range(0, len(content), step):
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(STREAM_CHUNK_TOKENS / self.tokens_per_second)
+            await event({"content": content[start:start + step]})
+        await event({}, "stop")
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n", "more_body": False})
+
+    async def _send_json(self, send, status: int, payload: Dict, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+        data = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())] + (headers or [])
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    async def _too_many_requests(self, send, retry_after: float):
+        await self._send_json(
+            send, 429,
+            {"error": {"code": "429", "message": "Requests to the deployment have exceeded the rate limit"}},
+            [(b"retry-after", str(max(1, round(retry_after))).encode())]
+        )
+
+    # ============================================
+    # Behaviour
+    # ============================================
+
+    def sample_latency(self) -> float:
+        """Seconds to the first token"""
+        median = self.latency_ms / 1000
+        if median <= 0 or self.latency_distribution == "fixed":
+            return max(0.0, median)
+        if self.latency_distribution == "uniform":
+            return median * self.rng.uniform(1 - self.latency_jitter, 1 + self.latency_jitter)
+        return self.rng.lognormvariate(0, self.latency_jitter) * median
+
+    def _admit(self, tokens: int) -> Optional[float]:
+        """Count a request against the one-minute quotas; seconds to wait if it's over them"""
+
+        if not self.tokens_per_minute and not self.requests_per_minute:
+            return None
+        now = time.monotonic()
+        while self._window and self._window[0][0] <= now - 60:
+            self._window_tokens -= self._window.popleft()[1]
+        over_requests = self.requests_per_minute and len(self._window) >= self.requests_per_minute
+        over_tokens = self.tokens_per_minute and self._window_tokens + tokens > self.tokens_per_minute
+        if over_requests or over_tokens:
+            return self._window[0][0] + 60 - now if self._window else 60.0
+        self._window.append((now, tokens))
+        self._window_tokens += tokens
+        return None
+
+    def make_questions(self, prompt: str) -> List[Dict]:
+        """The questions for a quiz generation prompt, as a model would return them"""
+
+        found = {name: pattern.search(prompt) for name, pattern in _PARAMETER.items()}
+        topic = found["topic"].group(1).strip() if found["topic"] else "Python Basics"
+        difficulty = found["difficulty"].group(1).strip().lower() if found["difficulty"] else "medium"
+        count = int(found["num_questions"].group(1)) if found["num_questions"] else 5
+
+        if self.payload == "bank":
+            questions = self._bank_questions(topic, difficulty, count)
+        else:
+            questions = [self._synthetic_question(topic, difficulty) for _ in range(count)]
+        for i, q in enumerate(questions):
+            if self.rng.random() < self.bad_item_rate:
+                questions[i] = {**q, "options": {"A": q["options"]["A"]}}
+        return questions
+
+    def _bank_questions(self, topic: str, difficulty: str, count: int) -> List[Dict]:
+        if self._bank is None:
+            self._bank = load_bank_questions(self.seed_path)
+        pool = self._bank.get((topic, difficulty)) or \
+            [q for (t, _), items in self._bank.items() if t == topic for q in items] or \
+            [q for items in self._bank.values() for q in items]
+        picked = self.rng.sample(pool, min(count, len(pool)))
+        return [
+            {
+                "question": q["question"],
+                "options": dict(q["options"]),
+                "correct_answer": q["correct_answer"],
+                "topic": topic,
+                "difficulty": difficulty,
+                "explanation": q.get("explanation", "")
+            }
+            for q in picked
+        ]
+
+    def _synthetic_question(self, topic: str, difficulty: str) -> Dict:
+        """A question unlike any other: its wording comes from a hash of a running counter"""
+        self._generated += 1
+        digest = hashlib.md5(f"{topic}:{self._generated}".encode()).digest()
+        words = [_WORDS[b % len(_WORDS)] for b in digest[:6]]
+        token = digest.hex()[:8]
+        return {
+            "question": f"In {topic}, how does a {words[0]} {words[1]} interact with {words[2]} {token}?",
+            "options": {
+                "A": f"It wraps the {words[3]}",
+                "B": f"It replaces the {words[4]} {token}",
+                "C": f"It ignores the {words[5]}",
+                "D": "It raises an error"
+            },
+            "correct_answer": "ABCD"[digest[6] % 4],
+            "topic": topic,
+            "difficulty": difficulty,
+            "explanation": f"Simulated question {self._generated}."
+        }
+
+    def stats(self) -> Dict:
+        return {**self._counters, "in_flight": self._in_flight}
+
+
+def main(argv: Optional[list] = None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a simulated Azure OpenAI chat deployment")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median time to first token")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-jitter", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="0 sends the reply at once")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Fraction of requests throttled")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Fraction of requests failed")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens per minute quota (0 = none)")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute quota (0 = none)")
+    parser.add_argument("--payload", choices=PAYLOADS, default="bank")
+    parser.add_argument("--bad-items", type=float, default=0.0, help="Fraction of questions sent broken")
+    parser.add_argument("--random-seed", type=int)
+    args = parser.parse_args(argv)
+
+    simulator = LLMSimulator(
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_jitter=args.latency_jitter,
+        tokens_per_second=args.tokens_per_second,
+        error_429_rate=args.error_429,
+        error_500_rate=args.error_500,
+        tokens_per_minute=args.tpm,
+        requests_per_minute=args.rpm,
+        payload=args.payload,
+        bad_item_rate=args.bad_items,
+        random_seed=args.random_seed
+    )
+    print(f"🧪 Simulated Azure OpenAI on http://{args.host}:{args.port} (GET /stats for counters)")
+    uvicorn.run(simulator, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ Tests for performance analysis and reporting
 """
 
 import pytest
+import asyncio
+import sqlite3
 from datetime import datetime, timedelta
 
 
@@ -235,6 +237,95 @@ class TestDashboardData:
         print(f"✅ Weekly accuracy aggregation passed: {weekly_accuracy}")
 
 
+class TestIrtCalibration:
+    """Tests for the IRT difficulty calibration job"""
+    
+    def _simulate(self, db_path, n_users=400, n_items=30, seed=7):
+        import numpy as np
+        from app.database import connection
+        asyncio.run(connection.init_database())
+        asyncio.run(connection.close_database())
+        
+        rng = np.random.default_rng(seed)
+        true_b = np.linspace(-2, 2, n_items)
+        theta = rng.normal(0, 1, n_users)
+        p = 1 / (1 + np.exp(-(theta[:, None] - true_b[None, :])))
+        answers = rng.random((n_users, n_items)) < p
+        rows = [
+            (f"user_{u}", f"item_{i:02d}", int(answers[u, i]), "2024-01-15T10:00:00")
+            for u in range(n_users) for i in range(n_items)
+        ]
+        conn = sqlite3.connect(str(db_path))
+        conn.executemany(
+            "INSERT INTO item_responses (user_id, item_id, correct, answered_at) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        conn.close()
+        return true_b
+    
+    def test_rasch_recovers_difficulty(self, tmp_path, monkeypatch):
+        """Test calibrated difficulties track the simulated ones, and refits warm-start"""
+        import numpy as np
+        from app.database import connection
+        from app.jobs.calibrate_irt import calibrate
+        db_path = tmp_path / "quizsense.db"
+        monkeypatch.setattr(connection, "DATABASE_PATH", db_path)
+        monkeypatch.setattr(connection, "_database", None)
+        true_b = self._simulate(db_path)
+        
+        report = calibrate(db_path=db_path, model="rasch", chunk_size=1000)
+        assert report["responses"] == 400 * 30
+        assert report["converged"]
+        
+        conn = sqlite3.connect(str(db_path))
+        fitted = [row[0] for row in conn.execute("SELECT difficulty FROM item_params ORDER BY item_id")]
+        conn.close()
+        assert np.corrcoef(fitted, true_b)[0, 1] > 0.97
+        
+        refit = calibrate(db_path=db_path, model="rasch", chunk_size=1000)
+        assert refit["warm_started_items"] == 30
+        assert refit["epochs"] < report["epochs"]
+        print(f"✅ Rasch calibration: {report['epochs']} epochs cold, {refit['epochs']} warm, "
+              f"{report['wall_seconds']}s, peak {report['peak_memory_mb']} MB")
+    
+    def test_backfill_derives_legacy_item_ids(self, tmp_path, monkeypatch):
+        """Test quizzes saved before item IDs existed are backfilled under their content hash"""
+        import json
+        from app.database import connection
+        from app.jobs.calibrate_irt import backfill_responses
+        from app.services.question_bank import content_hash
+        db_path = tmp_path / "quizsense.db"
+        monkeypatch.setattr(connection, "DATABASE_PATH", db_path)
+        monkeypatch.setattr(connection, "_database", None)
+        asyncio.run(connection.init_database())
+        asyncio.run(connection.close_database())
+        
+        options = {"A": "3", "B": "4", "C": "5", "D": "6"}
+        questions = [
+            {"q_id": "q1", "question": "What is 2 + 2?", "options": options, "correct_answer": "B"},
+            {"q_id": "q2", "item_id": "abcd", "question": "What is 1 + 2?", "options": options, "correct_answer": "A"}
+        ]
+        answers = [{"q_id": "q1", "selected_option": "B"}, {"q_id": "q2", "selected_option": "C"}]
+        conn = sqlite3.connect(str(db_path))
+        conn.execute(
+            "INSERT INTO quizzes (id, user_id, subject, topic, difficulty, questions, created_at) "
+            "VALUES ('quiz_1', 'user_1', 'Math', 'Addition', 'easy', ?, '2024-01-01T10:00:00')",
+            (json.dumps(questions),)
+        )
+        conn.execute(
+            "INSERT INTO quiz_attempts (id, quiz_id, user_id, answers, score, total, completed_at) "
+            "VALUES ('attempt_1', 'quiz_1', 'user_1', ?, 1, 2, '2024-01-01T10:05:00')",
+            (json.dumps(answers),)
+        )
+        
+        assert backfill_responses(conn) == 2
+        rows = sorted(conn.execute("SELECT item_id, correct FROM item_responses").fetchall())
+        conn.close()
+        assert rows == sorted([(content_hash("What is 2 + 2?", options), 1), ("abcd", 0)])
+        print("✅ Legacy response backfill passed")
+
+
 def run_analysis_tests():
     """Run all analysis tests"""
     print("\n" + "=" * 50)
@@ -5,9 +5,28 @@ Tests for quiz generation and submission
 
 import pytest
 import asyncio
+import json
+import tracemalloc
 from datetime import datetime
 
 
+def make_agent(tmp_path):
+    """QuizAgent over a bank compiled into a temporary directory"""
+    from app.services.ai_agent import QuizAgent
+    from app.services.question_bank import QuestionBank, BANK_SEED_PATH
+    return QuizAgent(bank=QuestionBank(seed_path=BANK_SEED_PATH, db_path=tmp_path / "bank.sqlite"))
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the app database at a fresh file for one test"""
+    from app.database import connection
+    monkeypatch.setattr(connection, "DATABASE_PATH", tmp_path / "quizsense.db")
+    monkeypatch.setattr(connection, "_database", None)
+    yield connection
+    asyncio.run(connection.close_database())
+
+
 class TestQuizGeneration:
     """Tests for quiz generation"""
     
@@ -145,6 +164,1959 @@ class TestQuizService:
         assert topic_breakdown["Loops"]["total"] == 2
         print(f"✅ Topic breakdown: {topic_breakdown}")
 
+    
+    def test_item_stats_batched_upsert(self, temp_db):
+        """Test per-item stats accumulate across submissions and unanswered ones don't dilute the mean time"""
+        from app.services.quiz_service import QuizService
+        service = QuizService()
+        
+        async def run():
+            await temp_db.init_database()
+            await service._update_item_stats([
+                {"item_id": "aaaa", "selected": "B", "is_correct": True, "time_taken": 10},
+                {"item_id": "bbbb", "selected": "none", "is_correct": False, "time_taken": 0}
+            ])
+            await service._update_item_stats([
+                {"item_id": "aaaa", "selected": "c", "is_correct": False, "time_taken": 20}
+            ])
+            await service._update_item_stats([
+                {"item_id": "aaaa", "selected": "none", "is_correct": False, "time_taken": 7}
+            ])
+            return await service.get_item_stats(["aaaa", "bbbb", "cccc"])
+        
+        stats = asyncio.run(run())
+        assert set(stats) == {"aaaa", "bbbb"}
+        assert stats["aaaa"]["attempts"] == 3
+        assert stats["aaaa"]["corrects"] == 1
+        assert stats["aaaa"]["option_picks"] == {"A": 0, "B": 1, "C": 1, "D": 0, "none": 1}
+        assert stats["aaaa"]["mean_time_seconds"] == 15.0
+        assert stats["bbbb"]["option_picks"]["none"] == 1
+        assert stats["bbbb"]["mean_time_seconds"] == 0
+        print("✅ Item stats upsert passed")
+
+
+class TestQuizAgentSampling:
+    """Tests for QuizAgent's sampling index"""
+    
+    def _generate(self, agent, topic, difficulty, num_questions):
+        return asyncio.run(agent.generate_quiz(
+            subject="Python Programming",
+            topic=topic,
+            difficulty=difficulty,
+            num_questions=num_questions
+        ))["questions"]
+    
+    def test_exact_difficulty_hit(self, tmp_path):
+        """Test that a full cell is served from the requested difficulty only"""
+        agent = make_agent(tmp_path)
+        index = agent.bank.get_topic("Loops")
+        cell = {index.items[slot].question for slot in index.cells["easy"]}
+        questions = self._generate(agent, "Loops", "easy", 3)
+        assert len(questions) == 3
+        assert all(q["question"] in cell for q in questions)
+        assert [q["q_id"] for q in questions] == ["q1", "q2", "q3"]
+        print("✅ Exact difficulty sampling passed")
+    
+    def test_top_up_without_repeats(self, tmp_path):
+        """Test top-up from other difficulties and topics never repeats a slot"""
+        agent = make_agent(tmp_path)
+        topic_size = len(agent.bank.get_topic("Recursion"))
+        questions = self._generate(agent, "Recursion", "hard", topic_size + 5)
+        texts = [q["question"] for q in questions]
+        assert len(questions) == topic_size + 5
+        assert len(set(texts)) == len(texts)
+        print("✅ Top-up sampling passed")
+    
+    def test_cells_stay_permutations(self, tmp_path):
+        """Test that in-place sampling keeps every cell a permutation of its slots"""
+        agent = make_agent(tmp_path)
+        index = agent.bank.get_topic("Strings")
+        before = {d: sorted(c) for d, c in index.cells.items()}
+        for _ in range(20):
+            self._generate(agent, "Strings", "medium", 10)
+        after = {d: sorted(c) for d, c in index.cells.items()}
+        assert before == after
+        print("✅ Sampling index integrity passed")
+    
+    def test_topics_load_lazily(self, tmp_path):
+        """Test that the bank only loads topics that were requested"""
+        agent = make_agent(tmp_path)
+        assert agent.bank.loaded_topics() == []
+        self._generate(agent, "Loops", "easy", 3)
+        assert agent.bank.loaded_topics() == ["Loops"]
+        assert "Greedy Algorithms" in agent.bank.topics()
+        print("✅ Lazy topic loading passed")
+    
+    def test_previously_seen_excluded(self, tmp_path):
+        """Test that seen items are skipped while unseen ones remain"""
+        from app.services.seen_set import SeenSet
+        agent = make_agent(tmp_path)
+        index = agent.bank.get_topic("Loops")
+        seen = SeenSet()
+        seen.update(index.items[slot].item_id for slot in index.cells["easy"][:-2])
+        questions = asyncio.run(agent.generate_quiz(
+            subject="Python Programming",
+            topic="Loops",
+            difficulty="easy",
+            num_questions=2,
+            previous_questions=seen
+        ))["questions"]
+        assert len(questions) == 2
+        assert not any(q["item_id"] in seen for q in questions)
+        print("✅ Previously-seen exclusion passed")
+    
+    def test_reload_swaps_snapshot(self, tmp_path):
+        """Test hot reload picks up seed edits while old snapshots keep working"""
+        import shutil
+        from app.services.ai_agent import QuizAgent
+        from app.services.question_bank import QuestionBank, BANK_SEED_PATH
+        seed = tmp_path / "seed.jsonl"
+        shutil.copy(BANK_SEED_PATH, seed)
+        agent = QuizAgent(bank=QuestionBank(seed_path=seed, db_path=tmp_path / "bank.sqlite"))
+        old_bank = agent.bank
+        old_size = len(old_bank.get_topic("Queues"))
+        assert old_bank.version == 1
+        
+        with open(seed, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "topic": "Queues", "difficulty": "hard", "question": "Deque stands for?",
+                "options": {"A": "Double-ended queue", "B": "Dequeue", "C": "Delete queue", "D": "Data queue"},
+                "correct_answer": "A", "explanation": "A deque allows push/pop at both ends."
+            }) + "\n")
+        result = asyncio.run(agent.reload_bank())
+        
+        assert result == {"previous_version": 1, "version": 2, "topics": 28, "warmed_topics": 1}
+        assert agent.bank is not old_bank
+        assert len(agent.bank.get_topic("Queues")) == old_size + 1
+        assert len(old_bank.get_topic("Queues")) == old_size
+        assert len(old_bank.get_topic("Stacks")) > 0
+        print("✅ Hot reload passed")
+    
+    def test_spliced_response_matches_models(self, tmp_path):
+        """Test the spliced quiz payload equals the pydantic QuizResponse"""
+        from app.models.quiz import QuizResponse, QuizQuestion, Difficulty
+        from app.routes.quiz import build_quiz_response
+        agent = make_agent(tmp_path)
+        quiz_data = asyncio.run(agent.generate_quiz(
+            subject="Python Programming",
+            topic="Strings",
+            difficulty="medium",
+            num_questions=20
+        ))
+        created_at = datetime.utcnow()
+        response = build_quiz_response(
+            quiz_id="quiz_abc123",
+            subject="Python Programming",
+            topic="Strings",
+            difficulty=Difficulty.MEDIUM,
+            quiz_data=quiz_data,
+            time_limit_minutes=40,
+            created_at=created_at
+        )
+        expected = QuizResponse(
+            quiz_id="quiz_abc123",
+            subject="Python Programming",
+            topic="Strings",
+            difficulty=Difficulty.MEDIUM,
+            questions=[
+                QuizQuestion(**{**q, "correct_answer": "hidden", "explanation": None})
+                for q in quiz_data["questions"]
+            ],
+            total_questions=20,
+            time_limit_minutes=40,
+            created_at=created_at
+        )
+        assert json.loads(response.body) == json.loads(expected.model_dump_json())
+        print("✅ Spliced quiz response passed")
+    
+    def test_fragments_keep_each_topic(self, tmp_path):
+        """Test one question filed under two topics gets a fragment with its own topic in each"""
+        from app.services.question_bank import QuestionItem
+        agent = make_agent(tmp_path)
+        items = [
+            QuestionItem(
+                item_id="same-hash", topic=topic, difficulty="easy", question="What is 2 + 2?",
+                options={"A": "3", "B": "4", "C": "5", "D": "22"}, correct_answer="B"
+            )
+            for topic in ("Arithmetic", "Warm-up")
+        ]
+        topics = [json.loads(b'{"q_id":"q1"' + agent.bank.public_fragment(item))["topic"] for item in items]
+        assert topics == ["Arithmetic", "Warm-up"]
+        print("✅ Per-topic public fragments passed")
+    
+    def test_mixed_quiz_follows_weights(self, tmp_path):
+        """Test mixed quizzes only draw from weighted topics, without repeats"""
+        from app.services.sampling import AliasTable
+        agent = make_agent(tmp_path)
+        topics = ["Loops", "Strings", "Functions"]
+        questions = asyncio.run(agent.generate_mixed_quiz(
+            subject="Python Programming",
+            topics=topics,
+            sampler=AliasTable([0.0, 1.0, 1.0]),
+            difficulty="medium",
+            num_questions=20
+        ))["questions"]
+        assert len(questions) == 20
+        assert {q["topic"] for q in questions} <= {"Strings", "Functions"}
+        assert len({q["item_id"] for q in questions}) == 20
+        print("✅ Mixed quiz sampling passed")
+
+
+class TestWeaknessSampling:
+    """Tests for alias tables and weakness-weighted topic selection"""
+    
+    def test_alias_table_distribution(self):
+        """Test alias table draws match their weights"""
+        from app.services.sampling import AliasTable
+        table = AliasTable([1, 2, 3, 0, 4])
+        counts = [0] * 5
+        for _ in range(50000):
+            counts[table.sample()] += 1
+        assert counts[3] == 0
+        for i, weight in enumerate([1, 2, 3, 0, 4]):
+            assert abs(counts[i] / 50000 - weight / 10) < 0.02
+        print(f"✅ Alias table distribution: {counts}")
+    
+    def test_topic_sampler_cached_until_stats_change(self):
+        """Test per-user alias tables are rebuilt only when topic stats change"""
+        from app.services.learning_agent import LearningAgent
+        agent = LearningAgent()
+        user_perf = {"total_quizzes": 6, "overall_accuracy": 65}
+        topic_perf = {
+            "Variables and Data Types": {"accuracy": 90, "attempts": 10},
+            "Operators": {"accuracy": 30, "attempts": 10}
+        }
+        topics, first = agent.get_topic_sampler("user_1", "Python Programming", user_perf, topic_perf)
+        _, second = agent.get_topic_sampler("user_1", "Python Programming", user_perf, dict(topic_perf))
+        assert first is second
+        weights = agent.topic_weights("Python Programming", user_perf, topic_perf)
+        assert weights["Operators"] > weights["Variables and Data Types"]
+        assert "Recursion" not in topics
+        
+        topic_perf["Operators"] = {"accuracy": 60, "attempts": 15}
+        _, third = agent.get_topic_sampler("user_1", "Python Programming", user_perf, topic_perf)
+        assert third is not first
+        print("✅ Topic sampler caching passed")
+
+
+class TestAdaptiveTesting:
+    """Tests for computerized adaptive quizzes"""
+    
+    def _cat_index(self, difficulties):
+        from app.services.adaptive import CatIndex
+        from app.services.question_bank import QuestionItem, TopicIndex
+        items = [
+            QuestionItem(f"{i:016x}", "Synthetic", "medium", f"Q{i}", {"A": "yes", "B": "no"}, "A")
+            for i in range(len(difficulties))
+        ]
+        params = {item.item_id: (b, 1.0) for item, b in zip(items, difficulties)}
+        return CatIndex(TopicIndex("Synthetic", items, {"medium": list(range(len(items)))}), params)
+    
+    def test_select_nearest_difficulty(self):
+        """Test selection bisects to the closest difficulty and skips excluded items"""
+        index = self._cat_index([-2.0, -1.0, 0.2, 0.9, 2.0])
+        first = index.select(0.8, set())
+        assert index.params(first.item_id)[0] == 0.9
+        second = index.select(0.8, {first.item_id})
+        assert index.params(second.item_id)[0] == 0.2
+        print("✅ Nearest-difficulty selection passed")
+    
+    def test_fewer_questions_than_fixed_quiz(self):
+        """Test adaptive picks reach the target precision sooner than random picks"""
+        import random as rnd
+        from app.services.adaptive import estimate_ability
+        rng = rnd.Random(3)
+        index = self._cat_index([rng.uniform(-3, 3) for _ in range(400)])
+        true_theta = 1.5
+        
+        def run(pick):
+            served, responses = set(), []
+            theta, se = estimate_ability(responses)
+            while se > 0.5 and len(served) < 60:
+                item = pick(theta, served)
+                served.add(item.item_id)
+                b, a = index.params(item.item_id)
+                correct = rng.random() < 1 / (1 + 2.718281828 ** -(true_theta - b))
+                responses.append((b, a, correct))
+                theta, se = estimate_ability(responses)
+            return len(served), theta
+        
+        adaptive_n, adaptive_theta = run(lambda theta, served: index.select(theta, served))
+        fixed_n, _ = run(lambda theta, served: rnd.Random(len(served)).choice(
+            [item for item in index.items if item.item_id not in served]
+        ))
+        assert adaptive_n < fixed_n
+        assert abs(adaptive_theta - true_theta) < 1.5  # three standard errors
+        print(f"✅ Adaptive quiz: {adaptive_n} questions vs {fixed_n} random")
+    
+    def test_next_question_from_bank(self, tmp_path):
+        """Test adaptive steps on the real bank never repeat and stop at max_questions"""
+        agent = make_agent(tmp_path)
+        
+        async def no_params(item_ids):
+            return {}
+        
+        async def take_quiz():
+            served, answered = set(), []
+            while True:
+                step = await agent.next_adaptive_question(
+                    topic="Loops",
+                    load_params=no_params,
+                    prior_ability=0.0,
+                    answered=answered,
+                    served=served,
+                    max_questions=5,
+                    min_questions=3,
+                    target_standard_error=0.1
+                )
+                if step["done"]:
+                    return served, step
+                question = step["questions"][0]
+                assert question["q_id"] == f"q{len(served) + 1}"
+                served.add(question["item_id"])
+                answered.append((question["item_id"], True))
+        
+        served, step = asyncio.run(take_quiz())
+        assert len(served) == 5
+        assert step["ability"] > 0
+        print("✅ Adaptive bank quiz passed")
+    
+    def test_auto_quiz_with_nothing_to_serve(self, temp_db, monkeypatch):
+        """Test an adaptive quiz that is done before its first question is a 409, and 0 questions is rejected"""
+        from fastapi import HTTPException
+        from pydantic import ValidationError
+        from app.routes import quiz as quiz_routes
+        
+        with pytest.raises(ValidationError):
+            quiz_routes.AutoQuizRequest(domain="Python Programming", num_questions=0)
+        
+        async def exhausted(**kwargs):
+            return {"ability": 0.0, "standard_error": 1.0, "done": True}
+        
+        monkeypatch.setattr(quiz_routes.quiz_agent, "next_adaptive_question", exhausted)
+        request = quiz_routes.AutoQuizRequest(domain="Python Programming", adaptive=True)
+        
+        async def run():
+            await temp_db.init_database()
+            return await quiz_routes.generate_auto_quiz(request, {"user_id": "user_1"})
+        
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(run())
+        assert error.value.status_code == 409
+        print("✅ Exhausted adaptive start passed")
+
+
+class TestNearDuplicates:
+    """Tests for MinHash/LSH near-duplicate detection"""
+    
+    def test_paraphrase_matches(self):
+        """Test a reworded question is found and a different one is not"""
+        from app.services.near_duplicates import LshIndex, minhash, similarity
+        original = minhash("What is a closure?", {"A": "Function with outer scope access"}, "A")
+        reworded = minhash("What is closure", {"B": "A function with outer scope access"}, "B")
+        other = minhash("Queue follows which principle?", {"A": "FIFO"}, "A")
+        assert similarity(original, reworded) >= 0.7
+        assert similarity(original, other) < 0.3
+        index = LshIndex()
+        index.add("closure", original)
+        assert index.find(reworded) == "closure"
+        assert index.find(other) is None
+        print("✅ Paraphrase matching passed")
+    
+    def test_quiz_never_holds_two_paraphrases(self, tmp_path):
+        """Test the compiled bank groups near-duplicates and quizzes draw one per group"""
+        agent = make_agent(tmp_path)
+        functions = {i.question: i for i in agent.bank.get_topic("Functions").items}
+        javascript = {i.question: i for i in agent.bank.get_topic("JavaScript Basics").items}
+        assert functions["What is closure?"].group == javascript["What is closure?"].group
+        
+        questions = asyncio.run(agent.generate_quiz(
+            subject="Python Programming",
+            topic="Functions",
+            difficulty="hard",
+            num_questions=500
+        ))["questions"]
+        closures = [q for q in questions if q["question"] == "What is closure?"]
+        assert len(closures) == 1
+        print(f"✅ Near-duplicate exclusion passed ({len(questions)} questions)")
+    
+    def test_generated_paraphrases_share_a_group(self, tmp_path):
+        """Test a provider's rewordings of a bank item take one slot in the quiz between them"""
+        helper = TestGenerationProvider()
+        closures = [
+            {"question": "What is a closure?",
+             "options": {"A": "End function", "B": "A function with outer scope access", "C": "Error handler", "D": "Loop"},
+             "correct_answer": "B", "topic": "Functions", "difficulty": "hard", "explanation": "It remembers."},
+            {"question": "What is closure?",
+             "options": {"A": "End function", "B": "A function with outer scope access", "C": "Error handler", "D": "Loop"},
+             "correct_answer": "B", "topic": "Functions", "difficulty": "hard", "explanation": "It remembers."}
+        ]
+        agent = make_agent(tmp_path)
+        agent.register_provider(helper.make_provider(lambda request: helper.reply(closures)))
+        
+        questions = asyncio.run(agent.generate_quiz(
+            "Python Programming", "Functions", "hard", 500, provider="azure_openai"
+        ))["questions"]
+        matches = [q for q in questions if "closure" in q["question"].lower()]
+        assert len(matches) == 1 and matches[0]["explanation"] == "It remembers."
+        print("✅ Generated paraphrase exclusion passed")
+    
+    def test_extra_generated_questions_are_dropped(self, tmp_path):
+        """Test a provider returning more questions than asked for doesn't lengthen the quiz"""
+        from app.services.llm_provider import GenerationProvider, parse_questions
+        helper = TestGenerationProvider()
+        
+        class Generous(GenerationProvider):
+            name = "generous"
+            
+            async def generate(self, subject, topic, difficulty, num_questions, *args, **kwargs):
+                return parse_questions(json.dumps({"questions": helper.QUESTIONS}), topic, difficulty)
+        
+        agent = make_agent(tmp_path)
+        agent.register_provider(Generous())
+        quiz = asyncio.run(agent.generate_quiz("Python Programming", "Functions", "medium", 1, provider="generous"))
+        assert len(quiz["questions"]) == 1
+        print("✅ Generated question cap passed")
+    
+    def test_bank_lookup_and_report(self, tmp_path):
+        """Test the indexed bank lookup and the batch cluster report"""
+        from app.jobs.duplicate_report import build_report
+        agent = make_agent(tmp_path)
+        match = agent.bank.find_near_duplicate(
+            "What is a closure?",
+            {"A": "Loop", "B": "Function with outer scope access"},
+            "B"
+        )
+        assert match is not None and match[1] >= 0.7
+        assert agent.bank.find_near_duplicate("Which HTTP status means Teapot?", {"A": "418"}, "A") is None
+        
+        report = build_report(seed_path=agent.bank.seed_path, db_path=agent.bank.db_path)
+        clustered = [{row["topic"] for row in cluster} for cluster in report["clusters"]]
+        assert {"Functions", "JavaScript Basics"} in clustered
+        print(f"✅ Duplicate report: {len(report['clusters'])} clusters")
+
+
+class TestBankSearch:
+    """Tests for the BM25 question bank search index"""
+    
+    def test_ranking_and_filters(self, tmp_path):
+        """Test relevant items rank first and topic/difficulty filters apply"""
+        agent = make_agent(tmp_path)
+        index = agent.bank.search_index()
+        hits, total = index.search("closure outer scope")
+        assert total >= 2
+        assert {key[1] for key, _ in hits[:2]} == {"Functions", "JavaScript Basics"}
+        assert hits[0][1] >= hits[-1][1]
+        
+        hits, _ = index.search("closure", topic="JavaScript Basics")
+        assert [key[1] for key, _ in hits] == ["JavaScript Basics"]
+        assert index.search("closure", difficulty="easy")[1] == 0
+        assert index.search("closure", topic="No Such Topic") == ([], 0)
+        print("✅ Search ranking and filters passed")
+    
+    def test_build_does_not_block_quizzes(self, tmp_path, monkeypatch):
+        """Test the bank keeps serving topics and its version while the search index builds"""
+        import threading
+        import time
+        from app.services import question_bank
+        agent = make_agent(tmp_path)
+        agent.bank.version
+        started, release = threading.Event(), threading.Event()
+        index_row = question_bank._index_row
+        
+        def slow_index_row(index, row):
+            if not started.is_set():
+                started.set()
+                release.wait(2)
+            index_row(index, row)
+        
+        monkeypatch.setattr(question_bank, "_index_row", slow_index_row)
+        build = threading.Thread(target=agent.bank.search_index)
+        build.start()
+        try:
+            assert started.wait(5)
+            began = time.perf_counter()
+            assert agent.bank.get_topic("Loops") is not None and agent.bank.version >= 0
+            assert time.perf_counter() - began < 0.5
+        finally:
+            release.set()
+            build.join()
+        assert len(agent.bank.search_index()) > 0
+        print("✅ Search index build off the bank lock passed")
+    
+    def test_incremental_add_and_remove(self):
+        """Test items become searchable on add and vanish on remove, without a rebuild"""
+        from app.services.bank_search import SearchIndex
+        index = SearchIndex()
+        for i in range(2000):
+            index.add(f"filler{i}", "Loops", "easy", f"What does loop {i} print?")
+        index.search("loop")
+        index.add("memo", "Recursion", "hard", "What is memoization? Caching results of recursive calls")
+        assert index.search("memoization")[0][0][0] == "memo"
+        assert index.search("loop")[1] == 2000
+        index.remove("memo")
+        assert index.search("memoization") == ([], 0)
+        assert len(index) == 2000
+        print("✅ Incremental index updates passed")
+    
+    def test_removed_items_leave_idf(self):
+        """Test scores after a remove match an index that never had the item"""
+        from app.services.bank_search import SearchIndex
+        texts = {f"stack{i}": f"What does stack push {i} do?" for i in range(5)}
+        texts.update({f"queue{i}": f"What does queue put {i} do?" for i in range(5)})
+        index, fresh = SearchIndex(), SearchIndex()
+        for key, text in texts.items():
+            index.add(key, "Stacks", "easy", text)
+            if key != "stack0":
+                fresh.add(key, "Stacks", "easy", text)
+        index.search("stack")
+        index.remove("stack0")
+        assert index.search("stack push") == fresh.search("stack push")
+        print("✅ Search idf after remove passed")
+    
+    def test_reload_updates_index_in_place(self, tmp_path):
+        """Test a hot reload carries the search index over and indexes only new items"""
+        import shutil
+        from app.services.ai_agent import QuizAgent
+        from app.services.question_bank import QuestionBank, BANK_SEED_PATH
+        seed = tmp_path / "seed.jsonl"
+        shutil.copy(BANK_SEED_PATH, seed)
+        agent = QuizAgent(bank=QuestionBank(seed_path=seed, db_path=tmp_path / "bank.sqlite"))
+        index = agent.bank.search_index()
+        
+        with open(seed, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "topic": "Queues", "difficulty": "hard", "question": "What is a deque?",
+                "options": {"A": "Double-ended queue", "B": "Stack", "C": "Heap", "D": "Tree"},
+                "correct_answer": "A", "explanation": "A deque supports both ends."
+            }) + "\n")
+        asyncio.run(agent.reload_bank())
+        
+        assert agent.bank.search_index() is index
+        hits, _ = index.search("deque")
+        assert hits and hits[0][0][1] == "Queues"
+        print("✅ Search index carried over on reload")
+
+
+class TestBankImport:
+    """Tests for streaming bulk import into the question bank"""
+    
+    QUESTION = {
+        "topic": "Queues", "difficulty": "hard", "question": "What is a deque?",
+        "options": {"A": "Double-ended queue", "B": "Stack", "C": "Heap", "D": "Tree"},
+        "correct_answer": "A", "explanation": "A deque supports both ends."
+    }
+    
+    def make_bank(self, tmp_path):
+        import shutil
+        from app.services.question_bank import BANK_SEED_PATH
+        seed = tmp_path / "seed.jsonl"
+        shutil.copy(BANK_SEED_PATH, seed)
+        return seed, tmp_path / "bank.sqlite"
+    
+    def test_ndjson_validation_and_dedup(self, tmp_path):
+        """Test invalid rows are reported, duplicates skipped and new items served after reload"""
+        from app.services.ai_agent import QuizAgent
+        from app.services.bank_import import import_questions
+        from app.services.question_bank import QuestionBank, is_stale
+        seed, db = self.make_bank(tmp_path)
+        agent = QuizAgent(bank=QuestionBank(seed_path=seed, db_path=db))
+        existing = json.loads(seed.read_text(encoding="utf-8").splitlines()[0])
+        
+        source = tmp_path / "import.ndjson"
+        lines = [
+            json.dumps(self.QUESTION),
+            json.dumps(self.QUESTION),
+            json.dumps(existing),
+            json.dumps({**self.QUESTION, "question": "What is a priority queue?", "correct_answer": "E"}),
+            json.dumps({**self.QUESTION, "topic": "Underwater Basket Weaving"}),
+            "{not json"
+        ]
+        source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        
+        report = import_questions(source, "ndjson", seed_path=seed, db_path=db, workers=0)
+        assert report["read"] == 6
+        assert report["imported"] == 1
+        assert report["duplicates"] == 2
+        assert report["invalid"] == 3
+        assert [e["line"] for e in report["errors"]] == [4, 5, 6]
+        assert "correct_answer" in report["errors"][0]["error"]
+        
+        asyncio.run(agent.reload_bank())
+        assert agent.bank.version == report["bank_version"]
+        assert "What is a deque?" in [item.question for item in agent.bank.get_topic("Queues").items]
+        # The seed was appended to and the bank stamped with it, so nothing recompiles
+        assert not is_stale(seed, db)
+        assert json.loads(seed.read_text(encoding="utf-8").splitlines()[-1]) == self.QUESTION
+        print("✅ NDJSON import validation and dedup passed")
+    
+    def test_csv_import_with_worker_pool(self, tmp_path):
+        """Test CSV rows go through the process pool and near-duplicates join an existing group"""
+        import csv
+        from app.services.bank_import import CSV_COLUMNS, import_questions
+        from app.services.question_bank import QuestionBank
+        seed, db = self.make_bank(tmp_path)
+        
+        source = tmp_path / "import.csv"
+        with open(source, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            for i in range(50):
+                writer.writerow(["Loops", "easy", f"How many times does loop number {i} run?",
+                                 str(i), str(i + 1), str(i + 2), str(i + 3), "A", ""])
+            writer.writerow(["Functions", "medium", "What is a closure?", "End function",
+                             "Function with outer scope access", "Loop", "Error", "B", ""])
+        
+        report = import_questions(source, "csv", seed_path=seed, db_path=db, workers=2)
+        assert report["imported"] == 51
+        # The numbered loop questions are near-duplicates of each other too
+        assert report["near_duplicates"] == 50
+        assert report["invalid"] == 0
+        
+        report = import_questions(source, "csv", seed_path=seed, db_path=db, workers=2)
+        assert report["imported"] == 0 and report["duplicates"] == 51
+        
+        bank = QuestionBank(seed_path=seed, db_path=db)
+        loops = [item for item in bank.get_topic("Loops").items if "loop number" in item.question]
+        assert len(loops) == 50
+        closures = [item for item in bank.get_topic("Functions").items if "closure" in item.question]
+        assert len({item.group for item in closures}) == 1
+        print("✅ CSV import through the worker pool passed")
+
+
+class TestGenerationProvider:
+    """Tests for the Azure OpenAI provider against a local fake endpoint"""
+    
+    QUESTIONS = [
+        {"question": "What does zip() return?",
+         "options": {"A": "A list", "B": "An iterator of tuples", "C": "A dict", "D": "A set"},
+         "correct_answer": "B", "topic": "Built-ins", "difficulty": "medium", "explanation": "zip is lazy."},
+        {"question": "What does enumerate() yield?",
+         "options": {"A": "Index-value pairs", "B": "Keys", "C": "Values", "D": "Nothing"},
+         "correct_answer": "A", "topic": "Built-ins", "difficulty": "medium", "explanation": "Pairs."},
+        {"question": "Broken question", "options": {"A": "Only one"}, "correct_answer": "A"}
+    ]
+    
+    def reply(self, questions):
+        import httpx
+        content = "```json\n" + json.dumps({"questions": questions}) + "\n```"
+        return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": content}}]})
+    
+    def make_provider(self, handler, **kwargs):
+        import httpx
+        from app.services.llm_provider import AzureOpenAIProvider
+        # The fake answers every request with QUESTIONS; follow-ups for the
+        # missing ones are tested on their own (TestQuestionSchema)
+        kwargs.setdefault("follow_up_calls", 0)
+        return AzureOpenAIProvider(
+            endpoint="https://fake.openai.azure.com/",
+            api_key="test-key",
+            deployment="quiz-gpt",
+            transport=httpx.MockTransport(handler),
+            **kwargs
+        )
+    
+    def test_generate_parses_reply(self):
+        """Test the request shape and that valid questions parse into the quiz shape"""
+        from app.services.question_bank import content_hash
+        requests = []
+        
+        def handler(request):
+            requests.append(request)
+            return self.reply(self.QUESTIONS)
+        
+        provider = self.make_provider(handler)
+        questions = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        
+        request = requests[0]
+        assert request.url.path == "/openai/deployments/quiz-gpt/chat/completions"
+        assert request.url.params["api-version"] == provider.api_version
+        assert request.headers["api-key"] == "test-key"
+        prompt = json.loads(request.content)["messages"][1]["content"]
+        assert "**Topic:** Functions" in prompt and "{{" not in prompt
+        
+        assert len(questions) == 2
+        assert questions[0]["topic"] == "Functions"
+        assert questions[0]["sub_topic"] == "Built-ins"
+        assert questions[0]["item_id"] == content_hash(self.QUESTIONS[0]["question"], self.QUESTIONS[0]["options"])
+        print("✅ Provider reply parsing passed")
+    
+    def test_concurrency_is_bounded(self):
+        """Test concurrent calls share one client and never exceed max_concurrency in flight"""
+        in_flight = {"now": 0, "max": 0}
+        
+        async def handler(request):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return self.reply(self.QUESTIONS[:1])
+        
+        async def run():
+            provider = self.make_provider(handler, max_concurrency=3)
+            results = await asyncio.gather(*[
+                provider.generate("Python Programming", f"Topic {i}", "easy", 1) for i in range(12)
+            ])
+            client = provider._client
+            await provider.aclose()
+            return results, client
+        
+        results, client = asyncio.run(run())
+        assert len(results) == 12
+        assert in_flight["max"] == 3
+        assert client is not None
+        print("✅ Bounded provider concurrency passed")
+    
+    def test_failures_raise_provider_error(self):
+        """Test HTTP errors, timeouts and unusable replies surface as ProviderError"""
+        import httpx
+        from app.services.llm_provider import ProviderError
+        
+        def timeout(request):
+            raise httpx.ReadTimeout("slow", request=request)
+        
+        for handler in [
+            lambda request: httpx.Response(500, text="boom"),
+            timeout,
+            lambda request: self.reply([self.QUESTIONS[2]]),
+            lambda request: httpx.Response(200, json={"choices": [{"message": {"content": "no json here"}}]})
+        ]:
+            with pytest.raises(ProviderError):
+                asyncio.run(self.make_provider(handler).generate("Python Programming", "Functions", "easy", 3))
+        print("✅ Provider failures passed")
+    
+    def test_agent_uses_provider_and_tops_up_from_bank(self, tmp_path):
+        """Test provider questions come first, seen ones are dropped and the bank fills the rest"""
+        from app.services.question_bank import content_hash
+        agent = make_agent(tmp_path)
+        agent.register_provider(self.make_provider(lambda request: self.reply(self.QUESTIONS)))
+        seen = {content_hash(self.QUESTIONS[1]["question"], self.QUESTIONS[1]["options"])}
+        
+        quiz = asyncio.run(agent.generate_quiz(
+            "Python Programming", "Functions", "medium", 5, previous_questions=seen, provider="azure_openai"
+        ))
+        questions = quiz["questions"]
+        assert len(questions) == 5 == len(quiz["public_fragments"])
+        assert [q["q_id"] for q in questions] == [f"q{i}" for i in range(1, 6)]
+        assert sum(q["question"] == "What does zip() return?" for q in questions) == 1
+        assert not any(q["item_id"] in seen for q in questions)
+        
+        with pytest.raises(ValueError):
+            asyncio.run(agent.generate_quiz("Python Programming", "Functions", "medium", 5, provider="nope"))
+        print("✅ Provider selection with bank top-up passed")
+
+
+class TestGenerationCache:
+    """Tests for the two-tier LLM generation cache"""
+    
+    def make_provider(self, tmp_path, calls, **kwargs):
+        from app.services.generation_cache import GenerationCache
+        helper = TestGenerationProvider()
+        
+        def handler(request):
+            calls.append(request)
+            return helper.reply(helper.QUESTIONS)
+        
+        cache = GenerationCache(db_path=tmp_path / "cache.sqlite")
+        return helper.make_provider(handler, cache=cache, **kwargs)
+    
+    def test_warm_hits_skip_the_call(self, tmp_path):
+        """Test repeat requests hit memory, other workers hit SQLite, and other prompts miss"""
+        import time
+        from app.services.generation_cache import GenerationCache
+        calls = []
+        provider = self.make_provider(tmp_path, calls)
+        
+        first = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        started = time.perf_counter()
+        second = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert time.perf_counter() - started < 0.05
+        assert second == first and len(calls) == 1
+        
+        asyncio.run(provider.generate("Python Programming", "Functions", "hard", 5))
+        assert len(calls) == 2
+        
+        # A second process sharing the file starts with an empty LRU
+        provider.cache = GenerationCache(db_path=tmp_path / "cache.sqlite")
+        assert asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5)) == first
+        assert len(calls) == 2
+        stats = provider.cache.stats()
+        assert stats["disk_hits"] == 1 and stats["memory_entries"] == 1
+        print("✅ Warm generation cache hits passed")
+    
+    def test_ttl_and_size_eviction(self, tmp_path):
+        """Test expired entries miss and both tiers stay within their size limits"""
+        import sqlite3
+        from app.services.generation_cache import GenerationCache
+        cache = GenerationCache(db_path=tmp_path / "cache.sqlite", memory_entries=2, max_entries=3)
+        for i in range(5):
+            cache.put(f"key{i}", [{"item_id": str(i)}])
+        
+        assert cache.stats()["memory_entries"] == 2
+        rows = sqlite3.connect(tmp_path / "cache.sqlite").execute("SELECT key FROM generation_cache").fetchall()
+        assert sorted(r[0] for r in rows) == ["key2", "key3", "key4"]
+        assert cache.get("key0") is None
+        assert cache.get("key2") == [{"item_id": "2"}]
+        
+        expired = GenerationCache(db_path=tmp_path / "expired.sqlite", ttl_seconds=-1)
+        expired.put("key", [{"item_id": "x"}])
+        assert expired.get("key") is None
+        # 3 + 1 (the promoted disk hit) from memory, 2 from disk
+        stats = cache.stats()
+        assert stats["misses"] == 1 and stats["disk_hits"] == 1 and stats["evictions"] == 6
+        print("✅ Generation cache TTL and eviction passed")
+    
+    def test_cached_sets_filtered_by_seen_items(self, tmp_path):
+        """Test cached sets are served minus seen items and topped up, or regenerated when that's turned off"""
+        from app.services.generation_cache import GenerationCache
+        helper = TestGenerationProvider()
+        extra = {"question": "What does sorted() return?",
+                 "options": {"A": "A new list", "B": "None", "C": "A tuple", "D": "An iterator"},
+                 "correct_answer": "A", "topic": "Built-ins", "difficulty": "medium", "explanation": "A copy."}
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return helper.reply(helper.QUESTIONS if len(calls) == 1 else [extra, *helper.QUESTIONS])
+        
+        provider = helper.make_provider(handler, cache=GenerationCache(db_path=tmp_path / "cache.sqlite"))
+        questions = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        seen = {questions[0]["item_id"]}
+        
+        # The unseen one is kept and the seen one replaced; the top-up isn't cached
+        served = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5, seen))
+        assert [q["question"] for q in served] == [questions[1]["question"], extra["question"]]
+        assert len(calls) == 2
+        assert asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5)) == questions
+        assert len(calls) == 2
+        
+        # Seen all of it: a miss, not an empty hit
+        seen = {q["item_id"] for q in questions}
+        served = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5, seen))
+        assert served and len(calls) == 3
+        
+        provider.serve_seen_filtered = False
+        asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5, {questions[0]["item_id"]}))
+        assert len(calls) == 4
+        print("✅ Seen-filtered cache hits passed")
+    
+    def test_sqlite_tier_off_the_event_loop(self, tmp_path):
+        """Test aget/aput reach SQLite from a worker thread and the row count is kept without COUNT(*)"""
+        import threading
+        from app.services.generation_cache import GenerationCache
+        cache = GenerationCache(db_path=tmp_path / "cache.sqlite", memory_entries=1, max_entries=2)
+        threads = set()
+        store = cache._store
+        
+        def tracked(*args):
+            threads.add(threading.get_ident())
+            return store(*args)
+        
+        cache._store = tracked
+        
+        async def run():
+            for i in range(3):
+                await cache.aput(f"key{i}", [{"item_id": str(i)}])
+            await cache.aput("key2", [{"item_id": "2b"}])
+            return await cache.aget("key1")
+        
+        assert asyncio.run(run()) == [{"item_id": "1"}]
+        assert threads and threading.get_ident() not in threads
+        assert cache._rows == 2
+        print("✅ Generation cache off-loop SQLite passed")
+
+
+class TestSingleFlight:
+    """Tests for coalescing identical concurrent generation calls"""
+    
+    def test_burst_makes_one_provider_call(self, tmp_path):
+        """Test a burst of identical quiz requests shares one provider call"""
+        helper = TestGenerationProvider()
+        calls = []
+        
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.02)
+            return helper.reply(helper.QUESTIONS)
+        
+        agent = make_agent(tmp_path)
+        provider = helper.make_provider(handler)
+        agent.register_provider(provider)
+        
+        async def burst():
+            return await asyncio.gather(*[
+                agent.generate_quiz("Python Programming", "Functions", "medium", 5, provider="azure_openai")
+                for _ in range(50)
+            ])
+        
+        quizzes = asyncio.run(burst())
+        assert len(calls) == 1
+        assert all(len(q["questions"]) == 5 for q in quizzes)
+        stats = provider.stats()["single_flight"]
+        assert stats["executions"] == 1 and stats["coalesced"] == 49 and stats["in_flight"] == 0
+        print("✅ Burst coalescing passed")
+    
+    def test_interactive_call_does_not_join_background_flight(self):
+        """Test an interactive request isn't held at the priority of a queued background one"""
+        from app.services.llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TokenBucketScheduler
+        helper = TestGenerationProvider()
+        calls = []
+        order = []
+        
+        def handler(request):
+            calls.append(request)
+            return helper.reply(helper.QUESTIONS)
+        
+        # 10k tokens a second; each call reserves well over 1k, so queued calls are granted in turn
+        scheduler = TokenBucketScheduler(tokens_per_minute=600000, requests_per_minute=6000, max_queue_delay_seconds=5)
+        provider = helper.make_provider(handler, hedge_delay_seconds=None, scheduler=scheduler)
+        
+        async def call(name, priority):
+            await provider.generate("Python Programming", "Functions", "medium", 5, priority=priority)
+            order.append(name)
+        
+        async def run():
+            await scheduler.acquire(600000)  # drain the bucket
+            background = asyncio.ensure_future(call("background", PRIORITY_BACKGROUND))
+            await asyncio.sleep(0)
+            await asyncio.gather(background, call("interactive", PRIORITY_INTERACTIVE))
+        
+        asyncio.run(run())
+        assert order == ["interactive", "background"]
+        assert len(calls) == 2
+        print("✅ Priority-keyed coalescing passed")
+    
+    def test_errors_are_shared_but_not_cached(self):
+        """Test every waiter sees a failure and the next call retries"""
+        from app.services.single_flight import SingleFlight
+        flights = SingleFlight()
+        attempts = []
+        
+        async def flaky():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise RuntimeError("upstream down")
+            return "ok"
+        
+        async def run():
+            first = await asyncio.gather(*[flights.run("k", flaky) for _ in range(3)], return_exceptions=True)
+            return first, await flights.run("k", flaky)
+        
+        first, second = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in first)
+        assert second == "ok" and len(attempts) == 2
+        assert flights.stats()["errors"] == 1
+        print("✅ Single-flight error handling passed")
+    
+    def test_cancellation(self):
+        """Test a cancelled waiter leaves the shared call running, and the last one cancels it"""
+        from app.services.single_flight import SingleFlight
+        flights = SingleFlight()
+        
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+        
+        async def run():
+            quitter = asyncio.ensure_future(flights.run("k", slow))
+            stayer = asyncio.ensure_future(flights.run("k", slow))
+            await asyncio.sleep(0.01)
+            quitter.cancel()
+            result = await stayer
+            
+            lonely = asyncio.ensure_future(flights.run("k2", slow))
+            await asyncio.sleep(0.01)
+            lonely.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await lonely
+            await asyncio.sleep(0)
+            return result
+        
+        assert asyncio.run(run()) == "done"
+        stats = flights.stats()
+        assert stats["cancelled"] == 1 and stats["in_flight"] == 0
+        print("✅ Single-flight cancellation passed")
+    
+    def test_join_after_last_waiter_cancelled(self):
+        """Test a caller arriving as the last waiter's call is being cancelled starts a fresh one"""
+        from app.services.single_flight import SingleFlight
+        flights = SingleFlight()
+        
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+        
+        async def run():
+            lonely = asyncio.ensure_future(flights.run("k", slow))
+            await asyncio.sleep(0.01)
+            lonely.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await lonely
+            # The cancelled task hasn't finished yet; joining it would raise CancelledError
+            return await flights.run("k", slow)
+        
+        assert asyncio.run(run()) == "done"
+        stats = flights.stats()
+        assert stats["executions"] == 2 and stats["in_flight"] == 0
+        print("✅ Single-flight join after cancel passed")
+
+
+class TestQuizStreaming:
+    """Tests for streaming questions as the model writes them"""
+    
+    def sse_reply(self, text, pause_after=None, pause=0.0):
+        """A streamed chat completion delivering `text` in small deltas"""
+        import httpx
+        
+        async def body():
+            paused = False
+            for i in range(0, len(text), 7):
+                delta = {"choices": [{"delta": {"content": text[i:i + 7]}}]}
+                yield f"data: {json.dumps(delta)}\n\n".encode("utf-8")
+                if pause_after is not None and i + 7 >= pause_after and not paused:
+                    await asyncio.sleep(pause)
+                    paused = True
+            yield b"data: [DONE]\n\n"
+        
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+    
+    def test_parser_handles_split_chunks(self):
+        """Test question objects are recovered across arbitrary chunk boundaries and tricky strings"""
+        from app.services.llm_provider import QuestionStreamParser
+        records = [
+            {"question": "What does '{}' create?", "options": {"A": "dict", "B": "set"}},
+            {"question": "Escape \\\" and } inside", "options": {"A": "x"}}
+        ]
+        text = "```json\n" + json.dumps({"questions": records}, indent=2) + "\n```"
+        for size in (1, 3, 17, len(text)):
+            parser = QuestionStreamParser()
+            parsed = []
+            for i in range(0, len(text), size):
+                parsed += parser.feed(text[i:i + size])
+            assert parsed == records
+        print("✅ Streaming JSON parser passed")
+    
+    def test_first_question_arrives_before_the_reply_ends(self):
+        """Test time-to-first-question tracks the first item, not the whole reply"""
+        import time
+        helper = TestGenerationProvider()
+        text = json.dumps({"questions": helper.QUESTIONS[:2]})
+        first_end = text.index("}, {") + 1
+        provider = helper.make_provider(lambda request: self.sse_reply(text, pause_after=first_end, pause=0.3))
+        
+        async def run():
+            started = time.perf_counter()
+            arrivals = []
+            async for q in provider.stream("Python Programming", "Functions", "medium", 5):
+                arrivals.append((time.perf_counter() - started, q["question"]))
+            return arrivals
+        
+        arrivals = asyncio.run(run())
+        assert [q for _, q in arrivals] == [helper.QUESTIONS[0]["question"], helper.QUESTIONS[1]["question"]]
+        assert arrivals[0][0] < 0.2 <= arrivals[1][0]
+        print("✅ Early first question passed")
+    
+    def test_repeats_within_a_stream_are_dropped(self):
+        """Test a question the model writes twice is streamed once and doesn't use up the budget"""
+        helper = TestGenerationProvider()
+        first, second = helper.QUESTIONS[:2]
+        text = json.dumps({"questions": [first, first, second]})
+        provider = helper.make_provider(lambda request: self.sse_reply(text))
+        
+        async def run():
+            return [q["question"] async for q in provider.stream("Python Programming", "Functions", "medium", 2)]
+        
+        assert asyncio.run(run()) == [first["question"], second["question"]]
+        print("✅ In-stream repeats dropped")
+    
+    def test_agent_stream_tops_up_and_survives_failure(self, tmp_path):
+        """Test streamed quizzes number questions in order and the bank covers a failed provider"""
+        import httpx
+        helper = TestGenerationProvider()
+        text = json.dumps({"questions": helper.QUESTIONS})
+        agent = make_agent(tmp_path)
+        agent.register_provider(helper.make_provider(lambda request: self.sse_reply(text)))
+        
+        async def collect(agent):
+            return [pair async for pair in agent.stream_quiz(
+                "Python Programming", "Functions", "medium", 5, provider="azure_openai"
+            )]
+        
+        pairs = asyncio.run(collect(agent))
+        assert [q["q_id"] for q, _ in pairs] == [f"q{i}" for i in range(1, 6)]
+        assert [q["question"] for q, _ in pairs[:2]] == [q["question"] for q in helper.QUESTIONS[:2]]
+        assert all(fragment.startswith(b',"question":') for _, fragment in pairs)
+        
+        failing = make_agent(tmp_path)
+        failing.register_provider(helper.make_provider(lambda request: httpx.Response(500, text="boom")))
+        pairs = asyncio.run(collect(failing))
+        assert len(pairs) == 5 and all(q["topic"] == "Functions" for q, _ in pairs)
+        print("✅ Agent streaming with bank top-up passed")
+
+
+class TestProviderResilience:
+    """Tests for hedged LLM calls, the circuit breaker and the bank fallback"""
+    
+    def test_hedged_call_takes_the_first_answer(self):
+        """Test a slow first attempt is overtaken by the hedge and then cancelled"""
+        import time
+        from app.services.resilience import hedged
+        started_attempts = []
+        cancelled = []
+        
+        async def attempt():
+            n = len(started_attempts)
+            started_attempts.append(n)
+            try:
+                await asyncio.sleep(1.0 if n == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(n)
+                raise
+            return n
+        
+        started = time.perf_counter()
+        assert asyncio.run(hedged(attempt, delay=0.05)) == 1
+        assert time.perf_counter() - started < 0.5
+        assert cancelled == [0]
+        print("✅ Hedged call passed")
+    
+    def test_provider_hedges_slow_requests(self):
+        """Test the provider sends a second request when the first is slow"""
+        import time
+        helper = TestGenerationProvider()
+        calls = []
+        
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(1.0)
+            return helper.reply(helper.QUESTIONS)
+        
+        provider = helper.make_provider(handler, hedge_delay_seconds=0.05)
+        started = time.perf_counter()
+        questions = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert len(questions) == 2 and len(calls) == 2
+        assert time.perf_counter() - started < 0.5
+        assert provider.stats()["hedges"] == 1
+        print("✅ Provider hedging passed")
+    
+    def test_circuit_breaker_opens_and_recovers(self):
+        """Test consecutive failures open the circuit, which fails fast and later half-opens"""
+        import httpx
+        import time
+        from app.services.llm_provider import ProviderError
+        helper = TestGenerationProvider()
+        calls = []
+        healthy = {"value": False}
+        
+        def handler(request):
+            calls.append(request)
+            return helper.reply(helper.QUESTIONS) if healthy["value"] else httpx.Response(503, text="brownout")
+        
+        provider = helper.make_provider(
+            handler, hedge_delay_seconds=None, breaker_failures=2, breaker_reset_seconds=0.1
+        )
+        for _ in range(3):
+            with pytest.raises(ProviderError):
+                asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert len(calls) == 2
+        assert provider.breaker.state == "open"
+        
+        time.sleep(0.12)
+        healthy["value"] = True
+        assert asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert provider.breaker.state == "closed"
+        print("✅ Circuit breaker passed")
+    
+    def test_half_open_allows_one_probe(self):
+        """Test a half-open circuit lets a single call through until it reports back"""
+        import time
+        from app.services.resilience import CircuitBreaker, CircuitOpenError
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        
+        breaker.check()
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+        breaker.release()
+        breaker.check()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        
+        time.sleep(0.06)
+        breaker.check()
+        breaker.record_success()
+        breaker.check()
+        breaker.check()
+        assert breaker.stats()["probes"] == 3 and breaker.stats()["rejected"] == 1
+        print("✅ Half-open single probe passed")
+    
+    def test_throttling_does_not_trip_the_breaker(self):
+        """Test 429s fail as overload and leave the circuit closed, scheduler or not"""
+        import httpx
+        from app.services.llm_provider import ProviderOverloadedError
+        helper = TestGenerationProvider()
+        
+        provider = helper.make_provider(
+            lambda request: httpx.Response(429, text="quota"), hedge_delay_seconds=None, breaker_failures=2
+        )
+        for _ in range(3):
+            with pytest.raises(ProviderOverloadedError):
+                asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert provider.breaker.state == "closed"
+        print("✅ Throttling kept the circuit closed")
+    
+    def test_stream_falls_back_to_bank_at_deadline(self, tmp_path):
+        """Test a stream with no question by the deadline is served from the bank within the deadline"""
+        import time
+        helper = TestGenerationProvider()
+        
+        async def handler(request):
+            await asyncio.sleep(2.0)
+            return helper.reply(helper.QUESTIONS)
+        
+        agent = make_agent(tmp_path)
+        agent.provider_deadline_seconds = 0.1
+        provider = helper.make_provider(handler, hedge_delay_seconds=None)
+        agent.register_provider(provider)
+        
+        async def run():
+            return [q async for q, _ in agent.stream_quiz(
+                "Python Programming", "Functions", "medium", 5, provider="azure_openai"
+            )]
+        
+        started = time.perf_counter()
+        questions = asyncio.run(run())
+        assert time.perf_counter() - started < 0.5
+        assert len(questions) == 5 and all(q["topic"] == "Functions" for q in questions)
+        assert agent.provider_fallbacks == 1
+        assert provider.breaker.stats()["timeouts"] == 1
+        print("✅ Stream deadline fallback to the bank passed")
+    
+    def test_agent_falls_back_to_bank_at_deadline(self, tmp_path):
+        """Test a provider slower than the deadline yields a bank quiz within the deadline"""
+        import time
+        helper = TestGenerationProvider()
+        
+        async def handler(request):
+            await asyncio.sleep(2.0)
+            return helper.reply(helper.QUESTIONS)
+        
+        agent = make_agent(tmp_path)
+        agent.provider_deadline_seconds = 0.1
+        agent.register_provider(helper.make_provider(handler, hedge_delay_seconds=None))
+        
+        started = time.perf_counter()
+        quiz = asyncio.run(agent.generate_quiz("Python Programming", "Functions", "medium", 5, provider="azure_openai"))
+        assert time.perf_counter() - started < 0.5
+        assert len(quiz["questions"]) == 5
+        assert all(q["topic"] == "Functions" for q in quiz["questions"])
+        assert agent.provider_fallbacks == 1
+        print("✅ Deadline fallback to the bank passed")
+
+
+class TestLlmScheduler:
+    """Tests for the TPM/RPM token-bucket scheduler in front of LLM calls"""
+    
+    def test_estimate_tokens(self):
+        """Test prompt tokens are estimated from message length plus the completion allowance"""
+        from app.services.llm_scheduler import estimate_tokens
+        messages = [{"role": "system", "content": "x" * 400}, {"role": "user", "content": "y" * 40}]
+        assert estimate_tokens(messages) == 100 + 4 + 10 + 4
+        assert estimate_tokens(messages, 500) == 618
+        print("✅ Token estimate passed")
+    
+    def test_interactive_calls_go_before_background(self):
+        """Test queued work is granted by priority, then arrival order"""
+        from app.services.llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TokenBucketScheduler
+        # 6000 TPM refills 100 tokens a second; each call needs 10 (one every 0.1s)
+        scheduler = TokenBucketScheduler(tokens_per_minute=6000, requests_per_minute=6000, max_queue_delay_seconds=5)
+        order = []
+        
+        async def call(name, priority):
+            await scheduler.acquire(10, priority)
+            order.append(name)
+        
+        async def run():
+            await scheduler.acquire(6000)  # drain the bucket
+            tasks = [asyncio.ensure_future(call("report-1", PRIORITY_BACKGROUND)),
+                     asyncio.ensure_future(call("report-2", PRIORITY_BACKGROUND))]
+            await asyncio.sleep(0)
+            tasks += [asyncio.ensure_future(call("quiz-1", PRIORITY_INTERACTIVE)),
+                      asyncio.ensure_future(call("quiz-2", PRIORITY_INTERACTIVE))]
+            await asyncio.sleep(0)
+            assert scheduler.stats()["queue_depth"] == 4
+            await asyncio.gather(*tasks)
+        
+        asyncio.run(run())
+        assert order == ["quiz-1", "quiz-2", "report-1", "report-2"]
+        stats = scheduler.stats()
+        assert stats["granted"] == 5 and stats["queued"] == 4 and stats["queue_depth"] == 0
+        assert stats["max_queue_depth"] == 4
+        assert stats["wait_p95_seconds"] > 0.1
+        print(f"✅ Priority order passed: {order}")
+    
+    def test_sheds_when_queue_delay_exceeds_budget(self):
+        """Test a call expected to wait past the budget is shed at once, not queued"""
+        import time
+        from app.services.llm_scheduler import PRIORITY_BACKGROUND, SchedulerOverloaded, TokenBucketScheduler
+        scheduler = TokenBucketScheduler(tokens_per_minute=600, requests_per_minute=600, max_queue_delay_seconds=0.5)
+        
+        async def run():
+            await scheduler.acquire(600)
+            # 10 tokens a second: 3 tokens fit in the budget, 20 don't
+            await scheduler.acquire(3)
+            started = time.perf_counter()
+            with pytest.raises(SchedulerOverloaded):
+                await scheduler.acquire(20, PRIORITY_BACKGROUND)
+            assert time.perf_counter() - started < 0.05
+        
+        asyncio.run(run())
+        stats = scheduler.stats()
+        assert stats["shed"] == 1 and stats["granted"] == 2
+        print("✅ Shedding passed")
+    
+    def test_paused_after_429(self):
+        """Test a 429's Retry-After holds back calls and does not trip the breaker"""
+        import httpx
+        from app.services.llm_provider import ProviderError, ProviderOverloadedError
+        from app.services.llm_scheduler import TokenBucketScheduler
+        helper = TestGenerationProvider()
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(429, headers={"Retry-After": "30"}, text="quota")
+        
+        scheduler = TokenBucketScheduler(tokens_per_minute=100000, requests_per_minute=100, max_queue_delay_seconds=1)
+        provider = helper.make_provider(handler, hedge_delay_seconds=None, breaker_failures=2, scheduler=scheduler)
+        with pytest.raises(ProviderError):
+            asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        for _ in range(3):
+            with pytest.raises(ProviderOverloadedError):
+                asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert len(calls) == 1
+        assert provider.breaker.state == "closed"
+        assert provider.stats()["scheduler"]["throttled"] == 1
+        print("✅ Retry-After pause passed")
+    
+    def test_agent_downgrades_to_bank_when_shed(self, tmp_path):
+        """Test an over-quota provider call is answered from the bank without calling out"""
+        import json as json_module
+        from app.services.llm_scheduler import TokenBucketScheduler
+        helper = TestGenerationProvider()
+        calls = []
+        
+        def handler(request):
+            calls.append(json_module.loads(request.content))
+            return helper.reply(helper.QUESTIONS)
+        
+        scheduler = TokenBucketScheduler(tokens_per_minute=2000, requests_per_minute=60, max_queue_delay_seconds=0.2)
+        agent = make_agent(tmp_path)
+        agent.register_provider(helper.make_provider(handler, hedge_delay_seconds=None, scheduler=scheduler))
+        
+        first = asyncio.run(agent.generate_quiz("Python Programming", "Functions", "medium", 5, provider="azure_openai"))
+        second = asyncio.run(agent.generate_quiz("Python Programming", "Variables", "medium", 5, provider="azure_openai"))
+        assert len(calls) == 1
+        assert calls[0]["max_tokens"] == 5 * 150 + 100
+        assert len(first["questions"]) == 5 and len(second["questions"]) == 5
+        assert agent.provider_fallbacks >= 1
+        assert scheduler.stats()["shed"] == 1
+        print("✅ Shed-to-bank fallback passed")
+
+
+class TestPromptRegistry:
+    """Tests for the compiled prompts/*.md templates"""
+    
+    def make_registry(self, tmp_path):
+        import shutil
+        from app.services.prompt_registry import PROMPTS_DIR, PromptRegistry
+        prompts_dir = tmp_path / "prompts"
+        shutil.copytree(PROMPTS_DIR, prompts_dir)
+        return PromptRegistry(prompts_dir).load()
+    
+    def test_render_fills_placeholders(self, tmp_path):
+        """Test a compiled render matches plain substitution and records its timing"""
+        import re
+        registry = self.make_registry(tmp_path)
+        values = {"subject": "Python", "topic": "Loops", "difficulty": "easy",
+                  "num_questions": 5, "previous_questions": "None"}
+        text = (tmp_path / "prompts" / "quiz_generation.md").read_text(encoding="utf-8")
+        expected = re.sub(r"\{\{\s*(\w+)\s*\}\}", lambda m: str(values[m.group(1)]), text)
+        assert registry.render("quiz_generation", values) == expected
+        assert "{{" not in registry.render("system")
+        
+        stats = {t["name"]: t for t in registry.stats()["templates"]}
+        assert set(stats) == {"system", "quiz_generation", "analysis", "weekly_report"}
+        assert stats["quiz_generation"]["renders"] == 1 and stats["system"]["renders"] == 1
+        assert stats["quiz_generation"]["render_p95_us"] is not None
+        assert len(stats["system"]["content_hash"]) == 16
+        print(f"✅ Prompt render passed: p95 {stats['quiz_generation']['render_p95_us']}us")
+    
+    def test_validation(self, tmp_path):
+        """Test malformed or unexpected placeholders and missing values are rejected"""
+        from app.services.prompt_registry import CompiledPrompt, PromptTemplateError
+        with pytest.raises(PromptTemplateError, match="line 2"):
+            CompiledPrompt("custom", "Hello\n{{ name")
+        with pytest.raises(PromptTemplateError, match="unknown placeholders"):
+            CompiledPrompt("system", "You are {{persona}}")
+        with pytest.raises(PromptTemplateError, match="topic"):
+            self.make_registry(tmp_path).render("quiz_generation", {"subject": "Python"})
+        assert CompiledPrompt("custom", "JSON: {\"a\": {\"b\": 1}}").render({}) == "JSON: {\"a\": {\"b\": 1}}"
+        print("✅ Prompt validation passed")
+    
+    def test_reload_on_change(self, tmp_path):
+        """Test edited templates are recompiled and broken edits keep the previous version"""
+        import os
+        registry = self.make_registry(tmp_path)
+        path = tmp_path / "prompts" / "system.md"
+        before = registry.version("system", "quiz_generation")
+        assert registry.refresh() == []
+        
+        path.write_text("You are a quiz writer.", encoding="utf-8")
+        os.utime(path, ns=(0, 1))
+        assert registry.refresh() == ["system"]
+        assert registry.render("system") == "You are a quiz writer."
+        assert registry.version("system", "quiz_generation") != before
+        
+        path.write_text("You are {{ broken", encoding="utf-8")
+        assert registry.refresh() == []
+        assert registry.render("system") == "You are a quiz writer."
+        print("✅ Prompt reload passed")
+    
+    def test_cache_hits_skip_rendering(self, tmp_path):
+        """Test a cached generation is keyed by template hashes and served without rendering"""
+        from app.services.generation_cache import GenerationCache
+        from app.services.prompt_registry import PromptRegistry
+        helper = TestGenerationProvider()
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return helper.reply(helper.QUESTIONS)
+        
+        registry = self.make_registry(tmp_path)
+        provider = helper.make_provider(handler, cache=GenerationCache(db_path=tmp_path / "cache.sqlite"), prompts=registry)
+        for _ in range(3):
+            asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert len(calls) == 1
+        assert registry.get("quiz_generation").render_count == 1
+        
+        # Editing a template changes the key, so the next request goes out again
+        (tmp_path / "prompts" / "quiz_generation.md").write_text(
+            "Write {{num_questions}} {{difficulty}} {{subject}} questions on {{topic}}. Avoid: {{previous_questions}}",
+            encoding="utf-8"
+        )
+        provider.prompts = PromptRegistry(tmp_path / "prompts").load()
+        asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert len(calls) == 2
+        print("✅ Cache hits without rendering passed")
+
+
+class TestBankGrowth:
+    """Tests for the off-peak pipeline that tops up thin bank cells"""
+    
+    def record_usage(self, temp_db, topic, difficulty, served, seen_ids):
+        import sqlite3
+        from datetime import datetime
+        from app.database.connection import init_database
+        from app.services.seen_set import SeenSet
+        asyncio.run(init_database())
+        seen = SeenSet()
+        seen.update(seen_ids)
+        now = datetime.utcnow().isoformat()
+        conn = sqlite3.connect(temp_db.DATABASE_PATH)
+        conn.execute(
+            "INSERT INTO quizzes (id, user_id, subject, topic, difficulty, questions, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ("quiz_1", "user_1", "Python Programming", topic, difficulty, json.dumps([{}] * served), now)
+        )
+        conn.execute(
+            "INSERT INTO seen_items (user_id, topic, bits, updated_at) VALUES (?, ?, ?, ?)",
+            ("user_1", topic, seen.to_bytes(), now)
+        )
+        conn.commit()
+        conn.close()
+    
+    def test_plan_ranks_busy_cells_first(self, tmp_path, temp_db):
+        """Test cells a learner has used up are planned, busiest first, with their headroom"""
+        from app.services.bank_growth import plan_growth
+        seed, db = TestBankImport().make_bank(tmp_path)
+        agent_bank = make_agent(tmp_path).bank
+        queues = agent_bank.get_topic("Queues")
+        self.record_usage(temp_db, "Queues", "hard", 10, [item.item_id for item in queues.items])
+        
+        plan = plan_growth(db, seed, temp_db.DATABASE_PATH, target_unseen=3)
+        assert (plan[0]["topic"], plan[0]["difficulty"]) == ("Queues", "hard")
+        assert plan[0]["demand"] == 10 and plan[0]["headroom"] == 0 and plan[0]["deficit"] == 3
+        assert plan[0]["supply"] >= 1 and plan[0]["examples"]
+        queues_cells = [cell for cell in plan if cell["topic"] == "Queues"]
+        assert len(queues_cells) == 3 and all(cell["headroom"] == 0 for cell in queues_cells)
+        assert all(cell["headroom"] < 3 for cell in plan)
+        print(f"✅ Growth plan passed: {len(plan)} thin cells")
+    
+    def test_grow_dedupes_imports_and_reloads(self, tmp_path, temp_db):
+        """Test generated items are filtered, imported and served without padding from other topics"""
+        import hashlib
+        from app.services.ai_agent import QuizAgent
+        from app.services.bank_growth import grow_bank
+        from app.services.question_bank import QuestionBank
+        seed, db = TestBankImport().make_bank(tmp_path)
+        agent = QuizAgent(bank=QuestionBank(seed_path=seed, db_path=db))
+        existing = agent.bank.get_topic("Queues").items[0]
+        self.record_usage(temp_db, "Queues", "hard", 10, [])
+        helper = TestGenerationProvider()
+        prompts = []
+        
+        def question(n, difficulty="hard"):
+            # Distinct wording per n, so generated questions aren't near-duplicates of each other
+            words = " ".join(hashlib.md5(f"{n}-{i}".encode()).hexdigest()[:6] for i in range(8))
+            return {"question": f"Queue case {n}: {words}?",
+                    "options": {"A": f"FIFO queue {n}", "B": f"Stack {n}", "C": f"Set {n}", "D": f"Heap {n}"},
+                    "correct_answer": "A", "difficulty": difficulty, "explanation": "First in, first out."}
+        
+        def handler(request):
+            body = json.loads(request.content)
+            prompts.append(body["messages"][1]["content"])
+            n = len(prompts) * 10
+            return helper.reply([
+                question(n), question(n + 1, "easy"),
+                {"question": existing.question, "options": existing.options,
+                 "correct_answer": existing.correct_answer, "difficulty": "hard"},
+                question(n + 2)
+            ])
+        
+        agent.register_provider(helper.make_provider(handler, hedge_delay_seconds=None))
+        before = len(agent.bank.get_topic("Queues").cells["hard"])
+        # The busiest cell is short of 6 by 6 - before; the budget covers exactly that
+        report = asyncio.run(grow_bank(
+            agent, "azure_openai", app_db_path=temp_db.DATABASE_PATH,
+            target_unseen=6, max_items=6 - before, batch_size=4
+        ))
+        assert report["cells"] == 1 and report["calls"] >= 2
+        assert report["imported"] == 6 - before
+        assert report["off_cell"] >= 1 and report["duplicates"] >= 1
+        assert len(agent.bank.get_topic("Queues").cells["hard"]) == 6
+        # The second call asks the model to avoid what the first produced
+        assert "Queue case 10:" in prompts[1] and "Queue case 10:" not in prompts[0]
+        
+        quiz = asyncio.run(agent.generate_quiz("Python Programming", "Queues", "hard", 5))
+        assert all(q["topic"] == "Queues" and q["difficulty"] == "hard" for q in quiz["questions"])
+        print(f"✅ Bank growth passed: {report}")
+    
+    def test_off_peak_window(self):
+        """Test off-peak windows, including ones that wrap past midnight"""
+        from datetime import datetime
+        from app.services.bank_growth import in_window
+        assert in_window("1-5", datetime(2024, 1, 1, 3))
+        assert not in_window("1-5", datetime(2024, 1, 1, 5))
+        assert in_window("22-4", datetime(2024, 1, 1, 23)) and in_window("22-4", datetime(2024, 1, 1, 1))
+        assert not in_window("22-4", datetime(2024, 1, 1, 12))
+        print("✅ Off-peak window passed")
+    
+    def hold_lock(self, path, seconds):
+        """Hold a file lock from another process; returns once it is taken"""
+        import os
+        import subprocess
+        import sys
+        holder = subprocess.Popen(
+            [sys.executable, "-c",
+             "import sys, time; from app.services.file_lock import FileLock; "
+             "lock = FileLock(sys.argv[1]); lock.acquire(); print('held', flush=True); time.sleep(float(sys.argv[2]))",
+             str(path), str(seconds)],
+            stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        # Importing app.services prints its banners first
+        while holder.stdout.readline().strip() != "held":
+            assert holder.poll() is None
+        return holder
+    
+    def test_imports_wait_for_other_processes(self, tmp_path):
+        """Test an import waits while another process holds the bank's lock"""
+        import time
+        from app.services.bank_import import bank_lock_path, import_questions
+        seed, db = TestBankImport().make_bank(tmp_path)
+        source = tmp_path / "new.ndjson"
+        source.write_text(json.dumps(TestBankImport.QUESTION) + "\n", encoding="utf-8")
+        
+        holder = self.hold_lock(bank_lock_path(db), 1.0)
+        started = time.monotonic()
+        report = import_questions(source, seed_path=seed, db_path=db, workers=0)
+        waited = time.monotonic() - started
+        holder.wait()
+        assert waited >= 0.5 and report["imported"] == 1
+        print("✅ Cross-process import lock passed")
+    
+    def test_stale_recompile_waits_for_imports(self, tmp_path):
+        """Test a reader recompiling a stale bank waits for the writers' lock"""
+        import time
+        from app.services.question_bank import QuestionBank, bank_lock_path
+        seed, db = TestBankImport().make_bank(tmp_path)
+        
+        holder = self.hold_lock(bank_lock_path(db), 1.0)
+        started = time.monotonic()
+        version = QuestionBank(seed_path=seed, db_path=db).version
+        waited = time.monotonic() - started
+        holder.wait()
+        assert waited >= 0.5 and version == 1
+        print("✅ Locked stale recompile passed")
+    
+    def test_one_growth_runner(self, tmp_path):
+        """Test the growth job refuses to run while another process is growing the bank"""
+        from app.jobs import grow_bank
+        from app.services.bank_growth import growth_lock_path
+        seed, db = TestBankImport().make_bank(tmp_path)
+        
+        holder = self.hold_lock(growth_lock_path(db), 1.0)
+        with pytest.raises(SystemExit) as exit_info:
+            grow_bank.main(["--seed", str(seed), "--db", str(db), "--app-db", str(tmp_path / "app.db")])
+        holder.wait()
+        assert exit_info.value.code == 1
+        print("✅ Single growth runner passed")
+    
+
+
+class TestQuestionSchema:
+    """Tests for validating and repairing model-produced questions"""
+    
+    def test_repairs_common_defects(self):
+        """Test odd key case, option lists, letter prefixes and answer text are repaired"""
+        from app.services.question_schema import validate_record
+        clean, repaired, error = validate_record(TestGenerationProvider.QUESTIONS[0], "Functions", "medium")
+        assert error is None and not repaired
+        
+        messy = {
+            "Question": " What does zip() return? ",
+            "Choices": ["A) A list", "B) An iterator of tuples", "C) A dict", "D) A set"],
+            "Answer": "an iterator of tuples",
+            "Difficulty": "Medium",
+            "Explanation": "zip is lazy."
+        }
+        q, repaired, error = validate_record(messy, "Functions", "easy")
+        assert error is None and repaired
+        assert q["item_id"] == clean["item_id"]
+        assert q["options"]["B"] == "An iterator of tuples" and q["correct_answer"] == "B"
+        assert q["difficulty"] == "medium" and q["topic"] == "Functions"
+        
+        lower = {**TestGenerationProvider.QUESTIONS[0], "correct_answer": "b",
+                 "options": {"a": "A list", "b": "An iterator of tuples", "c": "A dict", "d": "A set"}}
+        assert validate_record(lower, "Functions", "medium")[0]["correct_answer"] == "B"
+        print("✅ Schema repairs passed")
+    
+    def test_salvages_valid_items(self):
+        """Test a fenced reply with a trailing comma keeps its valid items and reports the rest"""
+        from app.services.question_schema import extract_records, validate_questions
+        good, other = TestGenerationProvider.QUESTIONS[:2]
+        reply = "Here you go:\n```json\n" + json.dumps({"Questions": [
+            good, good, {**other, "correct_answer": "E"}, {**other, "options": ["1", "2", "3"]}, "junk", other
+        ]})[:-2] + ",]}\n```"
+        result = validate_questions(extract_records(reply), "Functions", "medium")
+        assert [q["question"] for q in result.questions] == [good["question"], other["question"]]
+        assert result.rejected == 4 and len(result.errors) == 4
+        assert "repeats" in result.errors[0]
+        
+        bare = validate_questions(extract_records(json.dumps([good])), "Functions", "medium")
+        assert len(bare.questions) == 1
+        print("✅ Schema salvage passed")
+    
+    def test_salvages_truncated_reply(self):
+        """Test a reply cut off by max_tokens keeps the questions it completed"""
+        from app.services.question_schema import SchemaError, extract_records, validate_questions
+        good, other = TestGenerationProvider.QUESTIONS[:2]
+        third = {**good, "question": "What does map() return?"}
+        reply = "```json\n" + json.dumps({"questions": [good, other, third]}) + "\n```"
+        records = extract_records(reply[:-40])
+        result = validate_questions(records, "Functions", "medium")
+        assert [q["question"] for q in result.questions] == [good["question"], other["question"]]
+        
+        try:
+            extract_records('{"questions": [{"question": "Cut')
+            assert False, "Expected SchemaError"
+        except SchemaError:
+            pass
+        print("✅ Truncated reply salvage passed")
+    
+    def test_stream_parser_reads_bare_arrays(self):
+        """Test streamed question objects are found in a bare array reply too"""
+        from app.services.llm_provider import QuestionStreamParser
+        text = json.dumps(TestGenerationProvider.QUESTIONS[:2])
+        parser = QuestionStreamParser()
+        records = [r for i in range(0, len(text), 7) for r in parser.feed(text[i:i + 7])]
+        assert [r["question"] for r in records] == [q["question"] for q in TestGenerationProvider.QUESTIONS[:2]]
+        print("✅ Bare array streaming passed")
+    
+    def test_follow_up_requests_only_missing_items(self):
+        """Test a short reply is topped up by one call for just the missing questions"""
+        helper = TestGenerationProvider()
+        prompts = []
+        extra = [
+            {**helper.QUESTIONS[0], "question": f"Extra question {n} about functions?"} for n in range(3)
+        ]
+        
+        def handler(request):
+            prompts.append(json.loads(request.content)["messages"][1]["content"])
+            return helper.reply(helper.QUESTIONS if len(prompts) == 1 else extra + helper.QUESTIONS[:1])
+        
+        provider = helper.make_provider(handler, follow_up_calls=1)
+        questions = asyncio.run(provider.generate("Python Programming", "Functions", "medium", 5))
+        assert len(questions) == 5 and len({q["item_id"] for q in questions}) == 5
+        assert len(prompts) == 2
+        assert "**Number of Questions:** 3" in prompts[1]
+        assert helper.QUESTIONS[0]["question"] in prompts[1]
+        stats = provider.stats()["validation"]
+        assert stats["follow_ups"] == 1 and stats["rejected"] == 1 and stats["valid"] == 6
+        print("✅ Follow-up for missing items passed")
+
+
+class TestLlmSimulator:
+    """Tests for the provider against the local Azure OpenAI simulator"""
+    
+    def make_provider(self, simulator, **kwargs):
+        import httpx
+        from app.services.llm_provider import AzureOpenAIProvider
+        return AzureOpenAIProvider(
+            endpoint="http://simulator",
+            api_key="local",
+            deployment="quiz-gpt",
+            transport=httpx.ASGITransport(app=simulator),
+            hedge_delay_seconds=None,
+            **kwargs
+        )
+    
+    def test_generate_and_stream_bank_payloads(self):
+        """Test plain and streamed replies carry valid bank questions for the prompt's cell"""
+        from app.services.llm_scheduler import TokenBucketScheduler
+        from benchmarks.llm_simulator import LLMSimulator
+        simulator = LLMSimulator(random_seed=1)
+        scheduler = TokenBucketScheduler(100000, 100)
+        provider = self.make_provider(simulator, scheduler=scheduler)
+        
+        async def run():
+            questions = await provider.generate("Python Programming", "Loops", "easy", 3)
+            streamed = [q async for q in provider.stream("Python Programming", "Functions", "medium", 2)]
+            await provider.aclose()
+            return questions, streamed
+        
+        questions, streamed = asyncio.run(run())
+        bank = {(q["question"], q["topic"]) for q in simulator._bank[("Loops", "easy")]}
+        assert len(questions) == 3 and all((q["question"], q["topic"]) in bank for q in questions)
+        assert len(streamed) == 2 and all(q["topic"] == "Functions" for q in streamed)
+        stats = simulator.stats()
+        assert stats["ok"] == 2 and stats["streamed"] == 1 and stats["completion_tokens"] > 0
+        print("✅ Simulator payloads passed")
+    
+    def test_injected_failures(self):
+        """Test injected 429s and 500s surface as provider errors and 429s pause the scheduler"""
+        from app.services.llm_provider import ProviderError
+        from app.services.llm_scheduler import TokenBucketScheduler
+        from benchmarks.llm_simulator import LLMSimulator
+        
+        scheduler = TokenBucketScheduler(100000, 100)
+        throttled = self.make_provider(LLMSimulator(error_429_rate=1.0, retry_after_seconds=3), scheduler=scheduler)
+        failing = self.make_provider(LLMSimulator(error_500_rate=1.0))
+        
+        async def attempt(provider):
+            try:
+                await provider.generate("Python Programming", "Loops", "easy", 3)
+            except ProviderError as e:
+                return str(e)
+            finally:
+                await provider.aclose()
+        
+        assert "429" in asyncio.run(attempt(throttled))
+        assert scheduler.stats()["throttled"] == 1
+        assert "500" in asyncio.run(attempt(failing))
+        print("✅ Simulator failure injection passed")
+    
+    def test_quota_and_synthetic_payloads(self):
+        """Test the simulated RPM quota answers 429 and synthetic questions are all new"""
+        from app.services.llm_provider import ProviderError
+        from benchmarks.llm_simulator import LLMSimulator
+        simulator = LLMSimulator(requests_per_minute=1, payload="synthetic")
+        provider = self.make_provider(simulator, follow_up_calls=0)
+        
+        async def run():
+            first = await provider.generate("Python Programming", "Loops", "hard", 4)
+            try:
+                await provider.generate("Python Programming", "Loops", "medium", 4)
+            except ProviderError as e:
+                return first, str(e)
+            finally:
+                await provider.aclose()
+        
+        first, error = asyncio.run(run())
+        assert len({q["item_id"] for q in first}) == 4 and all(q["difficulty"] == "hard" for q in first)
+        assert "429" in error and simulator.stats()["quota_429"] == 1
+        print("✅ Simulator quota passed")
+
+
+class TestLlmTelemetry:
+    """Tests for per-call LLM telemetry and the daily usage rollup"""
+    
+    def test_calls_roll_up_by_caller_and_topic(self, temp_db, tmp_path):
+        """Test tokens, cache hits, first-token times and cost land in llm_usage_daily"""
+        from app.services.generation_cache import GenerationCache
+        from app.services.llm_telemetry import LLMTelemetry, set_llm_caller
+        from benchmarks.llm_simulator import LLMSimulator
+        simulator = LLMSimulator(random_seed=3)
+        telemetry = LLMTelemetry(prompt_cost_per_1k=1.0, completion_cost_per_1k=2.0)
+        provider = TestLlmSimulator().make_provider(
+            simulator, telemetry=telemetry, cache=GenerationCache(db_path=tmp_path / "cache.db")
+        )
+        
+        async def run():
+            await temp_db.init_database()
+            set_llm_caller("/quiz/generate", "user-1")
+            await provider.generate("Python Programming", "Loops", "easy", 3)
+            await provider.generate("Python Programming", "Loops", "easy", 3)
+            set_llm_caller("/quiz/generate/stream", "user-2")
+            [q async for q in provider.stream("Python Programming", "Functions", "medium", 2)]
+            await provider.aclose()
+            assert await telemetry.flush() == 2
+            return (
+                await telemetry.usage(group_by="topic"),
+                await telemetry.usage(group_by="user"),
+                await telemetry.usage(group_by=None)
+            )
+        
+        by_topic, by_user, totals = asyncio.run(run())
+        loops = next(row for row in by_topic if row["topic"] == "Loops")
+        assert loops["calls"] == 2 and loops["cache_hit_rate"] == 0.5 and loops["upstream_calls"] == 1
+        upstream = simulator.stats()
+        assert loops["prompt_tokens"] <= upstream["prompt_tokens"] and loops["completion_tokens"] > 0
+        assert loops["cost_usd"] == round((loops["prompt_tokens"] + 2 * loops["completion_tokens"]) / 1000, 4)
+        assert loops["avg_first_token_ms"] is not None
+        assert {row["user"] for row in by_user} == {"user-1", "user-2"}
+        assert totals[0]["calls"] == 3 and totals[0]["errors"] == 0
+        assert telemetry.stats()["deployments"]["quiz-gpt"]["latency_p95_seconds"] is not None
+        print("✅ LLM telemetry rollup passed")
+    
+    def test_failed_calls_and_repeated_flushes(self, temp_db):
+        """Test errors are counted and later flushes add to the same row"""
+        from app.services.llm_provider import ProviderError
+        from app.services.llm_telemetry import LLMTelemetry
+        from benchmarks.llm_simulator import LLMSimulator
+        telemetry = LLMTelemetry()
+        provider = TestLlmSimulator().make_provider(LLMSimulator(error_500_rate=1.0), telemetry=telemetry)
+        
+        async def run():
+            await temp_db.init_database()
+            for _ in range(2):
+                try:
+                    await provider.generate("Python Programming", "Loops", "hard", 3)
+                except ProviderError:
+                    pass
+                await telemetry.flush()
+            await provider.aclose()
+            return await telemetry.usage(group_by="endpoint")
+        
+        rows = asyncio.run(run())
+        assert len(rows) == 1 and rows[0]["endpoint"] == "background"
+        assert rows[0]["calls"] == 2 and rows[0]["errors"] == 2 and rows[0]["prompt_tokens"] == 0
+        assert rows[0]["avg_first_token_ms"] is None
+        print("✅ LLM telemetry errors passed")
+
+
+class TestSeenSet:
+    """Tests for content-hash IDs and seen-sets"""
+    
+    def test_content_hash_is_stable(self):
+        """Test content hash ignores option order and surrounding whitespace"""
+        from app.services.question_bank import content_hash
+        a = content_hash("What is 2 + 2?", {"A": "3", "B": "4"})
+        b = content_hash(" What is 2 + 2?", {"B": "4", "A": "3 "})
+        c = content_hash("What is 2 + 2?", {"A": "4", "B": "3"})
+        assert a == b
+        assert a != c
+        assert len(a) == 16
+        print(f"✅ Content hash: {a}")
+    
+    def test_seen_set_roundtrip(self):
+        """Test seen-set membership survives serialization"""
+        from app.services.seen_set import SeenSet
+        from app.services.question_bank import content_hash
+        ids = [content_hash(f"Question {i}?", {"A": "x"}) for i in range(200)]
+        seen = SeenSet()
+        assert not seen
+        seen.update(ids[:100])
+        restored = SeenSet(seen.to_bytes())
+        assert len(seen.to_bytes()) == 1024
+        assert all(i in restored for i in ids[:100])
+        false_positives = sum(1 for i in ids[100:] if i in restored)
+        assert false_positives <= 2
+        print(f"✅ Seen-set roundtrip passed ({false_positives} false positives)")
+    
+    def test_seen_set_grows_with_heavy_use(self):
+        """Test a seen-set with thousands of items keeps its false-positive rate low and round-trips"""
+        from app.services.seen_set import SeenSet
+        from app.services.question_bank import content_hash
+        ids = [content_hash(f"Question {i}?", {"A": "x"}) for i in range(25000)]
+        seen = SeenSet()
+        seen.update(ids[:20000])
+        restored = SeenSet(seen.to_bytes())
+        assert len(restored.segments) > 1
+        assert all(i in restored for i in ids[:20000])
+        false_positives = sum(1 for i in ids[20000:] if i in restored)
+        assert false_positives / 5000 < 0.02
+        print(f"✅ Growing seen-set passed ({len(seen.to_bytes())} bytes, {false_positives / 50:.2f}% false positives)")
+
+
+class TestQuestionItemMemory:
+    """Memory footprint of bank questions"""
+    
+    def _bytes_per_question(self, build, lines):
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            held = build(lines)
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        return allocated / len(held)
+    
+    def test_bytes_per_question(self):
+        """Report bytes per question for the old dict layout vs QuestionItem"""
+        from app.services.question_bank import BANK_SEED_PATH, QuestionItem, content_hash
+        with open(BANK_SEED_PATH, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()] * 20
+        
+        def build_dicts(lines):
+            held = []
+            for line in lines:
+                q = json.loads(line)
+                held.append({
+                    "question": q["question"],
+                    "options": q["options"],
+                    "correct_answer": q["correct_answer"],
+                    "explanation": q["explanation"],
+                    "topic": q["topic"],
+                    "difficulty": q["difficulty"],
+                    "item_id": content_hash(q["question"], q["options"])
+                })
+            return held
+        
+        def build_items(lines):
+            held = []
+            for line in lines:
+                q = json.loads(line)
+                held.append(QuestionItem(
+                    item_id=content_hash(q["question"], q["options"]),
+                    topic=q["topic"],
+                    difficulty=q["difficulty"],
+                    question=q["question"],
+                    options=q["options"],
+                    correct_answer=q["correct_answer"],
+                    explanation=q["explanation"]
+                ))
+            return held
+        
+        dict_bytes = self._bytes_per_question(build_dicts, lines)
+        item_bytes = self._bytes_per_question(build_items, lines)
+        print(f"📏 Bytes per question: dict={dict_bytes:.0f} item={item_bytes:.0f} "
+              f"(x100 bank: {dict_bytes * len(lines) * 5 / 2**20:.1f} MiB -> {item_bytes * len(lines) * 5 / 2**20:.1f} MiB)")
+        assert item_bytes < dict_bytes
 
 def run_quiz_tests():
     """Run all quiz tests"""